@@ -0,0 +1,116 @@
+"""
+배치 생성(/api/generate/batch) 벤치마크입니다.
+아티클 URL이 주제 간에 겹치는 가짜 Tavily와 로컬 픽스처 서버로,
+같은 주제 목록을 개별 /api/generate 호출(같은 동시성)과 배치 한 번으로 생성해
+전체 소요 시간, 분당 뉴스레터 수, 네트워크 프로브/검색/LLM 호출 수를 비교합니다.
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.bench_batch --topics 20 --duplicates 4 --concurrency 4 --browser skip
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_server import FixtureServer  # noqa: E402
+from benchmarks.run_pipeline import Harness, configure_env  # noqa: E402
+
+
+def make_topics(count: int, duplicates: int) -> list:
+    topics = [f"배치 주제 {i}" for i in range(count - duplicates)]
+    # 같은 주제를 다른 표기로 다시 요청하는 경우
+    topics += [f"  배치 주제 {i} " for i in range(duplicates)]
+    return topics
+
+
+def counters(harness) -> dict:
+    crawler = harness.main.crawler
+    return {
+        "tavily_calls": harness.tavily.calls,
+        "llm_calls": harness.gemini.calls + harness.openai.calls,
+        "url_probes": crawler.url_validator.probes,
+        "image_probes": crawler.image_ranker.probes,
+    }
+
+
+async def run_separate(harness, client, topics: list, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(topic):
+        async with semaphore:
+            response = await client.post("/api/generate", json={"topic": topic, "max_results": harness.args.max_results})
+            response.raise_for_status()
+
+    await asyncio.gather(*(one(t) for t in topics))
+
+
+async def run_batch(harness, client, topics: list, concurrency: int):
+    harness.main.batch_runner.concurrency = concurrency
+    payload = {"requests": [{"topic": t, "max_results": harness.args.max_results} for t in topics]}
+    # (ASGITransport는 응답을 모아서 돌려주므로 첫 결과 시각은 서버가 보고한 done 통계를 사용)
+    async with client.stream("POST", "/api/generate/batch", json=payload) as response:
+        response.raise_for_status()
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "done":
+                return {"stats": json.loads(line[6:])}
+
+
+async def run(args) -> list:
+    import httpx
+    rows = []
+    with FixtureServer() as server:
+        harness = Harness(args, server.base_url)
+        harness.tavily.unique_urls = False
+        topics = make_topics(args.topics, args.duplicates)
+        transport = httpx.ASGITransport(app=harness.main.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                for mode, runner in (("separate", run_separate), ("batch", run_batch)):
+                    harness.reset_caches()
+                    before = counters(harness)
+                    started = time.perf_counter()
+                    extra = await runner(harness, client, topics, args.concurrency)
+                    wall = time.perf_counter() - started
+                    after = counters(harness)
+                    row = {"mode": mode, "wall_s": round(wall, 3), "per_minute": round(len(topics) / wall * 60, 1)}
+                    row.update({k: after[k] - before[k] for k in after})
+                    if extra:
+                        row.update(extra)
+                    rows.append(row)
+        finally:
+            await harness.main.browser_pool.stop()
+            await harness.main.http_pool.aclose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch generation against separate /api/generate calls")
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--duplicates", type=int, default=4, help="표기만 다른 중복 주제 수")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-results", type=int, default=5)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--analysis-latency", type=float, default=1.0)
+    parser.add_argument("--browser", choices=("real", "skip"), default="skip")
+    args = parser.parse_args()
+    # Harness가 사용하는 나머지 옵션
+    args.context_mode, args.prompt_cache, args.warm, args.unique_topics = "full", True, False, True
+
+    configure_env()
+    for row in asyncio.run(run(args)):
+        print(f"{row['mode']:<9} wall={row['wall_s']:>7}s newsletters/min={row['per_minute']:>6} "
+              f"tavily={row['tavily_calls']:<3} llm={row['llm_calls']:<3} "
+              f"url_probes={row['url_probes']:<4} image_probes={row['image_probes']:<4}"
+              + (f" first_result={row['stats']['first_result_s']}s shared={row['stats']['shared']}" if "stats" in row else ""))
+
+
+if __name__ == "__main__":
+    main()
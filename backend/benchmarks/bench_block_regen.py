@@ -0,0 +1,135 @@
+"""
+단일 블록 재생성(/api/generate/block) 벤치마크입니다.
+가짜 Tavily/Gemini와 로컬 픽스처 서버로 뉴스레터를 한 번 생성(save_draft)한 뒤, main_story 블록 하나를 바꾸는 방법으로
+- full: 지금까지의 유일한 방법인 /api/generate 재실행 (검색 + 수집 + 문맥 정제 + 10개 이상 블록 전체 생성)
+- block(run_id): 실행 기록의 소스/정제 문맥과 블록 전용 프롬프트로 블록 하나만 생성
+- block(draft_id): 초안 ID로 요청 (초안에 연결된 실행 기록 사용, save로 초안 블록까지 저장)
+을 비교해 평균 소요 시간, 생성 프롬프트 입력 토큰(추정), Tavily/문맥 정제 호출 수를 출력합니다.
+LLM 지연 시간은 출력 길이에 비례하도록 흉내냅니다. (첫 토큰까지 --ttft초 + 출력 글자 수 / --chars-per-s)
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.bench_block_regen --repeat 3 --browser skip
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import load_fixture, _GeminiResponse  # noqa: E402
+from benchmarks.fixture_server import FixtureServer  # noqa: E402
+from benchmarks.run_pipeline import Harness, configure_env  # noqa: E402
+
+TOPIC = "블록 재생성 벤치마크"
+
+
+def install_llm(harness, args) -> dict:
+    """출력 길이에 비례하는 지연 시간으로 응답하는 Gemini generate_content를 설치하고 호출 통계를 반환합니다."""
+    gemini = harness.gemini
+    newsletter = load_fixture("newsletter.json")
+    full_text = json.dumps(newsletter, ensure_ascii=False)
+    calls = {"generate": 0, "block": 0, "analyze": 0, "prompt_chars": 0}
+
+    async def generate_content(model: str, contents, config=None):
+        if model.startswith("gemini-2.0"):
+            calls["analyze"] += 1
+            await asyncio.sleep(args.analysis_latency)
+            return _GeminiResponse(gemini.analysis_text, len(str(contents)))
+        prefix_chars = len(getattr(config, "system_instruction", None) or "")
+        prefix_chars += gemini.cached.get(getattr(config, "cached_content", None), 0)
+        if "[작성할 블록: " in contents:
+            block_type = contents.split("[작성할 블록: ", 1)[1].split("]", 1)[0]
+            block = next(b for b in newsletter["blocks"] if b["type"] == block_type)
+            text = json.dumps({"type": block_type, "content": block["content"]}, ensure_ascii=False)
+            calls["block"] += 1
+        else:
+            text = full_text
+            calls["generate"] += 1
+        calls["prompt_chars"] += len(contents) + prefix_chars
+        await asyncio.sleep(args.ttft + len(text) / args.chars_per_s)
+        return _GeminiResponse(text, len(contents))
+
+    gemini.models.generate_content = generate_content
+    return calls
+
+
+async def measure(client, harness, calls: dict, repeat: int, send) -> dict:
+    tavily_before, before = harness.tavily.calls, dict(calls)
+    walls = []
+    for i in range(repeat):
+        # 캐시는 비우지 않음 (재실행도 검색/정제 캐시가 적중하는 가장 유리한 조건에서 비교)
+        started = time.perf_counter()
+        response = await send(client, i)
+        response.raise_for_status()
+        walls.append(time.perf_counter() - started)
+    llm_calls = (calls["generate"] - before["generate"]) + (calls["block"] - before["block"])
+    return {
+        "wall_s": round(sum(walls) / len(walls), 3),
+        "prompt_tokens": (calls["prompt_chars"] - before["prompt_chars"]) // 3 // max(1, llm_calls),
+        "tavily_calls": harness.tavily.calls - tavily_before,
+        "analyze_calls": calls["analyze"] - before["analyze"],
+    }
+
+
+async def run(args) -> list:
+    import httpx
+    rows = []
+    with FixtureServer() as server:
+        harness = Harness(args, server.base_url)
+        calls = install_llm(harness, args)
+        transport = httpx.ASGITransport(app=harness.main.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                request = {"topic": TOPIC, "max_results": args.max_results, "save_draft": True}
+                original = (await client.post("/api/generate", json=request)).json()
+                run_id, draft_id = original["run_id"], original["draft_id"]
+                block_id = next(b["id"] for b in original["blocks"] if b["type"] == "main_story")
+                print(f"original: {len(original['blocks'])} blocks, run_id={run_id[:8]} draft_id={draft_id[:8]} "
+                      f"block_id={block_id}")
+
+                modes = (
+                    ("full", lambda c, i: c.post("/api/generate", json=request)),
+                    ("block(run_id)", lambda c, i: c.post("/api/generate/block", json={
+                        "run_id": run_id, "block_id": block_id, "instructions": f"다른 관점 {i}"})),
+                    ("block(draft_id)", lambda c, i: c.post("/api/generate/block", json={
+                        "draft_id": draft_id, "block_id": block_id, "save": True})),
+                )
+                for mode, send in modes:
+                    row = await measure(client, harness, calls, args.repeat, send)
+                    row["mode"] = mode
+                    rows.append(row)
+                saved = (await client.get(f"/api/drafts/{draft_id}")).json()
+                print(f"draft block {block_id} saved: {any(b['id'] == block_id for b in saved['blocks'])}, "
+                      f"run_store={harness.main.runs.stats()['block_updates']} updates")
+        finally:
+            harness.main.crawler.image_dedup.close()
+            await harness.main.browser_pool.stop()
+            await harness.main.http_pool.aclose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-block regeneration against re-running the pipeline")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-results", type=int, default=5)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--analysis-latency", type=float, default=3.0)
+    parser.add_argument("--ttft", type=float, default=0.6, help="첫 토큰까지 걸리는 시간(초)")
+    parser.add_argument("--chars-per-s", type=float, default=150.0, help="LLM 출력 속도 (초당 글자 수)")
+    parser.add_argument("--browser", choices=("real", "skip"), default="skip")
+    args = parser.parse_args()
+    # Harness가 사용하는 나머지 옵션
+    args.llm_latency = 0.0
+    args.context_mode, args.prompt_cache, args.warm, args.unique_topics = "full", True, False, False
+
+    configure_env()
+    for row in asyncio.run(run(args)):
+        print(f"{row['mode']:<16} wall={row['wall_s']:>7}s prompt_tokens={row['prompt_tokens']:<6} "
+              f"tavily={row['tavily_calls']:<3} analyze={row['analyze_calls']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+호스트별 크롤링 스케줄러 벤치마크입니다.
+여러 아티클의 이미지가 모두 같은 CDN(초당 요청 수를 넘으면 429 + Retry-After를 주는 로컬 픽스처 서버)에 있을 때
+아티클마다 이미지 유효성 검사(_is_url_valid 경로)를 동시에 실행해,
+이전 방식(호스트별 동시 실행 수만 제한, 429는 그대로 실패)과 CrawlScheduler(속도 제한, Retry-After 백오프, 재시도)를 비교합니다.
+같은 풀로 두 번째 요청도 실행해 호스트 상태가 요청 간에 유지되는지 확인합니다.
+(모든 이미지는 실제로 유효하므로 valid가 images와 같아야 정확한 결과)
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.bench_crawl_scheduler --articles 8 --images 10 --rps 10
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("HOST_HEALTH_CACHE_DB", "")
+os.environ.setdefault("VALIDITY_CACHE_DB", "")
+
+from benchmarks.fixture_server import FixtureServer  # noqa: E402
+from services.crawl_scheduler import CrawlScheduler  # noqa: E402
+from services.http_pool import HttpPool  # noqa: E402
+from services.url_validator import UrlValidator  # noqa: E402
+
+
+def make_articles(base_url: str, articles: int, images: int, rps: int) -> list:
+    return [
+        [f"{base_url}/img/{a}-{k}.jpg?bytes=40000&w=1200&h=675&rps={rps}" for k in range(images)]
+        for a in range(articles)
+    ]
+
+
+def make_pool(mode: str) -> HttpPool:
+    if mode == "scheduler":
+        return HttpPool(scheduler=CrawlScheduler())
+    # 이전 방식: 호스트별 동시 요청 수만 제한하고 429에 반응하지 않음
+    scheduler = CrawlScheduler(rate=1e9, max_wait=0)
+    scheduler.observe = lambda url, status, headers=None: None
+    return HttpPool(scheduler=scheduler)
+
+
+async def run_round(pool: HttpPool, server, articles: list) -> dict:
+    validator = UrlValidator(pool)
+    throttled_before = server.throttled
+    started = time.perf_counter()
+    results = await asyncio.gather(*(validator.filter_valid(images, check_image=True) for images in articles))
+    return {
+        "wall_s": round(time.perf_counter() - started, 3),
+        "valid": sum(map(len, results)),
+        "images": sum(map(len, articles)),
+        "429s": server.throttled - throttled_before,
+    }
+
+
+async def run(args, server, mode: str) -> list:
+    pool = make_pool(mode)
+    articles = make_articles(server.base_url, args.articles, args.images, args.rps)
+    rows = []
+    try:
+        for round_no in (1, 2):
+            row = await run_round(pool, server, articles)
+            row.update({"mode": mode, "round": round_no})
+            rows.append(row)
+            # 다음 요청이 같은 1초 창에 걸리지 않도록 잠시 쉼
+            await asyncio.sleep(1.0)
+        rows[-1]["scheduler"] = pool.scheduler.stats()
+    finally:
+        await pool.aclose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-host crawl scheduling against unthrottled probes")
+    parser.add_argument("--articles", type=int, default=8)
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--rps", type=int, default=10, help="픽스처 CDN이 허용하는 초당 요청 수")
+    args = parser.parse_args()
+
+    with FixtureServer() as server:
+        for mode in ("legacy", "scheduler"):
+            for row in asyncio.run(run(args, server, mode)):
+                print(f"{row['mode']:<9} request={row['round']} wall={row['wall_s']:>6}s "
+                      f"valid={row['valid']}/{row['images']} 429s={row['429s']}")
+                if "scheduler" in row and mode == "scheduler":
+                    stats = row["scheduler"]
+                    print(f"          throttles={stats['throttles']} retries={stats['retries']} "
+                          f"rejected={stats['rejected']} waited={stats['waited_s']}s")
+
+
+if __name__ == "__main__":
+    main()
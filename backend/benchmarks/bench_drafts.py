@@ -0,0 +1,97 @@
+"""
+보관함(DraftStore) 벤치마크입니다.
+임시 DB에 초안 N개(블록 12개씩)를 만든 뒤
+- 목록: 깊은 페이지를 OFFSET으로 가져올 때와 키셋 커서로 가져올 때, 주제별 목록
+- 다시 열기: 초안 하나를 블록/소스까지 모두 읽는 시간 (다시 생성하는 대신)
+- 저장: 블록 하나만 고치는 패치와 문서 전체(블록 전부)를 다시 쓰는 저장
+의 평균 소요 시간(ms)을 출력합니다.
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.bench_drafts --drafts 20000 --page-size 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.drafts_store import DraftStore  # noqa: E402
+
+BLOCK_TYPES = ["header", "main_story", "short_news", "short_news", "short_news", "insight",
+               "main_story", "short_news", "short_news", "quote", "cta", "footer"]
+
+
+def make_newsletter(n: int) -> dict:
+    blocks = [{"id": str(i + 1), "type": t, "content": {"title": f"블록 {i}", "body": "본문 " * 80}}
+              for i, t in enumerate(BLOCK_TYPES)]
+    sources = [{"url": f"https://news.example/{n}/{k}", "title": f"기사 {k}", "content": "요약 " * 60,
+                "associated_images": [f"https://cdn.example/{n}/{k}.jpg"]} for k in range(5)]
+    return {"title": f"뉴스레터 {n}", "blocks": blocks, "images": [s["associated_images"][0] for s in sources],
+            "sources": sources}
+
+
+def timed(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return round((time.perf_counter() - started) / repeat * 1000, 3)
+
+
+def rewrite_document(store: DraftStore, draft_id: str, newsletter: dict):
+    """이전 방식의 저장: 블록 하나만 바뀌어도 문서 전체를 다시 씀"""
+    with store._lock, store._conn:
+        store._conn.execute("DELETE FROM blocks WHERE newsletter_id = ?", (draft_id,))
+        store._conn.executemany(
+            "INSERT INTO blocks (newsletter_id, id, position, type, content, updated_at) VALUES (?, ?, ?, ?, ?, '')",
+            [(draft_id, b["id"], i, b["type"], json.dumps(b["content"], ensure_ascii=False))
+             for i, b in enumerate(newsletter["blocks"])])
+        store._conn.execute("UPDATE newsletters SET sources = ?, images = ? WHERE id = ?",
+                            (json.dumps(newsletter["sources"], ensure_ascii=False),
+                             json.dumps(newsletter["images"]), draft_id))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark draft listing, reopening and block saves")
+    parser.add_argument("--drafts", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = DraftStore(os.path.join(directory, "drafts.db"))
+        started = time.perf_counter()
+        ids = [store.create(f"주제 {n % 50}", make_newsletter(n))["id"] for n in range(args.drafts)]
+        print(f"created {args.drafts} drafts in {time.perf_counter() - started:.1f}s")
+
+        # 목록 마지막 근처 페이지
+        offset = args.drafts - 2 * args.page_size
+        cursor_page = store.list(limit=offset)["next_cursor"]
+
+        def list_offset():
+            with store._lock:
+                store._conn.execute(
+                    "SELECT id, topic, title, status, block_count, created_at, updated_at FROM newsletters "
+                    "ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?", (args.page_size, offset)).fetchall()
+
+        rng = random.Random(7)
+        newsletter = make_newsletter(0)
+        rows = [
+            ("list first page", timed(lambda: store.list(limit=args.page_size), args.repeat)),
+            (f"list page @{offset} OFFSET", timed(list_offset, args.repeat)),
+            (f"list page @{offset} cursor", timed(lambda: store.list(limit=args.page_size, cursor=cursor_page), args.repeat)),
+            ("list by topic", timed(lambda: store.list(topic="주제 7", limit=args.page_size), args.repeat)),
+            ("reopen draft", timed(lambda: store.get(rng.choice(ids)), args.repeat)),
+            ("save: rewrite document", timed(lambda: rewrite_document(store, rng.choice(ids), newsletter), args.repeat)),
+            ("save: patch one block", timed(lambda: store.patch_block(rng.choice(ids), "2", {"body": "수정"}), args.repeat)),
+        ]
+        for name, ms in rows:
+            print(f"{name:<28} {ms:>8} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
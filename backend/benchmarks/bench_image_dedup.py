@@ -0,0 +1,116 @@
+"""
+소스 간 중복 이미지 제거 벤치마크입니다.
+로컬 픽스처 서버의 실제 JPEG 사진을 여러 아티클에 '신디케이션'한 상황을 만듭니다.
+(같은 사진을 다른 호스트/파일명, 다른 리사이즈 파라미터, 다른 화질로 제공)
+이전 방식(정확히 같은 URL만 제거), URL 정규화만, URL + 캐시된 프로브(크기/비율) 단계,
+지각 해시를 요청 안에서 계산(inline), 요청 밖에서 계산해 두고 다음 요청에 반영(background)을 비교해
+남은 중복 사진 수, 잘못 합쳐진 서로 다른 사진 수, 소요 시간, 해시한 이미지 수/받은 바이트를 출력합니다.
+(크롤러와 같이 이미지 랭커가 먼저 헤더를 프로브해 둔 상태에서 측정하며, 프로브 시간은 포함하지 않음)
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.bench_image_dedup --photos 12 --articles 10 --seed 7
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("IMAGE_HASH_CACHE_DB", "")
+os.environ.setdefault("CRAWL_HOST_RATE", "0")  # 픽스처 서버 하나가 여러 CDN을 대신함
+
+from benchmarks.fixture_server import FixtureServer  # noqa: E402
+from services.http_pool import HttpPool  # noqa: E402
+from services.image_dedup import ImageDeduplicator  # noqa: E402
+from services.image_ranker import ImageRanker  # noqa: E402
+
+
+def make_articles(base_url: str, photos: int, article_count: int, rng: random.Random) -> list:
+    port = base_url.rsplit(":", 1)[-1]
+    hosts = [f"http://127.0.0.1:{port}", f"http://localhost:{port}"]
+    articles = []
+    for n in range(article_count):
+        images = []
+        for seed in rng.sample(range(photos), 3):
+            variant = rng.choice(["same", "resize", "cdn", "quality"])
+            host = rng.choice(hosts) if variant == "cdn" else hosts[0]
+            name = f"cdn{rng.randint(0, 99)}" if variant == "cdn" else "photo"
+            width = rng.choice([640, 1024, 320]) if variant in ("resize", "cdn") else 640
+            quality = rng.choice([60, 75, 90]) if variant in ("quality", "cdn") else 85
+            images.append(f"{host}/photo/{seed}/{name}.jpg?w={width}&h={width * 5 // 8}&q={quality}")
+        articles.append({"url": f"{hosts[0]}/article/{n}", "associated_images": images})
+    return articles
+
+
+def seed_of(url: str) -> int:
+    return int(url.split("/photo/", 1)[1].split("/", 1)[0])
+
+
+def evaluate(unique_images: list) -> dict:
+    seeds = [seed_of(url) for url in unique_images]
+    return {
+        "images": len(unique_images),
+        "duplicates_left": len(seeds) - len(set(seeds)),
+    }
+
+
+def copy_articles(articles: list) -> list:
+    return [dict(a, associated_images=list(a["associated_images"])) for a in articles]
+
+
+async def run(articles: list, mode: str) -> dict:
+    expected = len({seed_of(img) for a in articles for img in a["associated_images"]})
+    if mode == "legacy":
+        started = time.perf_counter()
+        unique = list(dict.fromkeys(img for a in articles for img in a["associated_images"]))
+        pool = dedup = None
+    else:
+        pool = HttpPool()
+        ranker = ImageRanker(pool)
+        await asyncio.gather(*(ranker.probe(img) for a in articles for img in a["associated_images"]))
+        dedup = ImageDeduplicator(pool, probe_lookup=ranker.cached_probe)
+        dedup.enabled = dedup.enabled and mode != "url"
+        dedup.hash_mode = {"size": "off", "inline": "inline"}.get(mode, "background")
+        if mode == "background":
+            # 첫 요청은 캐시된 해시 없이 바로 반환하고, 백그라운드 해시가 끝난 뒤의 다음 요청을 측정
+            await dedup.dedupe(copy_articles(articles))
+            await asyncio.gather(*dedup._background)
+        started = time.perf_counter()
+        unique = await dedup.dedupe(copy_articles(articles))
+    elapsed = time.perf_counter() - started
+    result = evaluate(unique)
+    # 서로 다른 사진이 하나로 합쳐졌으면 기대 개수보다 적게 남음
+    result["false_merges"] = max(0, expected - len({seed_of(u) for u in unique}))
+    result["elapsed_ms"] = round(elapsed * 1000, 1)
+    result["hashed"] = result["kb_read"] = 0
+    if dedup is not None:
+        result["hashed"] = dedup.hashed
+        result["kb_read"] = dedup.bytes_read // 1024
+        dedup.close()
+        await pool.aclose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cross-source image deduplication")
+    parser.add_argument("--photos", type=int, default=12)
+    parser.add_argument("--articles", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with FixtureServer() as server:
+        articles = make_articles(server.base_url, args.photos, args.articles, random.Random(args.seed))
+        total = sum(len(a["associated_images"]) for a in articles)
+        print(f"{args.articles} articles, {total} image URLs of {args.photos} distinct photos")
+        for mode in ("legacy", "url", "size", "inline", "background"):
+            r = asyncio.run(run(articles, mode))
+            print(f"{mode:<10} images={r['images']:<4} duplicates_left={r['duplicates_left']:<4} "
+                  f"false_merges={r['false_merges']:<3} elapsed={r['elapsed_ms']}ms "
+                  f"hashed={r['hashed']:<3} read={r['kb_read']}KB")
+
+
+if __name__ == "__main__":
+    main()
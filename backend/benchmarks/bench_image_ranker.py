@@ -0,0 +1,117 @@
+"""
+이미지 선별 벤치마크입니다.
+로컬 픽스처 서버에 추적 픽셀, 배너, 썸네일, 본문/대표 이미지가 섞인 아티클 후보 목록을 만들고
+이전 방식(HEAD + Content-Length 5KB 기준, 앞에서 3개)과 ImageRanker(Range 헤더 프로브 + 점수)의
+선별 품질, 내려받은 바이트, 소요 시간을 비교합니다.
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.bench_image_ranker --articles 40 --seed 7
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_server import FixtureServer  # noqa: E402
+from services.http_pool import HttpPool  # noqa: E402
+from services.image_ranker import ImageRanker  # noqa: E402
+from services.url_validator import UrlValidator  # noqa: E402
+from services.validity_cache import ValidityCache  # noqa: E402
+
+# (이름, 바이트, 너비, 높이, 쓸 만한 이미지인지)
+KINDS = [
+    ("pixel", 20000, 1, 1, False),          # Content-Length가 커 보이는 추적 픽셀
+    ("banner", 60000, 728, 90, False),      # 가로로 긴 광고 배너
+    ("thumb", 8000, 120, 80, False),        # 작은 썸네일
+    ("spacer", 3000, 64, 64, False),
+    ("body", 90000, 1024, 768, True),
+    ("photo", 150000, 1600, 900, True),
+    ("portrait", 70000, 600, 800, True),
+]
+FORMATS = ("png", "jpeg", "webp", "gif")
+
+
+def make_articles(base_url: str, count: int, rng: random.Random) -> list:
+    articles = []
+    for n in range(count):
+        fmt = rng.choice(FORMATS)
+        og = f"{base_url}/img/{n}-og.jpg?bytes=80000&w=1200&h=630&fmt={fmt}"
+        body = []
+        for k in range(rng.randint(4, 8)):
+            name, size, width, height, _ = rng.choice(KINDS)
+            body.append(f"{base_url}/img/{n}-{name}{k}.jpg?bytes={size}&w={width}&h={height}&fmt={rng.choice(FORMATS)}")
+        # 페이지 순서상 og:image는 메타 태그지만 <img> 뒤에 수집되는 경우도 있음
+        candidates = body + [og] if rng.random() < 0.5 else [og] + body
+        articles.append({"candidates": candidates, "meta": [og]})
+    return articles
+
+
+def is_good(url: str) -> bool:
+    name = url.rsplit("/", 1)[-1].split("?", 1)[0]
+    if "-og" in name:
+        return True
+    return any(kind[4] for kind in KINDS if f"-{kind[0]}" in name)
+
+
+def full_size(url: str) -> int:
+    return int(url.split("bytes=", 1)[1].split("&", 1)[0])
+
+
+async def run_legacy(articles: list) -> dict:
+    pool = HttpPool()
+    validator = UrlValidator(pool, ValidityCache())
+    started = time.perf_counter()
+    picks = await asyncio.gather(*(validator.filter_valid(a["candidates"][:10], check_image=True) for a in articles))
+    elapsed = time.perf_counter() - started
+    await pool.aclose()
+    return summarize([p[:3] for p in picks], articles, elapsed, bytes_read=0)
+
+
+async def run_ranker(articles: list) -> dict:
+    pool = HttpPool()
+    ranker = ImageRanker(pool)
+    started = time.perf_counter()
+    picks = await asyncio.gather(*(ranker.select(a["candidates"][:10], meta=a["meta"], limit=3) for a in articles))
+    elapsed = time.perf_counter() - started
+    await pool.aclose()
+    return summarize(picks, articles, elapsed, bytes_read=ranker.bytes_read)
+
+
+def summarize(picks: list, articles: list, elapsed: float, bytes_read: int) -> dict:
+    selected = [url for p in picks for url in p]
+    good = sum(is_good(url) for url in selected)
+    return {
+        "selected": len(selected),
+        "precision": round(good / len(selected), 3) if selected else 0.0,
+        "og_first": round(sum(bool(p) and "-og" in p[0] for p in picks) / len(articles), 3),
+        "probe_kb": round(bytes_read / 1024, 1),
+        "elapsed_ms": round(elapsed * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark article image selection (HEAD heuristic vs ranged header probes)")
+    parser.add_argument("--articles", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.setdefault("VALIDITY_CACHE_DB", "")
+    os.environ.setdefault("IMAGE_PROBE_CACHE_DB", "")
+    # 픽스처 서버 하나가 여러 사이트를 대신하므로 호스트별 요청 속도 제한은 끔
+    os.environ.setdefault("CRAWL_HOST_RATE", "0")
+    with FixtureServer() as server:
+        articles = make_articles(server.base_url, args.articles, random.Random(args.seed))
+        full_kb = sum(full_size(c) for a in articles for c in a["candidates"][:10]) / 1024
+        print(f"{len(articles)} articles, full download of all candidates would be {full_kb:.0f} KB")
+        for name, runner in (("legacy", run_legacy), ("ranker", run_ranker)):
+            r = asyncio.run(runner(articles))
+            print(f"{name:<7} selected={r['selected']:<4} precision={r['precision']:<6} og_first={r['og_first']:<6} "
+                  f"probe_kb={r['probe_kb']:<8} elapsed={r['elapsed_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
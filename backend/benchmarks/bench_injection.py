@@ -0,0 +1,143 @@
+"""
+링크/이미지 주입 벤치마크입니다.
+블록/소스 수를 늘려가며 합성 뉴스레터를 만들고, 이전 구현(_process_injection)과 InjectionEngine의
+처리 시간과 주입 품질(남은 잘못된 링크, 소스/이미지 중복 배정)을 비교합니다.
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.bench_injection --sizes 12x5,50x10,200x30,1000x100
+"""
+import os
+import sys
+import copy
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.injection import InjectionEngine  # noqa: E402
+
+
+# --- 이전 구현 (비교 기준) ---
+
+def legacy_process_injection(content: dict, valid_sources: list, valid_urls: list, all_images: list, index: int):
+    try:
+        link = content.get('link') or content.get('url')
+        current_source = None
+        is_invalid_link = not link or "example.com" in link or (valid_urls and link not in valid_urls)
+        if is_invalid_link:
+            if valid_sources:
+                current_source = valid_sources[index % len(valid_sources)]
+                injected_url = current_source.get('url')
+                if 'link' in content: content['link'] = injected_url
+                if 'url' in content: content['url'] = injected_url
+        else:
+            current_source = next((s for s in valid_sources if s.get('url') == link), None)
+        if current_source and current_source.get('associated_images'):
+            content['image_url'] = current_source['associated_images'][0]
+        elif not content.get('image_url') or (all_images and content.get('image_url') not in all_images):
+            if all_images:
+                content['image_url'] = all_images[index % len(all_images)]
+        return current_source
+    except Exception:
+        return None
+
+
+def legacy_inject(blocks, sources, urls, images):
+    for i, block in enumerate(blocks):
+        legacy_process_injection(block.get('content', {}), sources, urls, images, i)
+    return blocks
+
+
+def engine_inject(blocks, sources, urls, images):
+    return InjectionEngine(sources, urls, images).inject_all(blocks)
+
+
+# --- 합성 데이터 ---
+
+def make_request(block_count: int, source_count: int, rng: random.Random):
+    sources = [{
+        "title": f"Source {i}",
+        "url": f"https://news{i % 7}.example.org/article/{i}?utm_source=feed",
+        "associated_images": [f"https://cdn{i % 5}.example.org/img/{i}-{k}.jpg" for k in range(rng.randint(0, 3))],
+    } for i in range(source_count)]
+    urls = [s["url"] for s in sources]
+    images = [img for s in sources for img in s["associated_images"]]
+
+    def link():
+        roll = rng.random()
+        if roll < 0.4:
+            return rng.choice(urls)
+        if roll < 0.7:
+            return "https://example.com/placeholder"
+        return f"https://hallucinated.example.net/{rng.randint(0, 10**6)}"
+
+    blocks = []
+    for i in range(block_count):
+        kind = rng.choice(["main_story", "main_story", "short_news", "tool_spotlight", "deep_dive", "header"])
+        if kind == "main_story":
+            content = {"title": f"Story {i}", "body": "...", "link": link(), "image_url": "URL"}
+        elif kind == "short_news":
+            content = {"title": "News Briefs", "news_items": [{"emoji": "🚀", "text": f"item {k}", "link": link()} for k in range(4)]}
+        elif kind == "tool_spotlight":
+            content = {"name": f"Tool {i}", "description": "...", "link": link()}
+        else:
+            content = {"title": f"Block {i}", "body": "..."}
+        blocks.append({"id": str(i + 1), "type": kind, "content": content})
+    return blocks, sources, urls, images
+
+
+def quality(blocks, urls, images) -> dict:
+    valid = set(urls)
+    links, invalid, story_images = [], 0, []
+    for block in blocks:
+        content = block["content"]
+        entries = [content] + [item for item in content.get("news_items", []) if isinstance(item, dict)]
+        for entry in entries:
+            if "link" in entry:
+                links.append(entry["link"])
+                invalid += entry["link"] not in valid
+        if block["type"] == "main_story" and content.get("image_url"):
+            story_images.append(content["image_url"])
+    return {
+        "invalid_links": invalid,
+        "distinct_links": len(set(links)),
+        "story_images": len(story_images),
+        "distinct_story_images": len(set(story_images)),
+    }
+
+
+def run(size: str, repeat: int, seed: int) -> dict:
+    block_count, source_count = (int(x) for x in size.split("x"))
+    rng = random.Random(seed)
+    blocks, sources, urls, images = make_request(block_count, source_count, rng)
+    row = {"blocks": block_count, "sources": source_count}
+    for name, inject in (("legacy", legacy_inject), ("engine", engine_inject)):
+        samples = [copy.deepcopy(blocks) for _ in range(repeat)]
+        started = time.perf_counter()
+        for sample in samples:
+            inject(sample, sources, urls, images)
+        row[f"{name}_us"] = round((time.perf_counter() - started) / repeat * 1e6, 1)
+        row[name] = quality(samples[0], urls, images)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark link/image injection for newsletters of growing size")
+    parser.add_argument("--sizes", default="12x5,50x10,200x30,1000x100", help="블록수x소스수 목록")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for size in args.sizes.split(","):
+        row = run(size, args.repeat, args.seed)
+        print(f"{row['blocks']:>5} blocks / {row['sources']:>3} sources  "
+              f"legacy={row['legacy_us']:>9}us engine={row['engine_us']:>9}us")
+        for name in ("legacy", "engine"):
+            q = row[name]
+            print(f"    {name:<7} invalid_links={q['invalid_links']:<5} distinct_links={q['distinct_links']:<5} "
+                  f"story_images={q['distinct_story_images']}/{q['story_images']} distinct")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+LLM 응답 JSON 파서 퍼징/벤치마크입니다.
+녹화된 뉴스레터 응답(fixtures/newsletter.json)을 LLM이 흔히 내는 형태로 망가뜨린 뒤
+이전 구현(regex 정제 + json.loads)과 현재 관대한 파서의 파싱 성공률, 복구한 블록 비율, 속도를 비교합니다.
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.bench_json_parser --cases 500 --seed 7
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import load_fixture  # noqa: E402
+from benchmarks.run_pipeline import percentile  # noqa: E402
+from utils.json_parser import parse_ai_json, IncrementalBlockParser  # noqa: E402
+
+
+# --- 이전 구현 (비교 기준) ---
+
+def legacy_clean_json_text(text: str) -> str:
+    import re
+    text = text.strip()
+    if "```" in text:
+        json_match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
+        if json_match:
+            text = json_match.group(1)
+        else:
+            block_match = re.search(r'```\s*(.*?)\s*```', text, re.DOTALL)
+            if block_match:
+                text = block_match.group(1)
+    text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+    return text.strip()
+
+
+def legacy_parse_ai_json(text: str):
+    return json.loads(legacy_clean_json_text(text))
+
+
+# --- 변형(mutation) 생성 ---
+
+def _fence(doc, rng):
+    return f"```json\n{doc}\n```"
+
+
+def _prose(doc, rng):
+    return f"물론입니다! 요청하신 뉴스레터입니다.\n\n{doc}\n\n추가로 수정할 부분이 있으면 알려주세요."
+
+
+def _trailing_commas(doc, rng):
+    return doc.replace("}", ",}").replace("]", ",]").replace("{,}", "{}").replace("[,]", "[]")
+
+
+def _raw_newlines(doc, rng):
+    # 문자열 안의 \n 이스케이프를 실제 줄바꿈으로
+    return doc.replace("\\n", "\n")
+
+
+def _truncate(doc, rng):
+    return doc[:rng.randint(len(doc) // 3, len(doc) - 1)]
+
+
+def _corrupt_block(doc, rng):
+    # 블록 하나의 값 따옴표를 깨뜨림
+    marker = '"type": "'
+    positions = [i for i in range(len(doc)) if doc.startswith(marker, i)]
+    pos = rng.choice(positions) + len(marker)
+    return doc[:pos - 1] + doc[pos:]
+
+
+MUTATIONS = {
+    "fence": _fence,
+    "prose": _prose,
+    "trailing_commas": _trailing_commas,
+    "raw_newlines": _raw_newlines,
+    "truncate": _truncate,
+    "corrupt_block": _corrupt_block,
+}
+
+
+def make_cases(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    base = load_fixture("newsletter.json")
+    cases = [("valid", [], json.dumps(base, ensure_ascii=False, indent=2))]
+    names = list(MUTATIONS)
+    for _ in range(count - 1):
+        chosen = rng.sample(names, rng.randint(1, 3))
+        doc = json.dumps(base, ensure_ascii=False, indent=rng.choice([None, 2]))
+        # 잘림은 항상 마지막에 적용 (펜스/설명 뒤에서 잘리는 경우 포함)
+        for name in sorted(chosen, key=lambda n: n == "truncate"):
+            doc = MUTATIONS[name](doc, rng)
+        cases.append(("+".join(sorted(chosen)), chosen, doc))
+    return cases, len(base["blocks"])
+
+
+def evaluate(parse, cases: list, total_blocks: int, repeat: int) -> dict:
+    ok, recovered, timings = 0, 0, []
+    by_mutation = {}
+    for label, chosen, text in cases:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            try:
+                data = parse(text)
+            except Exception:
+                data = None
+        timings.append((time.perf_counter() - started) / repeat)
+        blocks = len(data.get("blocks", [])) if isinstance(data, dict) and isinstance(data.get("blocks"), list) else 0
+        success = blocks > 0
+        ok += success
+        recovered += blocks
+        for name in chosen or ["valid"]:
+            stats = by_mutation.setdefault(name, [0, 0])
+            stats[0] += success
+            stats[1] += 1
+    return {
+        "success_rate": round(ok / len(cases), 3),
+        "block_recovery": round(recovered / (total_blocks * len(cases)), 3),
+        "p50_us": round(percentile(timings, 50) * 1e6, 1),
+        "p95_us": round(percentile(timings, 95) * 1e6, 1),
+        "by_mutation": {k: round(v[0] / v[1], 3) for k, v in sorted(by_mutation.items())},
+    }
+
+
+def streamed(text: str, chunk: int = 32):
+    """스트리밍 경로: 조각 단위로 넣고 finish()로 마무리"""
+    parser = IncrementalBlockParser()
+    for i in range(0, len(text), chunk):
+        parser.feed(text[i:i + chunk])
+    return parser.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzz/benchmark the tolerant LLM JSON parser against the legacy one")
+    parser.add_argument("--cases", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=5, help="케이스별 반복 측정 횟수")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    cases, total_blocks = make_cases(args.cases, args.seed)
+    report = {
+        "cases": len(cases),
+        "legacy": evaluate(legacy_parse_ai_json, cases, total_blocks, args.repeat),
+        "tolerant": evaluate(parse_ai_json, cases, total_blocks, args.repeat),
+        "incremental": evaluate(streamed, cases, total_blocks, 1),
+    }
+    for name in ("legacy", "tolerant", "incremental"):
+        r = report[name]
+        print(f"{name:<12} success={r['success_rate']:<6} blocks={r['block_recovery']:<6} "
+              f"p50={r['p50_us']:>9}us p95={r['p95_us']:>9}us")
+        print(f"{'':<12} " + "  ".join(f"{k}={v}" for k, v in r["by_mutation"].items()))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
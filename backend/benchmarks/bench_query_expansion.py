@@ -0,0 +1,126 @@
+"""
+검색어 확장(expand_queries) 벤치마크입니다.
+가짜 Tavily(쿼리마다 결과 순서가 다르고 URL은 겹침)와 로컬 픽스처 서버로
+- single: 원래 주제 하나만 검색
+- naive: 확장이 끝난 뒤 검색어마다 크롤링 전체(검색 + 아티클 수집)를 따로 실행하고 결과를 이어 붙임
+- fused: 원래 주제 검색과 확장을 동시에 시작하고, 확장 검색어를 병렬 검색한 뒤 URL 기준 RRF로 합쳐 한 번만 수집
+을 비교해 소요 시간, Tavily 호출 수, 아티클 수집(이미지 추출) 횟수, 고유 아티클 수를 출력합니다.
+fused는 확장 결과가 캐시에 없는 경우(cold)와 있는 경우(warm)를 모두 측정합니다.
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.bench_query_expansion --topics 5 --expansion-latency 0.6 --browser skip
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("QUERY_EXPANSION_CACHE_DB", "")
+
+from benchmarks.fixture_server import FixtureServer  # noqa: E402
+from benchmarks.run_pipeline import Harness, configure_env  # noqa: E402
+
+
+class Counter:
+    def __init__(self, func):
+        self.func = func
+        self.calls = 0
+
+    async def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return await self.func(*args, **kwargs)
+
+
+def install_fakes(harness, expansion_latency: float):
+    async def complete(prompt):
+        await asyncio.sleep(expansion_latency)
+        topic = prompt.split("'", 2)[1]
+        return f'["{topic} 기술 동향", "{topic} 시장 영향", "{topic} 도입 사례"]'
+
+    expander = harness.main.ai_gen.query_expander
+    expander.complete = complete
+    extractor = harness.main.crawler.image_extractor
+    extractor.extract = Counter(extractor.extract)
+    return extractor.extract
+
+
+async def run_single(crawler, expander, topic, max_results):
+    return await crawler.search_and_extract_async(topic, max_results=max_results)
+
+
+async def run_naive(crawler, expander, topic, max_results):
+    queries = [topic] + await expander.expand(topic)
+    results = await asyncio.gather(*(crawler.search_and_extract_async(q, max_results=max_results) for q in queries))
+    return [article for result in results for article in result['articles']]
+
+
+async def run_fused(crawler, expander, topic, max_results):
+    expansion = asyncio.ensure_future(expander.expand(topic))
+    return await crawler.search_and_extract_async(topic, max_results=max_results, extra_queries=expansion)
+
+
+def unique_articles(result) -> int:
+    articles = result['articles'] if isinstance(result, dict) else result
+    return len({a['url'] for a in articles})
+
+
+async def run(args) -> list:
+    rows = []
+    with FixtureServer() as server:
+        harness = Harness(args, server.base_url)
+        harness.tavily.unique_urls = False
+        extract_calls = install_fakes(harness, args.expansion_latency)
+        crawler, expander = harness.main.crawler, harness.main.ai_gen.query_expander
+        topics = [f"확장 주제 {i}" for i in range(args.topics)]
+        modes = (("single", run_single), ("naive", run_naive), ("fused_cold", run_fused), ("fused_warm", run_fused))
+        try:
+            for mode, runner in modes:
+                walls, unique = [], 0
+                tavily_before, extract_before = harness.tavily.calls, extract_calls.calls
+                if mode == "fused_cold":
+                    # naive 단계에서 채워진 확장 결과 캐시를 비움
+                    expander._cache.memory.clear()
+                for topic in topics:
+                    # 주제마다 아티클/검색 캐시를 비움 (확장 결과 캐시는 유지해 warm 측정에 사용)
+                    harness.reset_caches()
+                    started = time.perf_counter()
+                    result = await runner(crawler, expander, topic, args.max_results)
+                    walls.append(time.perf_counter() - started)
+                    unique += unique_articles(result)
+                rows.append({
+                    "mode": mode,
+                    "wall_s": round(sum(walls) / len(walls), 3),
+                    "tavily_calls": harness.tavily.calls - tavily_before,
+                    "enrichments": extract_calls.calls - extract_before,
+                    "unique_articles": unique,
+                })
+        finally:
+            crawler.image_dedup.close()
+            await harness.main.browser_pool.stop()
+            await harness.main.http_pool.aclose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fused multi-query search against single and naive expansion")
+    parser.add_argument("--topics", type=int, default=5)
+    parser.add_argument("--max-results", type=int, default=5)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--expansion-latency", type=float, default=0.6)
+    parser.add_argument("--browser", choices=("real", "skip"), default="skip")
+    args = parser.parse_args()
+    # Harness가 사용하는 나머지 옵션
+    args.llm_latency, args.analysis_latency = 0.0, 0.0
+    args.context_mode, args.prompt_cache, args.warm, args.unique_topics = "full", True, False, True
+
+    configure_env()
+    for row in asyncio.run(run(args)):
+        print(f"{row['mode']:<11} wall={row['wall_s']:>6}s/topic tavily={row['tavily_calls']:<3} "
+              f"enrichments={row['enrichments']:<3} unique_articles={row['unique_articles']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+벤치마크용 외부 서비스 대역(stand-in)입니다.
+Tavily / Gemini / OpenAI 클라이언트와 같은 인터페이스를 제공하되,
+녹화된 결과와 설정 가능한 지연 시간으로 동작합니다.
+"""
+import os
+import json
+import time
+import asyncio
+import zlib
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name: str):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FakeTavilyClient:
+    """녹화된 Tavily 결과를 로컬 픽스처 서버 URL로 치환하여 반환합니다. (동기 SDK와 동일한 블로킹 호출)"""
+
+    def __init__(self, base_url: str, latency: float = 0.3, unique_urls: bool = True):
+        self.base_url = base_url
+        self.latency = latency
+        # True이면 쿼리마다 아티클 URL이 달라져 아티클 캐시가 적중하지 않음
+        self.unique_urls = unique_urls
+        self.calls = 0
+        self._template = load_fixture("tavily_results.json")
+
+    def search(self, query: str, max_results: int = 5, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        raw = json.dumps(self._template, ensure_ascii=False)
+        raw = raw.replace("{base}", self.base_url).replace("{query}", query)
+        data = json.loads(raw)
+        # 쿼리마다 다른 결과 순서를 흉내냄 (fusion/중복 제거 벤치마크용)
+        offset = sum(map(ord, query)) % len(data["results"])
+        rotated = data["results"][offset:] + data["results"][:offset]
+        data["results"] = rotated[:max_results]
+        if self.unique_urls:
+            tag = zlib.crc32(query.encode("utf-8"))
+            for r in data["results"]:
+                r["url"] += f"&q={tag}"
+        return data
+
+
+class _Usage:
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = completion_tokens
+        self.cached_content_token_count = 0
+        self.prompt_tokens_details = None
+
+
+class _GeminiResponse:
+    def __init__(self, text: str, prompt_chars: int, cached_chars: int = 0):
+        self.text = text
+        self.usage_metadata = _Usage((prompt_chars + cached_chars) // 3, len(text) // 3)
+        self.usage_metadata.cached_content_token_count = cached_chars // 3
+
+
+class _FakeGeminiModels:
+    def __init__(self, owner):
+        self.owner = owner
+
+    async def generate_content(self, model: str, contents, config=None):
+        self.owner.calls += 1
+        latency = self.owner.analysis_latency if model.startswith("gemini-2.0") else self.owner.latency
+        await asyncio.sleep(latency)
+        text = self.owner.analysis_text if model.startswith("gemini-2.0") else self.owner.response_text
+        cached_chars = self.owner.cached.get(getattr(config, "cached_content", None), 0)
+        return _GeminiResponse(text, len(str(contents)), cached_chars)
+
+    async def generate_content_stream(self, model: str, contents, config=None):
+        self.owner.calls += 1
+        text = self.owner.response_text
+        chunk_count = max(1, self.owner.stream_chunks)
+        size = max(1, len(text) // chunk_count)
+        delay = self.owner.latency / chunk_count
+
+        async def iterate():
+            for i in range(0, len(text), size):
+                await asyncio.sleep(delay)
+                yield _GeminiResponse(text[i:i + size], 0)
+        return iterate()
+
+
+class _FakeCaches:
+    def __init__(self, owner):
+        self.owner = owner
+
+    async def create(self, model: str, config=None):
+        if not self.owner.cache_support:
+            raise RuntimeError("context caching is disabled in the benchmark")
+        name = f"cachedContents/bench-{len(self.owner.cached) + 1}"
+        self.owner.cached[name] = len(str(getattr(config, "system_instruction", "")))
+        return _Obj(name=name)
+
+
+class FakeGeminiClient:
+    """google-genai Client의 비동기 인터페이스(client.aio.models)를 흉내냅니다."""
+
+    def __init__(self, latency: float = 2.0, analysis_latency: float = 1.0, stream_chunks: int = 40,
+                 cache_support: bool = True):
+        self.latency = latency
+        self.analysis_latency = analysis_latency
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+        self.response_text = json.dumps(load_fixture("newsletter.json"), ensure_ascii=False)
+        self.analysis_text = "정제된 지식 베이스: 벤치마크용 분석 결과입니다."
+        self.aio = self
+        self.models = _FakeGeminiModels(self)
+        self.cache_support = cache_support
+        self.cached = {}  # cached content 이름 -> 접두부 길이
+        self.caches = _FakeCaches(self)
+
+
+class _FakeCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    async def create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        self.owner.calls += 1
+        text = self.owner.response_text
+        if stream:
+            chunk_count = max(1, self.owner.stream_chunks)
+            size = max(1, len(text) // chunk_count)
+            delay = self.owner.latency / chunk_count
+
+            async def iterate():
+                for i in range(0, len(text), size):
+                    await asyncio.sleep(delay)
+                    yield _Obj(choices=[_Obj(delta=_Obj(content=text[i:i + size]))])
+            return iterate()
+        await asyncio.sleep(self.owner.latency)
+        prompt_chars = sum(len(m.get("content", "")) for m in messages)
+        return _Obj(
+            choices=[_Obj(message=_Obj(content=text))],
+            usage=_Usage(prompt_chars // 3, len(text) // 3),
+        )
+
+
+class _Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeOpenAIClient:
+    """AsyncOpenAI의 chat.completions.create 인터페이스를 흉내냅니다."""
+
+    def __init__(self, latency: float = 2.5, stream_chunks: int = 40):
+        self.latency = latency
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+        self.response_text = json.dumps(load_fixture("newsletter.json"), ensure_ascii=False)
+        self.chat = _Obj(completions=_FakeCompletions(self))
@@ -0,0 +1,208 @@
+"""
+벤치마크용 로컬 HTTP 서버입니다.
+실제 뉴스 사이트 대신 아티클 HTML과 다양한 크기/지연의 이미지를 제공합니다.
+
+- /article/{n}?delay_ms=..&images=..  : og:image / twitter:image / <img> 태그가 포함된 HTML
+- /img/{name}.jpg?bytes=..&w=..&h=..&fmt=png|jpeg|webp|gif&delay_ms=.. : 헤더가 유효한 지정 크기의 이미지
+- /photo/{seed}/{name}.jpg?w=..&h=..&q=.. : seed로 결정되는 실제 디코딩 가능한 JPEG 사진 (Pillow 필요)
+- 모든 경로에 rps=N을 붙이면 Host별로 초당 N건을 넘는 요청에 429(Retry-After: 1)를 반환
+"""
+import sys
+import time
+import struct
+import zlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+
+def _png_bytes(width: int, height: int, size: int) -> bytes:
+    """지정한 크기(바이트)로 패딩된, 헤더가 유효한 PNG 데이터를 만듭니다."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    header = b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    body = chunk(b"IDAT", zlib.compress(b"\x00" * 64)) + chunk(b"IEND", b"")
+    padding = max(0, size - len(header) - len(body) - 12)
+    return header + chunk(b"tEXt", b"x" * padding) + body
+
+
+def _jpeg_bytes(width: int, height: int, size: int) -> bytes:
+    """SOF0 앞에 EXIF 크기의 APP1 세그먼트를 둔 JPEG 데이터 (크기 정보가 몇 KB 뒤에 있는 경우)"""
+    app1 = b"\xff\xe1" + struct.pack(">H", 6002) + b"Exif\x00\x00" + b"x" * 5994
+    sof = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    data = b"\xff\xd8" + app1 + sof + b"\xff\xda"
+    return data + b"\x00" * max(0, size - len(data) - 2) + b"\xff\xd9"
+
+
+def _webp_bytes(width: int, height: int, size: int) -> bytes:
+    vp8x = b"VP8X" + struct.pack("<I", 10) + b"\x00" * 4 + (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little")
+    data = vp8x + b"\x00" * max(0, size - len(vp8x) - 12)
+    return b"RIFF" + struct.pack("<I", len(data) + 4) + b"WEBP" + data
+
+
+def _gif_bytes(width: int, height: int, size: int) -> bytes:
+    data = b"GIF89a" + struct.pack("<HH", width, height) + b"\x00\x00\x00"
+    return data + b"\x00" * max(0, size - len(data) - 1) + b";"
+
+
+def _photo_bytes(seed: int, width: int, height: int, quality: int) -> bytes:
+    """seed마다 다른 도형 구성의 사진을 그려 지정 크기/화질의 JPEG로 인코딩합니다."""
+    import io
+    import random
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    img = Image.new("RGB", (640, 400), tuple(rng.randint(0, 255) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randint(0, 600), rng.randint(0, 360)
+        box = (x, y, x + rng.randint(40, 320), y + rng.randint(40, 240))
+        draw.ellipse(box, fill=tuple(rng.randint(0, 255) for _ in range(3)))
+    out = io.BytesIO()
+    img.resize((width, height)).save(out, "JPEG", quality=quality)
+    return out.getvalue()
+
+
+IMAGE_FORMATS = {
+    "png": ("image/png", _png_bytes),
+    "jpeg": ("image/jpeg", _jpeg_bytes),
+    "webp": ("image/webp", _webp_bytes),
+    "gif": ("image/gif", _gif_bytes),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _params(self):
+        parts = urlsplit(self.path)
+        return parts.path, {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+    def _delay(self, params):
+        delay_ms = int(params.get("delay_ms", 0))
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+    def _throttled(self, params) -> bool:
+        """Host별 1초 고정 창에서 rps를 넘었는지 확인합니다."""
+        rps = int(params.get("rps", 0))
+        if not rps:
+            return False
+        server = self.server
+        with server.lock:
+            now = time.monotonic()
+            window, count = server.windows.get(self.headers.get("Host"), (now, 0))
+            if now - window >= 1.0:
+                window, count = now, 0
+            server.windows[self.headers.get("Host")] = (window, count + 1)
+            if count < rps:
+                return False
+            server.throttled += 1
+            return True
+
+    def _body(self):
+        path, params = self._params()
+        if self._throttled(params):
+            return 429, "text/plain", b""
+        self._delay(params)
+        base = f"http://{self.headers.get('Host')}"
+        if path.startswith("/article/"):
+            n = path.rsplit("/", 1)[-1]
+            count = int(params.get("images", 3))
+            imgs = "".join(
+                f'<img src="{base}/img/{n}-body{k}.jpg?bytes={[3000, 60000, 150000][k % 3]}&w={[64, 1200, 1600][k % 3]}&h={[64, 675, 900][k % 3]}">'
+                for k in range(count)
+            )
+            html = (
+                f'<html><head><meta property="og:image" content="{base}/img/{n}-og.jpg?bytes=80000&w=1200&h=630">'
+                f'<meta name="twitter:image" content="{base}/img/{n}-tw.jpg?bytes=50000&w=1024&h=512">'
+                f'<title>Article {n}</title></head><body><p>본문</p>{imgs}'
+                f'<img src="{base}/img/logo.png?bytes=900&w=32&h=32"></body></html>'
+            )
+            return 200, "text/html; charset=utf-8", html.encode("utf-8")
+        if path.startswith("/photo/"):
+            seed = int(path.split("/")[2])
+            body = _photo_bytes(seed, int(params.get("w", 640)), int(params.get("h", 400)), int(params.get("q", 85)))
+            return 200, "image/jpeg", body
+        if path.startswith("/img/"):
+            size = int(params.get("bytes", 40000))
+            width = int(params.get("w", 800))
+            height = int(params.get("h", 600))
+            content_type, build = IMAGE_FORMATS[params.get("fmt", "png")]
+            return 200, content_type, build(width, height, size)
+        return 404, "text/plain", b"not found"
+
+    def _send_status(self, status: int):
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "1")
+
+    def do_HEAD(self):
+        status, content_type, body = self._body()
+        self._send_status(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+    def do_GET(self):
+        status, content_type, body = self._body()
+        range_header = self.headers.get("Range")
+        if status == 200 and range_header and range_header.startswith("bytes="):
+            start, _, end = range_header[6:].partition("-")
+            start = int(start or 0)
+            end = min(int(end) if end else len(body) - 1, len(body) - 1)
+            part = body[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+            body = part
+        else:
+            self._send_status(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.windows = {}
+        self.throttled = 0  # 반환한 429 응답 수
+
+    def handle_error(self, request, client_address):
+        # 클라이언트가 취소/타임아웃으로 연결을 끊는 경우는 정상 시나리오
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class FixtureServer:
+    """백그라운드 스레드에서 동작하는 픽스처 서버 (with 문으로 사용)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = _Server((host, port), _Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def throttled(self) -> int:
+        return self._server.throttled
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
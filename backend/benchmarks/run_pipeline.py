@@ -0,0 +1,243 @@
+"""
+생성 파이프라인 오프라인 벤치마크입니다.
+Tavily / Gemini / OpenAI / 아티클 사이트를 로컬 대역으로 바꾼 뒤
+CrawlerService, AIGeneratorService, FastAPI 앱(/api/generate)을 동시성 단계별로 호출하고
+p50/p95/p99 지연 시간, 초당 요청 수, 최대 RSS를 JSON으로 저장합니다.
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.run_pipeline --target all --concurrency 1,4,16 --requests 16
+    python -m benchmarks.run_pipeline --compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeTavilyClient, FakeGeminiClient, FakeOpenAIClient  # noqa: E402
+from benchmarks.fixture_server import FixtureServer  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+TARGETS = ("crawler", "generator", "app")
+
+
+def configure_env():
+    """실제 키/영속 캐시 없이 서비스가 초기화되도록 환경 변수를 설정합니다."""
+    for key in ("TAVILY_API_KEY", "GEMINI_API_KEY", "OPENAI_API_KEY", "STIBEE_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ.setdefault("STIBEE_LIST_ID", "1")
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="newsletter-bench-"))
+    # 디스크 캐시를 끄고 매 실행을 콜드 상태로 시작
+    for prefix in ("ARTICLE_CACHE", "VALIDITY_CACHE", "IMAGE_PROBE_CACHE", "IMAGE_HASH_CACHE", "QUERY_EXPANSION_CACHE", "HOST_HEALTH_CACHE", "SEARCH_CACHE", "RENDER_MEMORY", "REFINEMENT_CACHE", "RUN_STORE"):
+        os.environ.setdefault(f"{prefix}_DB", "")
+    # 픽스처 서버 하나가 여러 사이트를 대신하므로 호스트별 요청 속도 제한은 끔 (동시 실행 수 제한과 백오프는 유지)
+    os.environ.setdefault("CRAWL_HOST_RATE", "0")
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def peak_rss_mb() -> float:
+    # Linux는 KB, macOS는 바이트 단위
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+class Harness:
+    def __init__(self, args, base_url: str):
+        self.args = args
+        self.base_url = base_url
+        import main  # 환경 변수 설정 이후에 임포트
+        self.main = main
+        self.tavily = FakeTavilyClient(base_url, latency=args.search_latency)
+        self.gemini = FakeGeminiClient(latency=args.llm_latency, analysis_latency=args.analysis_latency,
+                                       cache_support=args.prompt_cache)
+        self.openai = FakeOpenAIClient(latency=args.llm_latency)
+        self.install()
+
+    def install(self):
+        crawler, ai_gen = self.main.crawler, self.main.ai_gen
+        crawler.client = self.tavily
+        crawler.search_cache.client = self.tavily
+        ai_gen.gemini_client = self.gemini
+        ai_gen.prefix_cache.client = self.gemini
+        ai_gen.openai_client = self.openai
+        if self.args.browser == "skip":
+            async def no_browser(url):
+                return []
+            crawler._scrape_images_with_playwright = no_browser
+            crawler.image_extractor.render = no_browser
+
+    def reset_caches(self):
+        """동시성 단계마다 인메모리 캐시를 비워 콜드 상태에서 측정합니다."""
+        from services.search_cache import SearchCache
+        from services.article_cache import ArticleCache
+        from services.validity_cache import ValidityCache
+        from services.image_ranker import ImageRanker
+        from services.refinement_cache import RefinementCache
+        crawler = self.main.crawler
+        crawler.search_cache = SearchCache(self.tavily)
+        crawler.article_cache = ArticleCache()
+        crawler.url_validator.cache = ValidityCache()
+        crawler.image_ranker = ImageRanker(crawler.http_pool)
+        self.main.ai_gen.refinement_cache = RefinementCache()
+
+    def topic(self, i: int) -> str:
+        return f"벤치마크 주제 {i}" if self.args.unique_topics else "벤치마크 주제"
+
+    async def call(self, target: str, i: int, client=None):
+        topic = self.topic(i)
+        if target == "crawler":
+            await self.main.crawler.search_and_extract_async(topic, max_results=self.args.max_results)
+        elif target == "generator":
+            articles = self.tavily.search(topic, max_results=self.args.max_results)["results"]
+            context = "\n".join(a["content"] for a in articles)
+            await self.main.ai_gen.generate_newsletter(topic=topic, raw_context=context, articles=articles,
+                                                       context_mode=self.args.context_mode)
+        else:
+            response = await client.post("/api/generate", json={
+                "topic": topic, "max_results": self.args.max_results, "context_mode": self.args.context_mode})
+            response.raise_for_status()
+
+    async def run_level(self, target: str, concurrency: int) -> dict:
+        import httpx
+        if not self.args.warm:
+            self.reset_caches()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        errors = 0
+        transport = httpx.ASGITransport(app=self.main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            async def one(i):
+                nonlocal errors
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        await self.call(target, i, client)
+                    except Exception as e:
+                        errors += 1
+                        print(f"[{target}] request {i} failed: {e}")
+                    latencies.append(time.perf_counter() - started)
+
+            wall_start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(self.args.requests)))
+            wall = time.perf_counter() - wall_start
+
+        return {
+            "target": target,
+            "concurrency": concurrency,
+            "requests": self.args.requests,
+            "errors": errors,
+            "wall_s": round(wall, 3),
+            "rps": round(self.args.requests / wall, 3) if wall else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+async def run(args) -> dict:
+    targets = TARGETS if args.target == "all" else (args.target,)
+    levels = [int(c) for c in args.concurrency.split(",")]
+    results = []
+    with FixtureServer() as server:
+        harness = Harness(args, server.base_url)
+        try:
+            for target in targets:
+                for level in levels:
+                    result = await harness.run_level(target, level)
+                    results.append(result)
+                    print(f"{target:<9} c={level:<3} p50={result['p50_ms']:>8}ms p95={result['p95_ms']:>8}ms "
+                          f"p99={result['p99_ms']:>8}ms rps={result['rps']:>7} rss={result['peak_rss_mb']}MB")
+        finally:
+            await harness.main.browser_pool.stop()
+            await harness.main.http_pool.aclose()
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+
+def compare(old_path: str, new_path: str):
+    """두 결과 파일의 같은 (target, concurrency) 항목을 비교해 출력합니다."""
+    with open(old_path) as f:
+        old = {(r["target"], r["concurrency"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    for r in new:
+        base = old.get((r["target"], r["concurrency"]))
+        if not base:
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "rps"):
+            before, after = base[key], r[key]
+            change = ((after - before) / before * 100) if before else 0.0
+            deltas.append(f"{key} {before}→{after} ({change:+.1f}%)")
+        print(f"{r['target']:<9} c={r['concurrency']:<3} " + "  ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the newsletter generation pipeline")
+    parser.add_argument("--target", choices=TARGETS + ("all",), default="all")
+    parser.add_argument("--concurrency", default="1,4,16", help="쉼표로 구분한 동시성 단계")
+    parser.add_argument("--requests", type=int, default=16, help="단계별 요청 수")
+    parser.add_argument("--max-results", type=int, default=5)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--analysis-latency", type=float, default=1.0)
+    parser.add_argument("--context-mode", choices=("full", "parallel", "skip", "auto"), default="full",
+                        help="문맥 정제 단계 실행 방식")
+    parser.add_argument("--prompt-cache", action=argparse.BooleanOptionalAction, default=True,
+                        help="가짜 Gemini 클라이언트가 cached content 생성을 지원할지 여부")
+    parser.add_argument("--browser", choices=("real", "skip"), default="real",
+                        help="skip이면 Playwright 단계를 건너뜀 (브라우저가 설치되지 않은 환경용)")
+    parser.add_argument("--warm", action="store_true", help="단계 사이에 캐시를 비우지 않음")
+    parser.add_argument("--unique-topics", action=argparse.BooleanOptionalAction, default=True,
+                        help="요청마다 다른 주제를 사용 (검색 캐시 적중 방지)")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본: benchmarks/results/pipeline-<commit>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="두 결과 파일 비교")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    configure_env()
+    report = asyncio.run(run(args))
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"pipeline-{report['meta']['commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Saved results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,45 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
-import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
 from services.ai_generator import AIGeneratorService
+from services.batch import BatchRunner
+from services.browser_pool import BrowserPool
 from services.crawler import CrawlerService
+from services.drafts_store import DraftStore, DraftNotFound, STATUSES
+from services.http_pool import HttpPool
+from services.prompt_templates import BLOCK_TYPES
+from services.job_queue import JobQueue
+from services.pipeline import NewsletterPipeline
+from services.run_store import RunStore, RunNotFound
 from services.stibee_client import StibeeClient
+from utils import metrics
 
 load_dotenv()
 
-app = FastAPI(title="AI Newsletter Generator API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 서버 시작 시 브라우저 풀을 미리 띄워 첫 요청의 기동 지연을 제거
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        print(f"BrowserPool startup failed (will retry lazily): {e}")
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    await browser_pool.stop()
+    await http_pool.aclose()
+    crawler.image_dedup.close()
+    drafts.close()
+
+app = FastAPI(title="AI Newsletter Generator API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -23,8 +50,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """요청마다 추적 ID를 부여하고 HTTP 지연 시간을 기록합니다."""
+    trace_id = request.headers.get("X-Request-ID") or metrics.new_trace_id()
+    token = metrics.trace_id_var.set(trace_id)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = trace_id
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.REQUESTS.inc(method=request.method, path=path, status=status)
+        metrics.REQUEST_DURATION.observe(elapsed, method=request.method, path=path)
+        metrics.log_event("http_request", method=request.method, path=request.url.path,
+                          status=status, duration_ms=round(elapsed * 1000, 2))
+        metrics.trace_id_var.reset(token)
+
 ai_gen = AIGeneratorService()
-crawler = CrawlerService()
+browser_pool = BrowserPool()
+http_pool = HttpPool()
+crawler = CrawlerService(browser_pool=browser_pool, http_pool=http_pool)
+drafts = DraftStore()
+runs = RunStore()
+pipeline = NewsletterPipeline(crawler, ai_gen, drafts=drafts, runs=runs)
+batch_runner = BatchRunner(pipeline)
+BATCH_MAX_TOPICS = int(os.getenv("BATCH_MAX_TOPICS", "50"))
+
+async def _run_job(payload: dict, on_stage):
+    return await pipeline.run(NewsletterRequest(**payload), on_stage=on_stage)
+
+job_queue = JobQueue(_run_job)
+
+metrics.BROWSER_PAGES_IN_FLIGHT.set_function(lambda: browser_pool.stats()["pages_in_flight"])
+metrics.JOB_QUEUE_DEPTH.set_function(lambda: job_queue.stats()["queued"])
 stibee = StibeeClient()
 
 class NewsletterRequest(BaseModel):
@@ -33,6 +97,10 @@ class NewsletterRequest(BaseModel):
     model_type: str = "gemini" # gemini or gpt
     language: str = "ko"
     max_results: int = 5
+    crawl_budget_s: Optional[float] = None # 크롤링 단계 전체 시간 예산(초), 초과 시 끝난 아티클만 사용
+    context_mode: str = "full" # 문맥 정제 방식: full, parallel, skip, auto
+    expand_queries: bool = False # True이면 주제를 여러 검색어로 확장해 함께 검색 (결과는 URL 기준으로 병합)
+    save_draft: bool = False # True이면 생성 결과를 보관함(초안)에 저장하고 draft_id를 함께 반환
 
 class Block(BaseModel):
     id: Optional[str] = None
@@ -44,105 +112,237 @@ class NewsletterResponse(BaseModel):
     blocks: List[Block]
     images: List[str] # 전체 이미지 (하위 호환)
     sources: List[dict] # 개별 소스 내 associated_images 포함
+    truncated_sources: List[str] = [] # 시간 예산 초과로 수집이 중단된 소스 URL
+    failed_sources: List[str] = [] # 수집 중 오류가 난 소스 URL (검색 본문만 사용)
+    draft_id: Optional[str] = None # save_draft로 저장된 초안 ID
+    run_id: Optional[str] = None # 블록 재생성(/api/generate/block)에 쓰는 실행 ID
 
 @app.get("/")
 async def root():
     return {"message": "AI Newsletter Generator API is running"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus 텍스트 형식의 지표를 반환합니다."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/stats")
+async def get_stats():
+    """내부 리소스 풀의 상태를 반환합니다."""
+    return {
+        "browser_pool": browser_pool.stats(),
+        "http_pool": http_pool.stats(),
+        "url_validator": crawler.url_validator.stats(),
+        "search_cache": crawler.search_cache.stats(),
+        "article_cache": crawler.article_cache.stats(),
+        "refinement_cache": ai_gen.refinement_cache.stats(),
+        "prompt_cache": ai_gen.prefix_cache.stats(),
+        "llm_router": ai_gen.router.stats(),
+        "image_extractor": crawler.image_extractor.stats(),
+        "image_ranker": crawler.image_ranker.stats(),
+        "image_dedup": crawler.image_dedup.stats(),
+        "llm_scheduler": ai_gen.limiter_stats(),
+        "query_expander": ai_gen.query_expander.stats(),
+        "crawl_scheduler": http_pool.scheduler.stats(),
+        "batch": batch_runner.stats(),
+        "drafts": drafts.stats(),
+        "run_store": runs.stats(),
+        "job_queue": job_queue.stats()
+    }
+
 @app.post("/api/generate", response_model=NewsletterResponse)
 async def generate_newsletter(request: NewsletterRequest):
     try:
-        # 1. Expand topic 삭제 -> 원본 주제만 사용
-        queries = [request.topic]
-        
-        # 2. Search & Scrape (Parallel Optimization)
-        # 사용자가 요청한 개수(max_results)를 적용하여 병렬 처리
-        search_tasks = [crawler.search_and_extract_async(q, max_results=request.max_results) for q in queries]
-        search_results = await asyncio.gather(*search_tasks)
-        
-        all_articles = []
-        all_images = []
-        combined_context = ""
-        
-        for i, res in enumerate(search_results):
-            all_articles.extend(res.get('articles', []))
-            all_images.extend(res.get('images', []))
-            combined_context += f"{res.get('context', '')}\n\n"
-        
-        # Deduplicate images while preserving order
-        unique_images = list(dict.fromkeys(all_images))
-
-        # Filter out broken sources (one last safety check)
-        valid_sources = [s for s in all_articles if crawler._is_url_valid(s.get('url'))]
-        
-        # 3. Generate content using AI
-        data = ai_gen.generate_newsletter(
-            topic=request.topic, 
-            raw_context=combined_context, 
-            tone=request.tone, 
-            model_type=request.model_type,
-            articles=valid_sources
-        )
-            
-        # 4. Post-processing: Force Valid URLs and IDs
-        blocks = data.get('blocks', [])
-        valid_article_urls = [s.get('url') for s in all_articles if s.get('url')]
-        
-        for i, block in enumerate(blocks):
-            # Ensure ID
-            if not block.get('id'):
-                block['id'] = str(i + 1)
-            
-            # Link/URL & Image Validation & Injection
-            content = block.get('content', {})
-            # 리팩토링된 주입 로직 함수 호출
-            _process_injection(content, valid_sources, valid_article_urls, unique_images, i)
-
-        return {
-            "title": data.get('title', f"{request.topic} 뉴스레터"),
-            "blocks": blocks,
-            "images": unique_images,
-            "sources": all_articles
-        }
+        return await pipeline.run(request)
     except Exception as e:
         print(f"Error during newsletter generation: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
-def _process_injection(content: dict, valid_sources: list, valid_urls: list, all_images: list, index: int):
-    """블록에 유효한 링크와 소스 기반 이미지를 주입합니다."""
+@app.post("/api/generate/stream")
+async def generate_newsletter_stream(request: NewsletterRequest):
+    """
+    Server-Sent Events로 생성 과정을 스트리밍합니다.
+    progress → sources → block(완성되는 대로) → done 순서로 이벤트를 전송합니다.
+    """
+    async def event_source():
+        async for event, data in pipeline.stream(request):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+class BlockRegenerateRequest(BaseModel):
+    run_id: Optional[str] = None # 생성 응답(또는 스트림 done 이벤트)의 run_id
+    draft_id: Optional[str] = None # 보관함 초안 ID (run_id 대신 또는 함께 사용)
+    block_type: Optional[str] = None # 생성할 블록 타입 (block_id가 있으면 생략 시 같은 타입)
+    block_id: Optional[str] = None # 대체할 블록 ID (없으면 새 블록 생성)
+    instructions: Optional[str] = None # 에디터의 추가 요청 (예: "더 짧게", "다른 기사로")
+    tone: Optional[str] = None # 생략 시 원래 요청의 톤
+    model_type: Optional[str] = None # 생략 시 원래 요청의 모델
+    save: bool = False # True이면 재생성한 블록을 초안/실행 기록에 바로 저장 (block_id가 없으면 끝에 추가)
+
+class BlockRegenerateResponse(BaseModel):
+    block: Block
+    run_id: Optional[str] = None
+    draft_id: Optional[str] = None
+    saved: bool = False
+
+@app.post("/api/generate/block", response_model=BlockRegenerateResponse)
+async def regenerate_block(request: BlockRegenerateRequest):
+    """
+    기존 뉴스레터의 블록 하나만 다시 생성합니다.
+    원래 실행의 소스와 정제 문맥을 재사용하고 블록 전용 짧은 프롬프트로 생성한 뒤 링크/이미지를 주입합니다.
+    """
+    if not request.run_id and not request.draft_id:
+        raise HTTPException(status_code=400, detail="run_id 또는 draft_id가 필요합니다.")
+    if not request.block_type and not request.block_id:
+        raise HTTPException(status_code=400, detail="block_type 또는 block_id가 필요합니다.")
+    if request.block_type is not None and request.block_type not in BLOCK_TYPES:
+        raise HTTPException(status_code=400, detail=f"block_type은 {', '.join(BLOCK_TYPES)} 중 하나여야 합니다.")
     try:
-        link = content.get('link') or content.get('url')
-        current_source = None
-        
-        # 1. Link Injection
-        # valid_urls가 비어있을 경우를 대비해 조건문 보강
-        is_invalid_link = not link or "example.com" in link or (valid_urls and link not in valid_urls)
-        
-        if is_invalid_link:
-            if valid_sources:
-                current_source = valid_sources[index % len(valid_sources)]
-                injected_url = current_source.get('url')
-                if 'link' in content: content['link'] = injected_url
-                if 'url' in content: content['url'] = injected_url
-                link = injected_url
-        else:
-            current_source = next((s for s in valid_sources if s.get('url') == link), None)
-
-        # 2. Image Injection
-        # 소스에 직접 매핑된 이미지가 있으면 최우선 적용
-        if current_source and current_source.get('associated_images'):
-            content['image_url'] = current_source['associated_images'][0]
-        # 이미지가 없거나 전체 풀에 없는 경우(잘못된 URL 등) 대체 이미지 주입
-        elif not content.get('image_url') or (all_images and content.get('image_url') not in all_images):
-            if all_images:
-                content['image_url'] = all_images[index % len(all_images)]
-                
-        return current_source
+        return await pipeline.regenerate_block(request)
+    except RunNotFound:
+        raise HTTPException(status_code=404, detail="실행 기록을 찾을 수 없습니다. (만료되었으면 draft_id로 요청하세요)")
+    except DraftNotFound:
+        raise HTTPException(status_code=404, detail="초안 또는 블록을 찾을 수 없습니다.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"Injection Error at block index {index}: {e}")
-        return None
+        print(f"Error during block regeneration: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+class BatchRequest(BaseModel):
+    requests: List[NewsletterRequest]
+
+@app.post("/api/generate/batch")
+async def generate_newsletter_batch(request: BatchRequest):
+    """
+    여러 주제의 뉴스레터를 한 번에 생성하고 Server-Sent Events로 주제가 끝나는 대로 결과를 보냅니다.
+    progress → result/error (완료 순서, indexes는 요청 목록에서의 위치) → done(처리량 통계) 순서로 전송합니다.
+    """
+    if not request.requests:
+        raise HTTPException(status_code=400, detail="requests가 비어 있습니다.")
+    if len(request.requests) > BATCH_MAX_TOPICS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {BATCH_MAX_TOPICS}개 주제까지 생성할 수 있습니다.")
+
+    async def event_source():
+        async for event, data in batch_runner.run(request.requests):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+class JobResponse(BaseModel):
+    id: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stages: dict = {}
+    attempts: int = 0
+    error: Optional[str] = None
+    result: Optional[NewsletterResponse] = None
+
+@app.post("/api/jobs", response_model=JobResponse)
+async def create_job(request: NewsletterRequest):
+    """생성 작업을 큐에 넣고 작업 ID를 즉시 반환합니다."""
+    return await job_queue.submit(request.model_dump())
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: str):
+    """작업 상태, 단계별 소요 시간, (완료 시) 결과를 반환합니다."""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job
+
+class DraftSummary(BaseModel):
+    id: str
+    topic: str
+    title: str
+    status: str
+    block_count: int
+    created_at: str
+    updated_at: str
+
+class DraftListResponse(BaseModel):
+    items: List[DraftSummary]
+    next_cursor: Optional[str] = None # 다음 페이지가 없으면 None
+
+class DraftResponse(NewsletterResponse):
+    id: str
+    topic: str
+    status: str
+    request: Optional[dict] = None
+    created_at: str
+    updated_at: str
+
+class DraftCreateRequest(BaseModel):
+    topic: str
+    newsletter: NewsletterResponse
+
+class DraftUpdateRequest(BaseModel):
+    title: Optional[str] = None
+    status: Optional[str] = None
+
+class BlockPatchRequest(BaseModel):
+    content: dict
+    type: Optional[str] = None
+
+# 초안 핸들러는 동기 SQLite 저장소를 호출하므로 일반 def로 두어 FastAPI 스레드 풀에서 실행 (이벤트 루프를 막지 않음)
+def _draft_or_404(call, *args, **kwargs):
+    try:
+        return call(*args, **kwargs)
+    except DraftNotFound:
+        raise HTTPException(status_code=404, detail="초안을 찾을 수 없습니다.")
+
+@app.get("/api/drafts", response_model=DraftListResponse)
+def list_drafts(topic: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                status: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None):
+    """
+    보관함 초안 목록을 최신순으로 반환합니다.
+    topic(대소문자/공백 무시 일치), since/until(ISO 날짜, 오프셋이 없으면 UTC)로 거르고, 응답의 next_cursor로 다음 페이지를 요청합니다.
+    """
+    try:
+        return drafts.list(topic=topic, since=since, until=until, status=status,
+                           limit=max(1, min(limit, 100)), cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/drafts", response_model=DraftSummary)
+def create_draft(request: DraftCreateRequest):
+    """생성 결과를 초안으로 저장합니다."""
+    return drafts.create(request.topic, request.newsletter.model_dump())
+
+@app.get("/api/drafts/{draft_id}", response_model=DraftResponse)
+def get_draft(draft_id: str):
+    """블록, 소스, 이미지를 포함한 초안 전체를 반환합니다. (다시 생성하지 않고 에디터에서 열기)"""
+    return _draft_or_404(drafts.get, draft_id)
+
+@app.patch("/api/drafts/{draft_id}", response_model=DraftSummary)
+def update_draft(draft_id: str, request: DraftUpdateRequest):
+    if request.status is not None and request.status not in STATUSES:
+        raise HTTPException(status_code=400, detail=f"status는 {', '.join(STATUSES)} 중 하나여야 합니다.")
+    return _draft_or_404(drafts.update, draft_id, title=request.title, status=request.status)
+
+@app.patch("/api/drafts/{draft_id}/blocks/{block_id}")
+def patch_draft_block(draft_id: str, block_id: str, request: BlockPatchRequest):
+    """블록 하나만 저장합니다. (문서 전체를 다시 쓰지 않음)"""
+    return _draft_or_404(drafts.patch_block, draft_id, block_id, request.content, block_type=request.type)
+
+@app.delete("/api/drafts/{draft_id}", status_code=204)
+def delete_draft(draft_id: str):
+    _draft_or_404(drafts.delete, draft_id)
 
 class PublishRequest(BaseModel):
     title: str
@@ -153,8 +353,7 @@ async def publish_newsletter(request: PublishRequest):
     try:
         if not stibee:
             return {"status": "error", "message": "Stibee API key is not configured."}
-        # Note: In ai-news version, create_and_send_email is synchronous
-        result = stibee.create_and_send_email(request.title, request.html)
+        result = await stibee.create_and_send_email(request.title, request.html)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
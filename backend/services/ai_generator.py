@@ -1,13 +1,32 @@
 import os
+import time
+import asyncio
 from google import genai
 from google.genai import types
 import json
 import traceback
 import re
-from datetime import datetime
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 from utils.json_parser import parse_ai_json
+from utils.metrics import span, LLM_DURATION, record_llm_usage, CONTEXT_REFINEMENTS, REFINEMENT_SAVED
+from services.context_builder import ContextBuilder, estimate_tokens
+from services.refinement_cache import RefinementCache
+from services.prompt_templates import NEWSLETTER_PROMPT, BLOCK_TYPES
+from services.prompt_cache import GeminiPrefixCache
+from services.query_expander import QueryExpander
+from services.llm_router import LLMRouter, is_transient
+from utils.rate_limit import RateLimiter
+
+GEMINI_MODEL = 'gemini-2.5-flash'
+EXPANSION_MODEL = 'gemini-2.0-flash'
+OPENAI_MODEL = 'gpt-4o'
+JSON_SYSTEM_MESSAGE = "You are a helpful assistant designed to output JSON."
+
+# 문맥 정제 단계 실행 방식
+# full: 정제 후 생성 (캐시 사용) / parallel: 크롤링과 동시에 정제 시작 / skip: 정제 생략
+# auto: 원문이 CONTEXT_SKIP_TOKENS 미만이면 생략, 아니면 full
+CONTEXT_MODES = ("full", "parallel", "skip", "auto")
 
 load_dotenv()
 
@@ -23,16 +42,163 @@ class AIGeneratorService:
         # OpenAI Init
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         if self.openai_api_key:
-            self.openai_client = OpenAI(api_key=self.openai_api_key)
+            self.openai_client = AsyncOpenAI(api_key=self.openai_api_key)
         else:
             self.openai_client = None
 
-    def _analyze_context(self, topic: str, raw_context: str) -> str:
+        # 프로바이더별 동시 호출 수 / 분당 요청·토큰 한도(RPM/TPM, 0이면 제한 없음) 및 타임아웃
+        # 모든 호출(단건, 스트리밍, 배치)이 같은 스케줄러를 거치므로 배치 생성도 한도 안에서 대기열을 이룸
+        self.llm_timeout = float(os.getenv("LLM_TIMEOUT", "120"))
+        self.analysis_timeout = float(os.getenv("LLM_ANALYSIS_TIMEOUT", "30"))
+        self.block_timeout = float(os.getenv("LLM_BLOCK_TIMEOUT", "30"))
+        # 스트리밍: 첫 조각까지(기본값은 단건 호출과 같은 LLM_TIMEOUT)와 조각 사이의 최대 대기 시간
+        self.first_token_timeout = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", str(self.llm_timeout)))
+        self.stream_idle_timeout = float(os.getenv("LLM_STREAM_IDLE_TIMEOUT", "30"))
+        self._limits = {
+            "gemini": RateLimiter(int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
+                                  float(os.getenv("GEMINI_RPM", "0")), float(os.getenv("GEMINI_TPM", "0"))),
+            "gpt": RateLimiter(int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")),
+                               float(os.getenv("OPENAI_RPM", "0")), float(os.getenv("OPENAI_TPM", "0"))),
+        }
+        # 프롬프트에 들어갈 소스 본문을 모델별 토큰 예산 안으로 조립
+        self.context_builder = ContextBuilder()
+        # 정제 결과 캐시 및 auto 모드의 생략 기준
+        self.refinement_cache = RefinementCache()
+        self.skip_threshold = int(os.getenv("CONTEXT_SKIP_TOKENS", "3000"))
+        self._analysis_seconds = None  # 최근 정제 소요 시간의 지수 이동 평균 (생략 시 절약 시간 추정용)
+        # 정적 프롬프트 접두부 (시작 시 한 번 생성) 및 Gemini 컨텍스트 캐시
+        self.prompt_template = NEWSLETTER_PROMPT
+        self.prefix_cache = GeminiPrefixCache(self.gemini_client)
+        # 프로바이더 라우터 (지연 시간 추적, 회로 차단기, hedging, 재시도/failover)
+        self.router = LLMRouter({
+            "gemini": self._generate_gemini,
+            "gpt": self._generate_gpt,
+        }, validate=self._is_valid_newsletter)
+        # (선택) 검색어 확장 - 가벼운 모델로 한 번 만들고 주제별로 캐시
+        self.query_expander = QueryExpander(self._complete_expansion)
+
+    async def _call(self, provider: str, model: str, operation: str, request, timeout: float, tokens: int = 0):
+        """
+        프로바이더 동시성/속도 한도 안에서 타임아웃을 걸고 LLM 호출을 실행합니다. (지연 시간/토큰 사용량 기록)
+        request는 호출 코루틴을 만드는 인자 없는 함수로, 슬롯을 얻은 뒤에 호출합니다.
+        (대기 중 취소/타임아웃되어도 만들어 놓고 실행하지 않은 코루틴이 남지 않음)
+        tokens는 TPM 한도 계산에 쓰는 예상 입력 토큰 수입니다.
+        """
+        async with self._limits[provider].slot(tokens):
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(request(), timeout=timeout)
+            finally:
+                LLM_DURATION.observe(time.perf_counter() - started, provider=provider, model=model, operation=operation)
+        record_llm_usage(provider, model, response)
+        return response
+
+    async def _complete_expansion(self, prompt: str) -> str:
+        if not self.gemini_client:
+            raise RuntimeError("GEMINI_API_KEY가 설정되지 않았습니다.")
+        response = await self._call("gemini", EXPANSION_MODEL, "expand", lambda: self.gemini_client.aio.models.generate_content(
+            model=EXPANSION_MODEL,
+            contents=prompt
+        ), timeout=self.query_expander.timeout, tokens=estimate_tokens(prompt))
+        return response.text
+
+    def limiter_stats(self) -> dict:
+        """프로바이더별 LLM 스케줄러 상태 (동시 실행, 대기 수, 누적 대기 시간)"""
+        return {name: limiter.stats() for name, limiter in self._limits.items()}
+
+    def _prepare_context(self, topic: str, raw_context: str, model_type: str, articles: list = None):
+        """
+        소스 본문을 중복 제거/관련도 정렬 후 토큰 예산에 맞춰 줄입니다.
+        반환값: (예산에 맞춘 아티클 목록, 문맥 분석에 넘길 텍스트)
+        """
+        if not articles:
+            return articles, self.context_builder.fit(raw_context, model_type)
+        with span("build_context", model_type=model_type):
+            packed = self.context_builder.build(topic, articles, model_type)
+        stats = packed["stats"]
+        print(f"Context packed: {stats['raw_tokens']} -> {stats['packed_tokens']} tokens "
+              f"(budget {stats['budget']}, duplicates {stats['duplicates']}, dropped {stats['dropped']})")
+        return packed["articles"], packed["context"]
+
+    async def _prepare_prompt(self, topic: str, raw_context: str, tone: str, model_type: str, articles: list = None,
+                              context_mode: str = "full", refinement=None, prepared: dict = None) -> str:
+        """
+        요청마다 바뀌는 프롬프트 부분(날짜/주제/소스/정제 문맥)을 조립합니다. 정적 접두부는 호출 시 따로 붙습니다.
+        refinement(start_refinement로 미리 시작한 작업)가 주어지면 새로 정제하지 않고 그 결과를 기다립니다.
+        prepared(dict)가 주어지면 프롬프트에 들어간 소스와 정제 문맥을 담아 둡니다. (블록 재생성에서 재사용)
+        """
+        articles, source_context = self._prepare_context(topic, raw_context, model_type, articles)
+        if refinement is not None:
+            refined_context = await self._await_refinement(refinement)
+        else:
+            refined_context = await self._refine(topic, source_context, context_mode)
+        if not refined_context and not articles:
+            # 아티클 목록이 없으면 원문이 프롬프트에 들어갈 곳이 없으므로 그대로 사용
+            refined_context = source_context
+        if prepared is not None:
+            prepared.update({"articles": articles, "refined_context": refined_context})
+        return self.prompt_template.render_request(topic, refined_context, articles)
+
+    def start_refinement(self, topic: str, raw_context: str, model_type: str = "gemini", articles: list = None,
+                         context_mode: str = "full") -> asyncio.Task:
+        """
+        (parallel 모드) 문맥 정제를 백그라운드 작업으로 먼저 시작합니다.
+        검색 직후의 아티클로 시작해 이미지 수집/검증과 겹쳐 실행되며, 결과는 generate 단계에서 기다립니다.
+        """
+        _, source_context = self._prepare_context(topic, raw_context, model_type, articles)
+        task = asyncio.ensure_future(self._refine(topic, source_context, context_mode))
+        task.started_at = time.perf_counter()
+        return task
+
+    async def _await_refinement(self, task: asyncio.Task) -> str:
+        waited_from = time.perf_counter()
+        try:
+            text = await task
+        except Exception as e:
+            print(f"Context refinement task failed: {e}")
+            return ""
+        # 정제에 걸린 시간 중 기다리지 않은 부분 = 다른 단계와 겹쳐 절약된 시간
+        REFINEMENT_SAVED.inc(max(0.0, waited_from - task.started_at), reason="parallel")
+        return text
+
+    async def _refine(self, topic: str, source_context: str, mode: str = "full") -> str:
+        """
+        mode에 따라 문맥 정제를 실행하거나 생략합니다. 같은 (주제, 원문)의 결과는 캐시에서 재사용합니다.
+        """
+        mode = mode if mode in CONTEXT_MODES else "full"
+        if mode == "skip" or (mode == "auto" and estimate_tokens(source_context) < self.skip_threshold):
+            CONTEXT_REFINEMENTS.inc(mode=mode, result="skipped")
+            if self._analysis_seconds:
+                REFINEMENT_SAVED.inc(self._analysis_seconds, reason="skip")
+            return ""
+
+        key = self.refinement_cache.key(topic, source_context)
+        cached = self.refinement_cache.get(key)
+        if cached is not None:
+            CONTEXT_REFINEMENTS.inc(mode=mode, result="cache_hit")
+            REFINEMENT_SAVED.inc(cached.get("seconds", 0), reason="cache")
+            return cached["text"]
+
+        async def analyze():
+            started = time.perf_counter()
+            text = await self._analyze_context(topic, source_context)
+            elapsed = time.perf_counter() - started
+            if text:
+                # 실패(빈 결과)는 저장하지 않음
+                self.refinement_cache.set(key, text, elapsed)
+                self._analysis_seconds = elapsed if self._analysis_seconds is None else 0.8 * self._analysis_seconds + 0.2 * elapsed
+            return text
+
+        CONTEXT_REFINEMENTS.inc(mode=mode, result="analyzed")
+        return await self.refinement_cache.coalesce(key, analyze)
+
+    async def _analyze_context(self, topic: str, raw_context: str) -> str:
         """
         Tavily 검색 결과들 사이의 공통점과 연관성을 분석하여 정제된 문맥을 생성합니다.
+        분석할 수 없으면 빈 문자열을 반환합니다. (원문은 이미 [Sources]에 들어가므로 중복해서 넣지 않음)
         """
         if not self.gemini_client:
-            return raw_context
+            return ""
 
         analysis_prompt = f"""
         당신은 정보 분석 전문가입니다. 주제: '{topic}'
@@ -46,208 +212,297 @@ class AIGeneratorService:
         """
         try:
             # 빠른 분석을 위해 기본적으로 Gemini 사용 (New SDK)
-            response = self.gemini_client.models.generate_content(
-                model='gemini-2.0-flash',
-                contents=analysis_prompt
-            )
+            with span("analyze_context", context_chars=len(raw_context)):
+                response = await self._call("gemini", 'gemini-2.0-flash', "analyze", lambda: self.gemini_client.aio.models.generate_content(
+                    model='gemini-2.0-flash',
+                    contents=analysis_prompt
+                ), timeout=self.analysis_timeout, tokens=estimate_tokens(analysis_prompt))
             return response.text
         except:
-            return raw_context # 분석 실패 시 원본 사용
+            return "" # 분석 실패 시 [Sources]의 원문만 사용
 
-    def generate_newsletter(self, topic: str, raw_context: str, tone: str = "professional", model_type: str = "gemini", articles: list = None):
+    async def generate_newsletter(self, topic: str, raw_context: str, tone: str = "professional", model_type: str = "gemini", articles: list = None,
+                                  context_mode: str = "full", refinement=None, prepared: dict = None):
         """
         수집된 개별 아티클들을 바탕으로 1:1 매칭되는 블록 뉴스레터를 생성합니다.
+        context_mode로 문맥 정제 방식(full/parallel/skip/auto)을 고르고,
+        refinement로 미리 시작한 정제 작업(start_refinement)을 넘길 수 있습니다.
+        prepared(dict)에는 프롬프트에 사용한 소스와 정제 문맥이 채워집니다.
         """
         if model_type == "gpt" and not self.openai_client:
-             return {
-                "title": "오류 발생",
-                "blocks": [{"type": "text", "content": {"text": "OPENAI_API_KEY가 설정되지 않았습니다."}}],
-                "sources": [], "images": []
-            }
-
-        # 생성일 (오늘 날짜)
-        today_date = datetime.now().strftime("%Y년 %m월 %d일")
-
-        # 1. 문맥 정제 (Context Refinement)
-        refined_context = self._analyze_context(topic, raw_context)
-
-        tone_instruction = ""
-        if tone == "friendly":
-            tone_instruction = "Tone: Friendly, approachable, and warm. Use polite informal Korean (친근한 해요체 사용)."
-        elif tone == "witty":
-            tone_instruction = "Tone: Witty, humorous, and energetic. Use engaging and fun Korean (재치있고 활기찬 한국어 사용)."
-        else: # professional
-            tone_instruction = "Tone: Professional, authoritative, and concise. Use formal polite Korean (문맥에 따라 하십시오체 또는 정중한 해요체 사용)."
-
-        # 아티클 리스트를 문자열로 변환 (URL 및 이미지 보존 강조)
-        articles_context = ""
-        if articles:
-            for i, a in enumerate(articles):
-                articles_context += f"--- Source {i+1} ---\nTitle: {a.get('title')}\nURL: {a.get('url')}\nAssociated Images: {a.get('associated_images', [])}\nContent: {a.get('content')}\n\n"
-
-        prompt = f"""
-        당신은 감성적이고 통찰력 있는 뉴스레터 전문 수석 에디터입니다. 
-        당신의 목표는 '{topic}'에 관해 독자에게 깊은 정보와 울림을 주는 마키나락스형 매거진 스타일의 뉴스레터를 발행하는 것입니다.
-
-        [스타일 가이드]
-        1. **톤앤매너**: 격식 있는 대화체(~해요, ~입니다). 전문 용어는 반드시 문맥으로 풀어서 설명하세요.
-        2. **오프닝 필수 문구**: 상단 인사는 반드시 "안녕하세요, 오픈해 주셔서 감사합니다"로 시작하세요.
-        3. **시각적 구조**: 문단 사이 충분한 여백, 핵심 키워드는 `<strong>` 태그로 **굵게** 강조하세요. (마크다운 `**` 금지)
-        4. **가독성 규칙**: 
-           - 한 문단은 **최대 3줄**을 넘지 않아야 합니다.
-           - 불렛 포인트(•)와 내용에 어울리는 이모지(🚀, 💡, 📊 등)를 적극 활용하세요.
-
-        [뉴스레터 구성 순서]
-        1. **오프닝 (header)**: "안녕하세요, 오픈해 주셔서 감사합니다"로 시작. 독자의 고민이나 질문(Hook)으로 시작해 주제의 가치를 2~3문장으로 설명하세요.
-        2. **오늘의 퀵 서머리 (quick_summary)**: 이번 호의 핵심 요약 3문장을 배치하세요.
-        3. **챕터 구성 (chapter_header -> main_story -> deep_dive -> tool_spotlight)**:
-           - 뉴스레터를 **최소 2개에서 최대 4개**의 명확한 챕터로 나누세요.
-           - **중요**: 각 챕터에는 반드시 **딱 1개의 main_story** 블록만 배치해야 합니다.
-           - `main_story`: 배경 -> 해결 -> 이득 구조로 300자 내외 압축 서술.
-        4. **단신 리스트 (short_news)**: 관련 뉴스 3~5개를 이모지와 함께 구성하세요. 각 뉴스 제목은 기사 내용을 분석한 날카로운 **한 줄 요약**이어야 합니다.
-        5. **클로징 (insight)**: 단순히 마무리가 아닌, 전체 뉴스레터 내용을 종합하여 독자가 얻을 수 있는 **전략적 통찰과 핵심 시사점**을 깊이 있게 담으세요.
-
-        [필수 작성 규칙]
-        1. **Benefit-Driven**: '그래서 독자에게 무엇이 좋은가?'에 집중하세요.
-        2. **이미지 안내**: `main_story`의 이미지 캡션 필드에 "이미지를 클릭하면 전문으로 연결됩니다"를 포함하세요.
-
-        주요 언어: 한국어 (Korean/Hangul).
-        오늘의 날짜: {today_date}
-
-        [Sources]
-        {articles_context}
-
-        [Available Images]
-        {refined_context} (내부의 이미지 URL 리스트 활용)
-        
-        [Output Format]
-        반드시 추가 텍스트 없이 유효한 JSON 객체만 출력하십시오. 
-        뉴스레터는 '블록(Block)' 단위로 구성됩니다. 
-        **최소 10개 이상의 블록**을 포함하여 깊이 있는 뉴스레터를 만드십시오.
+            if refinement is not None:
+                refinement.cancel()
+            return self._missing_openai_response()
 
-        사용 가능한 블록 타입 및 상세 가이드:
-        
-        1. header
-        {{
-            "type": "header",
-            "content": {{
-                "title": "메인 타이틀",
-                "date": "{today_date}",
-                "intro": "안녕하세요, 오픈해 주셔서 감사합니다. (독자 공감 Hook 포함)"
-            }}
-        }}
-
-        2. quick_summary
-        {{
-            "type": "quick_summary",
-            "content": {{
-                "items": ["요약문 1", "요약문 2", "요약문 3"]
-            }}
-        }}
-
-        3. chapter_header
-        {{
-            "type": "chapter_header",
-            "content": {{ "title": "챕터 주제" }}
-        }}
-
-        4. main_story
-        {{
-            "type": "main_story",
-            "content": {{
-                "title": "헤드라인",
-                "image_url": "URL",
-                "body": "300자 내외 [배경-해결-이득] 구조",
-                "link": "URL",
-                "image_caption": "이미지를 클릭하면 전문으로 연결됩니다"
-            }}
-        }}
-
-        5. deep_dive
-        {{
-            "type": "deep_dive",
-            "content": {{
-                "title": "분석 제목",
-                "body": "400자 내외 리스트 중심 분석"
-            }}
-        }}
-
-        6. tool_spotlight
-        {{
-            "type": "tool_spotlight",
-            "content": {{
-                "name": "도구명",
-                "description": "기능 및 유용성 설명",
-                "link": "URL"
-            }}
-        }}
-
-        7. short_news
-        {{
-            "type": "short_news",
-            "content": {{
-                "title": "News Briefs",
-                "news_items": [
-                    {{ "emoji": "🚀", "text": "제목", "link": "URL" }}
-                ]
-            }}
-        }}
-
-        8. insight (Closing)
-        {{
-            "type": "insight",
-            "content": {{
-                "text": "오늘의 레터 어떠셨나요? (피드백 및 구독 안내 포함)"
-            }}
-        }}
-
-        전체 JSON 구조:
-        {{
-            "title": "뉴스레터 관리용 제목",
-            "blocks": [ ... 위 블록들을 조합하여 구성 (순서 자유롭게) ... ]
-        }}
-        """
+        # 1. 소스 본문을 토큰 예산에 맞춘 뒤 문맥 정제 (Context Refinement)
+        prompt = await self._prepare_prompt(topic, raw_context, tone, model_type, articles, context_mode, refinement, prepared)
 
         try:
-            if model_type == 'gpt':
-                # OpenAI GPT 호출
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-4o", # 또는 gpt-4-turbo
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant designed to output JSON."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    response_format={"type": "json_object"}
-                )
-                return json.loads(response.choices[0].message.content)
-            
-            else:
-                # Gemini 호출 (Gemini 2.5 Flash 적용)
-                response = self.gemini_client.models.generate_content(
-                    model='gemini-2.5-flash',
-                    contents=prompt,
-                    config=types.GenerateContentConfig(
-                        response_mime_type='application/json'
-                    )
-                )
-                
-                # 중앙 집중화된 JSON 파싱 유틸리티 사용
-                return parse_ai_json(response.text)
+            # 선택한 모델을 1순위로 라우팅 (느리거나 장애 시 다른 프로바이더가 응답)
+            data, _ = await self.router.generate(self._provider(model_type), prompt=prompt, tone=tone)
+            return data
                 
         except Exception as e:
             print("=== AIGeneratorService 오류 발생 ===")
             print(f"Error Message: {e}")
             traceback.print_exc() # 상세 스택 트레이스 출력
-            return {
-                "title": f"{topic} 뉴스레터 (생성 실패)",
-                "blocks": [
-                    {
-                        "type": "text",
-                        "content": {
-                            "text": f"뉴스레터 생성 중 오류가 발생했습니다.\n\nError: {str(e)}"
-                        }
+            return self._error_response(topic, e)
+
+    def _provider(self, model_type: str) -> str:
+        return "gpt" if model_type == 'gpt' else "gemini"
+
+    @staticmethod
+    def _is_valid_newsletter(data) -> bool:
+        """블록이 하나 이상 있는 JSON 객체만 유효한 응답으로 인정합니다."""
+        return isinstance(data, dict) and isinstance(data.get('blocks'), list) and len(data['blocks']) > 0
+
+    async def _generate_gpt(self, prompt: str, tone: str) -> dict:
+        if not self.openai_client:
+            raise RuntimeError("OPENAI_API_KEY가 설정되지 않았습니다.")
+        # OpenAI GPT 호출 (정적 접두부를 맨 앞에 고정 → 자동 프롬프트 캐시 적중)
+        response = await self._call("gpt", OPENAI_MODEL, "generate", lambda: self.openai_client.chat.completions.create(
+            model=OPENAI_MODEL, # 또는 gpt-4-turbo
+            messages=self._openai_messages(tone, prompt),
+            response_format={"type": "json_object"},
+            prompt_cache_key=self.prompt_template.prefix_key(tone)
+        ), timeout=self.llm_timeout, tokens=self._prompt_tokens(prompt, tone))
+        return json.loads(response.choices[0].message.content)
+
+    async def _generate_gemini(self, prompt: str, tone: str) -> dict:
+        if not self.gemini_client:
+            raise RuntimeError("GEMINI_API_KEY가 설정되지 않았습니다.")
+        # Gemini 호출 (Gemini 2.5 Flash 적용, 정적 접두부는 컨텍스트 캐시 사용)
+        response = await self._gemini_generate(prompt, tone)
+        # 중앙 집중화된 JSON 파싱 유틸리티 사용
+        return parse_ai_json(response.text)
+
+    def _prompt_tokens(self, prompt: str, tone: str) -> int:
+        """접두부를 포함한 생성 요청의 예상 입력 토큰 수"""
+        return estimate_tokens(self.prompt_template.prefix(tone)) + estimate_tokens(prompt)
+
+    def _openai_messages(self, tone: str, prompt: str) -> list:
+        """정적 접두부가 항상 같은 위치(system 메시지 앞부분)에 오도록 메시지를 구성합니다."""
+        return [
+            {"role": "system", "content": f"{JSON_SYSTEM_MESSAGE}\n\n{self.prompt_template.prefix(tone)}"},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def _gemini_config(self, tone: str, use_cache: bool = True):
+        """
+        캐시된 접두부가 있으면 cached_content로, 없으면 system_instruction으로 접두부를 보냅니다.
+        반환값: (GenerateContentConfig, 사용한 캐시 이름 또는 None)
+        """
+        prefix = self.prompt_template.prefix(tone)
+        cache_name = None
+        if use_cache:
+            cache_name = await self.prefix_cache.get(GEMINI_MODEL, self.prompt_template.prefix_key(tone), prefix)
+        if cache_name:
+            return types.GenerateContentConfig(response_mime_type='application/json', cached_content=cache_name), cache_name
+        return types.GenerateContentConfig(response_mime_type='application/json', system_instruction=prefix), None
+
+    async def _gemini_generate(self, prompt: str, tone: str):
+        config, cache_name = await self._gemini_config(tone)
+        try:
+            return await self._call("gemini", GEMINI_MODEL, "generate", lambda: self.gemini_client.aio.models.generate_content(
+                model=GEMINI_MODEL, contents=prompt, config=config
+            ), timeout=self.llm_timeout, tokens=self._prompt_tokens(prompt, tone))
+        except asyncio.TimeoutError:
+            raise
+        except Exception as e:
+            # 일시적 오류는 라우터가 재시도하므로 캐시 문제로 보지 않음
+            if not cache_name or is_transient(e):
+                raise
+            # 캐시가 서버에서 만료/삭제된 경우 접두부를 직접 보내 한 번 더 시도
+            print(f"Gemini cached content failed, retrying without cache: {e}")
+            self.prefix_cache.invalidate(GEMINI_MODEL, self.prompt_template.prefix_key(tone))
+            config, _ = await self._gemini_config(tone, use_cache=False)
+            return await self._call("gemini", GEMINI_MODEL, "generate", lambda: self.gemini_client.aio.models.generate_content(
+                model=GEMINI_MODEL, contents=prompt, config=config
+            ), timeout=self.llm_timeout, tokens=self._prompt_tokens(prompt, tone))
+
+    def _missing_openai_response(self) -> dict:
+        return {
+            "title": "오류 발생",
+            "blocks": [{"type": "text", "content": {"text": "OPENAI_API_KEY가 설정되지 않았습니다."}}],
+            "sources": [], "images": []
+        }
+
+    def _error_response(self, topic: str, e: Exception) -> dict:
+        """생성 실패 시 에디터에 표시할 오류 블록을 만듭니다."""
+        return {
+            "title": f"{topic} 뉴스레터 (생성 실패)",
+            "blocks": [
+                {
+                    "type": "text",
+                    "content": {
+                        "text": f"뉴스레터 생성 중 오류가 발생했습니다.\n\nError: {str(e)}"
                     }
+                }
+            ],
+            "sources": [],
+            "images": []
+        }
+
+    async def stream_newsletter(self, topic: str, raw_context: str, tone: str = "professional", model_type: str = "gemini", articles: list = None,
+                                context_mode: str = "full", refinement=None, prepared: dict = None):
+        """
+        (비동기 스트리밍) 뉴스레터 JSON을 생성되는 대로 텍스트 조각 단위로 내보냅니다.
+        조각들을 이어 붙이면 generate_newsletter와 동일한 형식의 JSON이 됩니다.
+        """
+        if model_type == "gpt" and not self.openai_client:
+            if refinement is not None:
+                refinement.cancel()
+            raise ValueError("OPENAI_API_KEY가 설정되지 않았습니다.")
+
+        prompt = await self._prepare_prompt(topic, raw_context, tone, model_type, articles, context_mode, refinement, prepared)
+
+        # 첫 조각을 받기 전에 실패하면(타임아웃 포함) 라우터 순서에 따라 다른 프로바이더로 넘어감
+        last_error = None
+        for provider in self.router.order(self._provider(model_type)):
+            started_output = False
+            try:
+                async with self._limits[provider].slot(self._prompt_tokens(prompt, tone)):
+                    async for text in self._with_timeouts(provider, self._stream_provider(provider, prompt, tone)):
+                        started_output = True
+                        yield text
+                self.router.breakers[provider].record_success()
+                return
+            except Exception as e:
+                self.router.breakers[provider].record_failure()
+                # 이미 내보낸 조각이 있으면 다른 프로바이더로 이어 쓸 수 없음
+                if started_output:
+                    raise
+                print(f"LLM stream failover: {provider} failed before first chunk ({e})")
+                last_error = e
+        raise last_error
+
+    async def _with_timeouts(self, provider: str, stream):
+        """
+        스트림의 첫 조각은 first_token_timeout, 이후 조각은 stream_idle_timeout 안에 도착해야 합니다.
+        넘기면 스트림을 닫고 TimeoutError를 발생시킵니다. (첫 조각 전이면 호출자가 다른 프로바이더로 넘어감)
+        """
+        timeout, stage = self.first_token_timeout, "첫 조각"
+        try:
+            while True:
+                try:
+                    text = await asyncio.wait_for(stream.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"{provider} 스트림이 {timeout:g}초 동안 {stage}을 보내지 않았습니다.") from None
+                yield text
+                timeout, stage = self.stream_idle_timeout, "다음 조각"
+        finally:
+            await stream.aclose()
+
+    async def _stream_provider(self, provider: str, prompt: str, tone: str = "professional"):
+        client = self.openai_client if provider == 'gpt' else self.gemini_client
+        if not client:
+            raise RuntimeError(f"{provider} API 키가 설정되지 않았습니다.")
+        if provider == 'gpt':
+            stream = await self.openai_client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=self._openai_messages(tone, prompt),
+                response_format={"type": "json_object"},
+                prompt_cache_key=self.prompt_template.prefix_key(tone),
+                stream_options={"include_usage": True},
+                stream=True
+            )
+            async for chunk in stream:
+                if getattr(chunk, 'usage', None) is not None:
+                    # 마지막 조각에 토큰 사용량(캐시 적중 토큰 포함)이 담겨 옴
+                    record_llm_usage("gpt", OPENAI_MODEL, chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        else:
+            config, cache_name = await self._gemini_config(tone)
+            try:
+                stream = await self.gemini_client.aio.models.generate_content_stream(
+                    model=GEMINI_MODEL, contents=prompt, config=config
+                )
+            except Exception as e:
+                if not cache_name or is_transient(e):
+                    raise
+                print(f"Gemini cached content failed, retrying without cache: {e}")
+                self.prefix_cache.invalidate(GEMINI_MODEL, self.prompt_template.prefix_key(tone))
+                config, _ = await self._gemini_config(tone, use_cache=False)
+                stream = await self.gemini_client.aio.models.generate_content_stream(
+                    model=GEMINI_MODEL, contents=prompt, config=config
+                )
+            last = None
+            async for chunk in stream:
+                last = chunk
+                if chunk.text:
+                    yield chunk.text
+            if last is not None:
+                record_llm_usage("gemini", GEMINI_MODEL, last)
+
+    async def generate_block(self, topic: str, block_type: str, tone: str = "professional", model_type: str = "gemini",
+                             articles: list = None, refined_context: str = "", others: list = None,
+                             current: dict = None, instructions: str = None) -> dict:
+        """
+        블록 하나만 다시 생성합니다. 반환값: {"type": block_type, "content": {...}}
+        전체 뉴스레터 접두부 대신 블록 전용 짧은 프롬프트(render_block)를 쓰고,
+        저장해 둔 소스/정제 문맥을 그대로 사용하므로 검색/문맥 정제를 다시 실행하지 않습니다.
+        선택한 모델이 실패하면 라우터 순서에 따라 다른 프로바이더로 넘어갑니다.
+        """
+        if block_type not in BLOCK_TYPES:
+            raise ValueError(f"지원하지 않는 블록 타입입니다: {block_type}")
+        prompt = self.prompt_template.render_block(topic, block_type, tone, refined_context, articles,
+                                                   others, current, instructions)
+        last_error = None
+        for provider in self.router.order(self._provider(model_type)):
+            try:
+                with span("generate_block", provider=provider, block_type=block_type):
+                    data = await self._generate_block_with(provider, prompt)
+                block = self._parse_block(data, block_type)
+                self.router.breakers[provider].record_success()
+                return block
+            except Exception as e:
+                self.router.breakers[provider].record_failure()
+                print(f"Block generation failover: {provider} failed ({e})")
+                last_error = e
+        # 응답 형식 오류(ValueError)도 요청 오류와 구분되도록 생성 실패로 알림
+        raise RuntimeError(f"블록을 생성하지 못했습니다: {last_error}") from last_error
+
+    async def _generate_block_with(self, provider: str, prompt: str):
+        if provider == 'gpt':
+            if not self.openai_client:
+                raise RuntimeError("OPENAI_API_KEY가 설정되지 않았습니다.")
+            response = await self._call("gpt", OPENAI_MODEL, "block", lambda: self.openai_client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": JSON_SYSTEM_MESSAGE},
+                    {"role": "user", "content": prompt}
                 ],
-                "sources": [],
-                "images": []
-            }
\ No newline at end of file
+                response_format={"type": "json_object"}
+            ), timeout=self.block_timeout, tokens=estimate_tokens(prompt))
+            return json.loads(response.choices[0].message.content)
+        if not self.gemini_client:
+            raise RuntimeError("GEMINI_API_KEY가 설정되지 않았습니다.")
+        response = await self._call("gemini", GEMINI_MODEL, "block", lambda: self.gemini_client.aio.models.generate_content(
+            model=GEMINI_MODEL, contents=prompt,
+            config=types.GenerateContentConfig(response_mime_type='application/json')
+        ), timeout=self.block_timeout, tokens=estimate_tokens(prompt))
+        return parse_ai_json(response.text)
+
+    @staticmethod
+    def _parse_block(data, block_type: str) -> dict:
+        """
+        모델 응답에서 블록 하나를 꺼냅니다.
+        {"type", "content"} 블록, 뉴스레터 형식({"blocks": [...]}), content만 있는 객체를 모두 받아들입니다.
+        """
+        if isinstance(data, dict) and isinstance(data.get('blocks'), list):
+            blocks = [b for b in data['blocks'] if isinstance(b, dict)]
+            data = next((b for b in blocks if b.get('type') == block_type), blocks[0] if blocks else None)
+        if isinstance(data, list):
+            data = data[0] if data else None
+        if not isinstance(data, dict):
+            raise ValueError("블록 응답이 JSON 객체가 아닙니다.")
+        if isinstance(data.get('content'), dict):
+            content = data['content']
+        else:
+            content = {k: v for k, v in data.items() if k not in ('type', 'id')}
+        if not content:
+            raise ValueError("블록 응답에 content가 없습니다.")
+        return {"type": block_type, "content": content}
@@ -0,0 +1,50 @@
+import os
+import hashlib
+from utils.cache import build_cache, data_path
+from utils.url_utils import normalize_url
+
+
+class ArticleCache:
+    """
+    아티클별 이미지 수집(enrichment) 결과 캐시입니다.
+    URL별로 associated_images, published_date, 추출된 이미지 목록을 저장하며
+    Tavily raw_content의 해시(fingerprint)가 바뀌거나 TTL이 지나면 무효화됩니다.
+    기본적으로 DATA_DIR 아래 SQLite 파일에 저장되어 재시작 후에도 유지됩니다.
+    """
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl or float(os.getenv("ARTICLE_CACHE_TTL", "21600"))
+        self._cache = build_cache(
+            "ARTICLE_CACHE", max_entries=2000, default_ttl=self.ttl,
+            table="article_enrichment", default_db=data_path("cache.db")
+        )
+        self.stale = 0
+
+    @staticmethod
+    def fingerprint(raw_content: str) -> str:
+        return hashlib.sha256((raw_content or '').encode('utf-8')).hexdigest()
+
+    def get(self, url: str, fingerprint: str):
+        """저장된 결과를 반환합니다. 원문 해시가 다르면 무효화하고 None을 반환합니다."""
+        key = normalize_url(url)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry.get('fingerprint') != fingerprint:
+            self.stale += 1
+            self._cache.delete(key)
+            return None
+        return entry
+
+    def set(self, url: str, fingerprint: str, associated_images: list, published_date: str, extracted_images: list):
+        self._cache.set(normalize_url(url), {
+            'fingerprint': fingerprint,
+            'associated_images': associated_images,
+            'published_date': published_date,
+            'extracted_images': extracted_images,
+        })
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats["invalidated"] = self.stale
+        return stats
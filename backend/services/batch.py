@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import asyncio
+import traceback
+from utils.metrics import span
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class BatchRunner:
+    """
+    여러 주제의 뉴스레터를 한 번에 생성합니다.
+    - 같은 요청(공백/대소문자만 다른 주제 포함)은 한 번만 생성해 해당하는 모든 위치에 돌려줍니다.
+    - 주제들은 같은 크롤러(HTTP 풀, 브라우저 풀, 아티클/이미지 캐시와 진행 중 작업 병합)를 공유하고,
+      LLM 호출은 AIGeneratorService의 프로바이더별 스케줄러(동시 실행 수, RPM/TPM)를 거칩니다.
+    - 동시에 진행하는 주제 수는 concurrency로 제한하며, 끝나는 순서대로 결과를 내보냅니다.
+    """
+
+    def __init__(self, pipeline, concurrency: int = None):
+        self.pipeline = pipeline
+        self.concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", "4"))
+        self.batches = 0
+        self.topics = 0
+
+    @staticmethod
+    def _key(request) -> str:
+        payload = request.model_dump()
+        payload["topic"] = " ".join(payload["topic"].split()).lower()
+        return json.dumps(payload, sort_keys=True, ensure_ascii=False)
+
+    def _shared_counters(self) -> dict:
+        """배치 동안 요청 간에 공유되어 절약된 작업을 세기 위한 누적 카운터"""
+        crawler, ai_gen = self.pipeline.crawler, self.pipeline.ai_gen
+        return {
+            "article_cache_hits": crawler.article_cache.stats()["hits"],
+            "articles_coalesced": crawler.coalesced,
+            "url_probes_saved": crawler.url_validator.cache.stats()["hits"] + crawler.url_validator.stats()["coalesced"],
+            "image_probes_saved": crawler.image_ranker.stats()["cache"]["hits"] + crawler.image_ranker.stats()["coalesced"],
+            "llm_wait_s": sum(s["waited_s"] for s in ai_gen.limiter_stats().values()),
+        }
+
+    async def run(self, requests: list):
+        """
+        (비동기 제너레이터) 이벤트를 (이름, 데이터)로 내보냅니다.
+        이벤트 순서: progress → result/error (주제가 끝나는 순서대로) → done
+        """
+        self.batches += 1
+        groups = {}
+        for index, request in enumerate(requests):
+            groups.setdefault(self._key(request), (request, []))[1].append(index)
+
+        yield "progress", {"stage": "batch", "requested": len(requests), "unique": len(groups)}
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        before = self._shared_counters()
+        started = time.perf_counter()
+
+        async def run_one(request, indexes):
+            async with semaphore:
+                topic_started = time.perf_counter()
+                try:
+                    with span("batch_topic", topic=request.topic):
+                        result = await self.pipeline.run(request)
+                    return indexes, request, result, None, time.perf_counter() - topic_started
+                except Exception as e:
+                    print(f"Batch generation failed for '{request.topic}': {e}")
+                    traceback.print_exc()
+                    return indexes, request, None, e, time.perf_counter() - topic_started
+
+        tasks = [asyncio.ensure_future(run_one(request, indexes)) for request, indexes in groups.values()]
+        durations, failed, first_result = [], 0, None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                indexes, request, result, error, elapsed = await next_done
+                self.topics += 1
+                durations.append(elapsed)
+                if first_result is None:
+                    first_result = time.perf_counter() - started
+                if error is not None:
+                    failed += 1
+                    yield "error", {"indexes": indexes, "topic": request.topic, "detail": str(error)}
+                    continue
+                yield "result", {
+                    "indexes": indexes,
+                    "topic": request.topic,
+                    "elapsed_s": round(elapsed, 3),
+                    "newsletter": result,
+                }
+        finally:
+            # 클라이언트가 연결을 끊으면 남은 주제 생성을 취소
+            for task in tasks:
+                task.cancel()
+
+        wall = time.perf_counter() - started
+        after = self._shared_counters()
+        yield "done", {
+            "requested": len(requests),
+            "unique": len(groups),
+            "succeeded": len(groups) - failed,
+            "failed": failed,
+            "elapsed_s": round(wall, 3),
+            "first_result_s": round(first_result or 0.0, 3),
+            "newsletters_per_minute": round(len(groups) / wall * 60, 2) if wall else 0.0,
+            "topic_p50_s": round(_percentile(durations, 50), 3),
+            "topic_p95_s": round(_percentile(durations, 95), 3),
+            "shared": {key: round(after[key] - before[key], 3) for key in after},
+        }
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "topics": self.topics, "concurrency": self.concurrency}
@@ -0,0 +1,217 @@
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from utils.metrics import BROWSER_LAUNCHES
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+class _ContextSlot:
+    """브라우저 컨텍스트 하나와 그 사용 현황을 보관합니다."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.context = None
+        self.in_flight = 0
+        self.pages_served = 0
+        self.retiring = False
+
+
+class BrowserPool:
+    """
+    FastAPI 시작 시 한 번 띄워두고 재사용하는 Playwright 브라우저 풀입니다.
+    - Chromium 프로세스 1개 + 고정 개수의 웜(warm) 컨텍스트를 유지합니다.
+    - 동시에 열 수 있는 페이지 수를 세마포어로 제한합니다.
+    - 컨텍스트는 N 페이지 처리 후, 브라우저는 크래시 시 재생성합니다.
+    """
+
+    def __init__(self, size: int = None, max_pages: int = None, recycle_after: int = None):
+        self.size = size or int(os.getenv("BROWSER_POOL_SIZE", "2"))
+        self.max_pages = max_pages or int(os.getenv("BROWSER_POOL_MAX_PAGES", "6"))
+        self.recycle_after = recycle_after or int(os.getenv("BROWSER_POOL_RECYCLE_AFTER", "50"))
+
+        self._playwright = None
+        self._browser = None
+        self._slots = [_ContextSlot(i) for i in range(self.size)]
+        self._page_semaphore = asyncio.Semaphore(self.max_pages)
+        self._lock = asyncio.Lock()
+        self._started = False
+
+        # 통계
+        self._launches = 0
+        self._restarts = 0
+        self._context_recycles = 0
+        self._pages_served = 0
+        self._pages_in_flight = 0
+        self._waiting = 0
+        self._acquisitions = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._errors = 0
+
+    async def start(self):
+        """브라우저와 컨텍스트를 미리 띄웁니다. (이미 떠 있으면 무시)"""
+        async with self._lock:
+            if self._started and self._browser_alive():
+                return
+            await self._launch()
+
+    async def stop(self):
+        """풀을 종료하고 브라우저 프로세스를 정리합니다."""
+        async with self._lock:
+            await self._teardown()
+            self._started = False
+
+    def _browser_alive(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _launch(self):
+        from playwright.async_api import async_playwright
+
+        if self._started:
+            # 크래시 등으로 재시작하는 경우
+            self._restarts += 1
+            print(f"BrowserPool: restarting browser (restart #{self._restarts})")
+        await self._teardown()
+
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self._launches += 1
+        BROWSER_LAUNCHES.inc()
+        for slot in self._slots:
+            slot.context = await self._new_context()
+            slot.in_flight = 0
+            slot.pages_served = 0
+            slot.retiring = False
+        self._started = True
+        print(f"BrowserPool: launched Chromium with {self.size} contexts (max pages: {self.max_pages})")
+
+    async def _teardown(self):
+        for slot in self._slots:
+            if slot.context is not None:
+                try:
+                    await slot.context.close()
+                except Exception:
+                    pass
+                slot.context = None
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    async def _new_context(self):
+        return await self._browser.new_context(user_agent=DEFAULT_USER_AGENT)
+
+    async def _recycle_slot(self, slot: _ContextSlot):
+        """N 페이지를 처리한 컨텍스트를 닫고 새 컨텍스트로 교체합니다."""
+        async with self._lock:
+            if not slot.retiring or slot.in_flight > 0:
+                return
+            old = slot.context
+            slot.context = None
+            try:
+                if old is not None:
+                    await old.close()
+            except Exception:
+                pass
+            if self._browser_alive():
+                slot.context = await self._new_context()
+            slot.pages_served = 0
+            slot.retiring = False
+            self._context_recycles += 1
+
+    async def _pick_slot(self) -> _ContextSlot:
+        async with self._lock:
+            if not self._started or not self._browser_alive():
+                await self._launch()
+            candidates = [s for s in self._slots if not s.retiring and s.context is not None]
+            if not candidates:
+                candidates = [s for s in self._slots if s.context is not None]
+            if not candidates:
+                await self._launch()
+                candidates = self._slots
+            slot = min(candidates, key=lambda s: s.in_flight)
+            slot.in_flight += 1
+            return slot
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        풀에서 페이지 하나를 빌려줍니다.
+        사용이 끝나면 (예외/취소 포함) 페이지를 닫고 슬롯을 반납합니다.
+        """
+        wait_start = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._page_semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        waited = time.perf_counter() - wait_start
+        self._acquisitions += 1
+        self._queue_wait_total += waited
+        self._queue_wait_max = max(self._queue_wait_max, waited)
+
+        slot = None
+        page = None
+        try:
+            slot = await self._pick_slot()
+            page = await slot.context.new_page()
+            self._pages_in_flight += 1
+            try:
+                yield page
+            finally:
+                self._pages_in_flight -= 1
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            if slot is not None:
+                slot.in_flight -= 1
+                if page is not None:
+                    slot.pages_served += 1
+                    self._pages_served += 1
+                if slot.pages_served >= self.recycle_after:
+                    slot.retiring = True
+                if slot.retiring and slot.in_flight == 0:
+                    try:
+                        await self._recycle_slot(slot)
+                    except Exception as e:
+                        print(f"BrowserPool: context recycle failed: {e}")
+            if not self._browser_alive() and self._started:
+                # 브라우저가 죽었으면 다음 요청에서 재시작되도록 표시만 해둠
+                print("BrowserPool: browser disconnected, will restart on next request")
+            self._page_semaphore.release()
+
+    def stats(self) -> dict:
+        served = self._pages_served
+        acquired = self._acquisitions
+        return {
+            "started": self._started,
+            "browser_alive": self._browser_alive(),
+            "contexts": self.size,
+            "max_pages": self.max_pages,
+            "recycle_after": self.recycle_after,
+            "pages_in_flight": self._pages_in_flight,
+            "pages_served": served,
+            "waiting": self._waiting,
+            "queue_wait_avg_ms": round(self._queue_wait_total / acquired * 1000, 2) if acquired else 0.0,
+            "queue_wait_max_ms": round(self._queue_wait_max * 1000, 2),
+            "launches": self._launches,
+            "restarts": self._restarts,
+            "context_recycles": self._context_recycles,
+            "errors": self._errors,
+        }
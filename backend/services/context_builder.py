@@ -0,0 +1,187 @@
+import os
+import re
+import heapq
+import zlib
+from utils.metrics import CONTEXT_TOKENS
+
+# 프로바이더별 기본 컨텍스트 토큰 예산 (프롬프트 지침/출력 형식은 제외한 소스 본문 분량)
+DEFAULT_BUDGETS = {"gemini": 24000, "gpt": 12000}
+
+PASSAGE_CHARS = 600
+SHINGLE_SIZE = 5
+SKETCH_SIZE = 64
+DUPLICATE_THRESHOLD = 0.6
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토크나이저 없이 토큰 수를 보수적으로 추정합니다.
+    영문/숫자는 약 4자당 1토큰, 한글 등 비ASCII 문자는 1자당 1토큰으로 계산합니다.
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii + 1
+
+
+def split_passages(text: str, max_chars: int = PASSAGE_CHARS) -> list:
+    """본문을 문단 단위로 나누고, 긴 문단은 문장 경계에서 max_chars 이하로 자릅니다."""
+    passages = []
+    for paragraph in re.split(r"\n\s*\n|\n", text or ""):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            passages.append(paragraph)
+            continue
+        current = ""
+        for sentence in re.split(r"(?<=[.!?。])\s+", paragraph):
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current} {sentence}".strip()
+            while len(current) > max_chars:
+                passages.append(current[:max_chars])
+                current = current[max_chars:]
+        if current:
+            passages.append(current)
+    return passages
+
+
+def minhash_sketch(text: str, size: int = SKETCH_SIZE) -> set:
+    """
+    문자 shingle의 해시 중 가장 작은 size개를 모은 bottom-k MinHash 스케치입니다.
+    한국어처럼 띄어쓰기가 불규칙한 텍스트에도 동작하도록 공백을 제거한 문자 n-gram을 사용합니다.
+    """
+    compact = re.sub(r"\s+", "", text.lower())
+    if len(compact) <= SHINGLE_SIZE:
+        return {zlib.crc32(compact.encode("utf-8"))}
+    hashes = {zlib.crc32(compact[i:i + SHINGLE_SIZE].encode("utf-8")) for i in range(len(compact) - SHINGLE_SIZE + 1)}
+    return set(heapq.nsmallest(size, hashes))
+
+
+def estimate_similarity(a: set, b: set, size: int = SKETCH_SIZE) -> float:
+    """두 bottom-k 스케치로 Jaccard 유사도를 추정합니다."""
+    if not a or not b:
+        return 0.0
+    union_sketch = set(heapq.nsmallest(size, a | b))
+    return len(union_sketch & a & b) / len(union_sketch)
+
+
+def _topic_terms(topic: str) -> set:
+    """주제의 단어와 글자 bigram (조사가 붙은 한국어 단어도 부분 일치하도록)"""
+    terms = set()
+    for word in re.findall(r"\w+", (topic or "").lower()):
+        terms.add(word)
+        terms.update(word[i:i + 2] for i in range(len(word) - 1))
+    return terms
+
+
+class ContextBuilder:
+    """
+    LLM 프롬프트에 들어갈 소스 본문을 토큰 예산 안으로 조립합니다.
+    1. 아티클 본문을 문단(passage)으로 나누고
+    2. 소스 간 거의 같은 문단(통신사 기사 재전송 등)을 MinHash로 제거한 뒤
+    3. 주제와의 관련도 순으로 정렬해 모델별 토큰 예산만큼 채웁니다.
+    각 소스의 첫 문단은 예산이 허락하는 한 항상 포함되어 모든 소스가 프롬프트에 남습니다.
+    """
+
+    def __init__(self, budgets: dict = None):
+        self.budgets = budgets or {
+            provider: int(os.getenv(f"CONTEXT_TOKEN_BUDGET_{provider.upper()}", str(default)))
+            for provider, default in DEFAULT_BUDGETS.items()
+        }
+        self.duplicate_threshold = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", str(DUPLICATE_THRESHOLD)))
+
+    def budget_for(self, model_type: str) -> int:
+        provider = "gpt" if model_type == "gpt" else "gemini"
+        return self.budgets[provider]
+
+    def build(self, topic: str, articles: list, model_type: str = "gemini") -> dict:
+        """
+        예산에 맞춘 아티클 목록(content만 교체한 사본)과 통계를 반환합니다.
+        반환값: {"articles", "context", "stats"}
+        """
+        budget = self.budget_for(model_type)
+        terms = _topic_terms(topic)
+
+        passages = []
+        for source_index, article in enumerate(articles or []):
+            for position, text in enumerate(split_passages(article.get('content') or '')):
+                passages.append({
+                    "source": source_index,
+                    "position": position,
+                    "text": text,
+                    "tokens": estimate_tokens(text),
+                    "score": self._score(text, terms, source_index, position),
+                })
+        # 제목/URL/이미지 목록은 항상 프롬프트에 들어가므로 예산에서 먼저 차감
+        overhead = sum(estimate_tokens(f"{a.get('title')} {a.get('url')} {a.get('associated_images', [])}") for a in articles or [])
+        raw_tokens = overhead + sum(p["tokens"] for p in passages)
+
+        # 관련도 높은 문단부터 중복 검사 → 먼저 남은 문단이 대표가 됨
+        ranked = sorted(passages, key=lambda p: p["score"], reverse=True)
+        kept, duplicates = [], 0
+        for passage in ranked:
+            passage["sketch"] = minhash_sketch(passage["text"])
+            if any(estimate_similarity(passage["sketch"], k["sketch"]) >= self.duplicate_threshold for k in kept):
+                duplicates += 1
+                continue
+            kept.append(passage)
+
+        # 소스별 첫 문단 우선 → 나머지는 점수순으로 예산을 채움
+        used = overhead
+        selected, selected_ids = [], set()
+        leads = {}
+        for passage in kept:
+            if passage["source"] not in leads or passage["position"] < leads[passage["source"]]["position"]:
+                leads[passage["source"]] = passage
+        for passage in list(leads.values()) + kept:
+            if id(passage) in selected_ids or used + passage["tokens"] > budget:
+                continue
+            selected.append(passage)
+            selected_ids.add(id(passage))
+            used += passage["tokens"]
+
+        packed_articles = []
+        for source_index, article in enumerate(articles or []):
+            chosen = sorted((p for p in selected if p["source"] == source_index), key=lambda p: p["position"])
+            packed_articles.append({**article, "content": "\n".join(p["text"] for p in chosen)})
+
+        context = "\n".join(
+            f"Article {i+1}:\nTitle: {a.get('title')}\nURL: {a.get('url')}\nContent: {a['content']}\n"
+            for i, a in enumerate(packed_articles)
+        )
+        stats = {
+            "budget": budget,
+            "raw_tokens": raw_tokens,
+            "packed_tokens": used,
+            "passages": len(passages),
+            "duplicates": duplicates,
+            "dropped": len(kept) - len(selected),
+        }
+        provider = "gpt" if model_type == "gpt" else "gemini"
+        CONTEXT_TOKENS.inc(raw_tokens, provider=provider, kind="raw")
+        CONTEXT_TOKENS.inc(used, provider=provider, kind="packed")
+        return {"articles": packed_articles, "context": context, "stats": stats}
+
+    def fit(self, text: str, model_type: str = "gemini") -> str:
+        """아티클 목록 없이 문자열만 있을 때, 예산을 넘는 뒷부분을 잘라냅니다."""
+        budget = self.budget_for(model_type)
+        if estimate_tokens(text) <= budget:
+            return text
+        lines, used = [], 0
+        for line in (text or "").splitlines():
+            tokens = estimate_tokens(line)
+            if used + tokens > budget:
+                break
+            lines.append(line)
+            used += tokens
+        return "\n".join(lines)
+
+    @staticmethod
+    def _score(text: str, terms: set, source_index: int, position: int) -> float:
+        """주제어 일치 비율 + 앞쪽 문단/상위 검색 결과 가중치"""
+        lowered = text.lower()
+        overlap = sum(1 for t in terms if t in lowered) / len(terms) if terms else 0.0
+        return overlap + 0.3 / (1 + position) + 0.1 / (1 + source_index)
@@ -0,0 +1,178 @@
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from utils.cache import build_cache, data_path
+from utils.rate_limit import TokenBucket
+from utils.metrics import HOST_THROTTLES
+
+THROTTLE_STATUSES = (429, 503)
+RATE_DECREASE = 0.7  # 속도 제한을 받을 때마다 호스트 속도에 곱하는 비율
+
+
+def parse_retry_after(value) -> float:
+    """Retry-After 헤더(초 또는 HTTP 날짜)를 기다릴 초로 바꿉니다. 해석할 수 없으면 None."""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostThrottled(Exception):
+    """호스트가 백오프 중이라 요청을 보내지 않았음을 알립니다. (일시적인 실패이므로 결과를 캐시하지 않음)"""
+
+
+class _Host:
+    """호스트 하나의 동시 실행 슬롯, 요청 속도, 백오프 상태"""
+
+    def __init__(self, max_concurrency: int, rate: float, record: dict = None):
+        record = record or {}
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(record.get("rate", rate), capacity=max(1.0, rate))
+        self.backoff_until = record.get("backoff_until", 0.0)  # time.time 기준 (재시작 후에도 유지)
+        self.strikes = record.get("strikes", 0)  # 연속으로 속도 제한을 받은 횟수
+        self.throttles = record.get("throttles", 0)
+        self.changed_at = record.get("changed_at", 0.0)  # 마지막으로 속도를 바꾼 시각 (time.time)
+        self.in_flight = 0
+
+    def record(self) -> dict:
+        return {"rate": self.bucket.rate, "backoff_until": self.backoff_until, "strikes": self.strikes,
+                "throttles": self.throttles, "changed_at": self.changed_at}
+
+
+class CrawlScheduler:
+    """
+    크롤링(HTML, 이미지 프로브, 브라우저 탐색) 요청을 호스트별로 조율합니다.
+    - 호스트별 동시 요청 수와 토큰 버킷 요청 속도를 제한해 한 CDN/언론사에 요청이 몰리지 않게 합니다.
+    - 429/503을 받으면 Retry-After(없으면 지수 백오프)만큼 그 호스트로의 요청을 멈추고 속도를 낮춘 뒤,
+      recovery초 동안 속도 제한 없이 성공하면 원래 속도의 1/4씩 되돌립니다. (AIMD)
+    - 호스트 상태(속도, 백오프 종료 시각)는 요청 간에 공유되고 캐시 DB에 저장되어 재시작 후에도 유지됩니다.
+    """
+
+    def __init__(self, max_per_host: int = None, rate: float = None, min_rate: float = None,
+                 max_backoff: float = None, max_wait: float = None, recovery: float = None):
+        self.max_per_host = max_per_host or int(os.getenv("CRAWL_MAX_PER_HOST", os.getenv("HTTP_POOL_MAX_PER_HOST", "6")))
+        self.rate = float(os.getenv("CRAWL_HOST_RATE", "20")) if rate is None else rate  # 호스트당 초당 요청 수 (0이면 제한 없음)
+        self.min_rate = min_rate or float(os.getenv("CRAWL_HOST_MIN_RATE", "0.5"))
+        self.max_backoff = max_backoff or float(os.getenv("CRAWL_MAX_BACKOFF", "60"))
+        self.recovery = recovery or float(os.getenv("CRAWL_HOST_RECOVERY_S", "15"))
+        # 요청 한 건이 백오프 해제를 기다릴 최대 시간 (넘으면 기다리지 않고 HostThrottled로 바로 실패)
+        self.max_wait = float(os.getenv("CRAWL_MAX_WAIT", "3")) if max_wait is None else max_wait
+        self._health = build_cache(
+            "HOST_HEALTH_CACHE", max_entries=5000, default_ttl=86400,
+            table="host_health", default_db=data_path("cache.db")
+        )
+        self._hosts = {}
+        self.waited_seconds = 0.0
+        self.throttles = 0
+        self.retries = 0
+        self.rejected = 0
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def _host(self, host: str) -> _Host:
+        state = self._hosts.get(host)
+        if state is None:
+            state = _Host(self.max_per_host, self.rate, self._health.get(host))
+            self._hosts[host] = state
+        return state
+
+    def backoff_remaining(self, url: str) -> float:
+        """해당 호스트의 백오프가 끝날 때까지 남은 시간(초)"""
+        return max(0.0, self._host(self.host_of(url)).backoff_until - time.time())
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """
+        호스트의 백오프가 끝나고 속도/동시 실행 한도 안에 들 때까지 기다린 뒤 요청 슬롯을 빌려줍니다.
+        백오프가 max_wait보다 길게 남았으면 HostThrottled를 발생시킵니다.
+        """
+        host = self.host_of(url)
+        state = self._host(host)
+        started = time.monotonic()
+        while True:
+            remaining = state.backoff_until - time.time()
+            if remaining > self.max_wait:
+                self.rejected += 1
+                raise HostThrottled(f"{host} is backing off for {remaining:.1f}s")
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            await state.bucket.acquire(1)
+            await state.semaphore.acquire()
+            # 기다리는 동안 다른 요청이 속도 제한을 받았으면 다시 기다림
+            if state.backoff_until <= time.time():
+                break
+            state.semaphore.release()
+        self.waited_seconds += time.monotonic() - started
+        state.in_flight += 1
+        try:
+            yield
+        finally:
+            state.in_flight -= 1
+            state.semaphore.release()
+
+    def observe(self, url: str, status: int, headers=None) -> float:
+        """
+        응답 상태를 기록해 호스트 속도를 조정합니다.
+        속도 제한(429/503)이면 백오프할 시간(초)을, 아니면 None을 반환합니다.
+        """
+        host = self.host_of(url)
+        state = self._host(host)
+        if status in THROTTLE_STATUSES:
+            retry_after = parse_retry_after((headers or {}).get("retry-after"))
+            delay = min(self.max_backoff, retry_after if retry_after is not None else 2 ** state.strikes)
+            # 동시에 보낸 요청들이 한꺼번에 429를 받은 경우 속도는 한 번만 낮춤
+            now = time.time()
+            if state.backoff_until <= now:
+                state.strikes += 1
+                if self.rate > 0:
+                    state.bucket.rate = max(self.min_rate, state.bucket.rate * RATE_DECREASE)
+                state.changed_at = now
+            state.throttles += 1
+            if now + delay > state.backoff_until:
+                state.backoff_until = now + delay
+                # 백오프가 끝난 직후 쌓인 토큰으로 다시 몰아서 보내지 않도록 버킷을 비움
+                state.bucket.delay(delay)
+            self.throttles += 1
+            HOST_THROTTLES.inc(status=str(status))
+            self._health.set(host, state.record())
+            print(f"CrawlScheduler: {host} returned {status}, backing off {delay:.1f}s (rate {state.bucket.rate:.2f}/s)")
+            return delay
+
+        state.strikes = 0
+        now = time.time()
+        if state.bucket.rate < self.rate and now - state.changed_at >= self.recovery:
+            state.bucket.rate = min(self.rate, state.bucket.rate + self.rate / 4)
+            state.changed_at = now
+            self._health.set(host, state.record())
+        return None
+
+    def should_retry(self, delay: float) -> bool:
+        """속도 제한 응답을 받은 요청을 백오프 후 재시도할지 (기다릴 시간이 상한 이내인 경우)"""
+        if delay is not None and delay <= self.max_wait:
+            self.retries += 1
+            return True
+        return False
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "max_per_host": self.max_per_host,
+            "rate": self.rate,
+            "hosts": len(self._hosts),
+            "backing_off": sorted(h for h, s in self._hosts.items() if s.backoff_until > now),
+            "slowed": sum(1 for s in self._hosts.values() if s.bucket.rate < self.rate),
+            "throttles": self.throttles,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "waited_s": round(self.waited_seconds, 3),
+        }
@@ -1,77 +1,66 @@
 import os
-import requests
+import time
 import asyncio
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
 from tavily import TavilyClient
 from dotenv import load_dotenv
+from services.article_cache import ArticleCache
+from services.browser_pool import BrowserPool
+from services.crawl_scheduler import HostThrottled
+from services.http_pool import HttpPool
+from services.image_dedup import ImageDeduplicator
+from services.image_extractor import ImageExtractor
+from services.image_ranker import ImageRanker
+from services.query_expander import reciprocal_rank_fusion
+from services.search_cache import SearchCache
+from services.url_validator import UrlValidator
+from utils.metrics import span
+from utils.url_utils import normalize_url
 
 load_dotenv()
 
 class CrawlerService:
-    def __init__(self):
+    def __init__(self, browser_pool: BrowserPool = None, http_pool: HttpPool = None):
         self.api_key = os.getenv("TAVILY_API_KEY")
         if not self.api_key:
             raise ValueError("TAVILY_API_KEY가 설정되지 않았습니다.")
         self.client = TavilyClient(api_key=self.api_key)
+        self.search_cache = SearchCache(self.client)
+        self.article_cache = ArticleCache()
+        # 풀이 주입되지 않으면 자체 풀을 만들고 첫 사용 시 지연 시작
+        self.browser_pool = browser_pool or BrowserPool()
+        self.http_pool = http_pool or HttpPool()
+        # HTTP 프로브와 브라우저 탐색이 같은 호스트별 동시 실행/속도 제한과 백오프 상태를 공유
+        self.scheduler = self.http_pool.scheduler
+        self.url_validator = UrlValidator(self.http_pool)
+        # 정적 HTML 파싱 우선, 후보가 부족할 때만 Playwright로 폴백
+        self.image_extractor = ImageExtractor(self.http_pool, self._scrape_images_with_playwright)
+        # 후보 이미지의 헤더만 받아 실제 크기/비율로 순위를 매김
+        self.image_ranker = ImageRanker(self.http_pool)
+        # 다른 CDN/리사이즈 URL로 들어온 같은 사진을 지각 해시로 묶음
+        # 크기/비율 단계는 랭커가 이미 캐시해 둔 프로브만 사용 (교체된 랭커도 따라가도록 람다로 조회)
+        self.image_dedup = ImageDeduplicator(self.http_pool, probe_lookup=lambda url: self.image_ranker.cached_probe(url))
+        # 동시에 진행 중인 아티클 수집 (여러 주제가 같은 기사를 가리킬 때 한 번만 수집)
+        self._enrichments = {}
+        self.coalesced = 0
 
-    def _is_url_valid(self, url: str, check_image: bool = False) -> bool:
+    async def _is_url_valid(self, url: str, check_image: bool = False) -> bool:
         """
         URL이 유효하고 접근 가능한지 확인합니다.
         check_image가 True이면 이미지의 퀄리티(크기, 키워드)도 함께 체크합니다.
         """
-        if not url or not url.startswith('http'):
-            return False
-        
-        # 1. 의미 없는 이미지 필터링 (키워드 기반)
-        if check_image:
-            blacklisted_keywords = [
-                'avatar', 'profile', 'author', 'user', 'icon', 'emoji', 'logo', 
-                'placeholder', 'pixel', 'banner-ad', 'loading', 'gravatar'
-            ]
-            if any(kw in url.lower() for kw in blacklisted_keywords):
-                return False
-
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-        }
-
-        try:
-            # 2. 유효성 및 크기 확인 (HEAD 요청)
-            response = requests.head(url, headers=headers, timeout=3.0, allow_redirects=True)
-            if response.status_code == 200:
-                if check_image:
-                    # Content-Length가 너무 작으면 (예: 5KB 미만) 아이콘일 확률이 높음
-                    content_length = int(response.headers.get('Content-Length', 0))
-                    if 0 < content_length < 5000:
-                        return False
-                return True
-        except:
-            pass
+        return await self.url_validator.is_valid(url, check_image)
 
-        try:
-            # 3. GET 요청 (HEAD 차단된 경우)
-            response = requests.get(url, headers=headers, timeout=3.0, stream=True, allow_redirects=True)
-            return response.status_code == 200
-        except:
-            return False
-
-    def _filter_valid_urls(self, urls: list, check_image: bool = False) -> list:
+    async def _filter_valid_urls(self, urls: list, check_image: bool = False) -> list:
         """
-        병렬로 URL 유효성을 검사하여 유효한 것만 반환합니다.
+        공유 HTTP 풀을 통해 비동기로 URL 유효성을 검사하여 유효한 것만 반환합니다.
         """
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            # functools.partial 대신 lambda를 사용하여 check_image 인자 전달
-            results = list(executor.map(lambda u: self._is_url_valid(u, check_image), urls))
-        return [url for url, is_valid in zip(urls, results) if is_valid]
+        return await self.url_validator.filter_valid(urls, check_image)
 
     async def _scrape_images_with_playwright(self, url: str) -> list:
         """
         Playwright 무두 브라우저를 사용하여 동적 렌더링된 이미지를 추출합니다.
         """
-        from playwright.async_api import async_playwright
-        
         # PDF 또는 직접 다운로드 링크는 제외
         if url.lower().endswith('.pdf') or '/download/' in url.lower():
             print(f"Skipping Playwright for non-HTML URL: {url}")
@@ -79,18 +68,24 @@ class CrawlerService:
 
         extracted = []
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                context = await browser.new_context(
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                )
-                page = await context.new_page()
-                
+            # 요청마다 브라우저를 띄우지 않고 공유 풀에서 페이지를 빌려 사용
+            async with self.browser_pool.page() as page:
                 # 타임아웃 설정 및 에러 핸들링 강화
                 try:
-                    # networkidle 대신 domcontentloaded로 기본 대기 후 짧은 추가 대기
-                    await page.goto(url, wait_until="domcontentloaded", timeout=10000)
-                    await asyncio.sleep(2) # 동적 콘텐츠 렌더링 시간 확보
+                    # 탐색(문서 요청)은 호스트별 스케줄러 슬롯 안에서 수행
+                    async with self.scheduler.slot(url):
+                        # domcontentloaded로 기본 대기 후, 고정 sleep 대신 네트워크가 잠잠해질 때까지만 짧게 대기
+                        response = await page.goto(url, wait_until="domcontentloaded", timeout=10000)
+                    if response is not None and self.scheduler.observe(url, response.status, response.headers) is not None:
+                        # 속도 제한 페이지에서는 추출할 것이 없음
+                        return []
+                    try:
+                        await page.wait_for_load_state("networkidle", timeout=2000)
+                    except Exception:
+                        pass # 동적 콘텐츠 렌더링 시간 상한 (최대 2초)
+                except HostThrottled as e:
+                    print(f"Skipping Playwright for throttled host: {e}")
+                    return []
                 except Exception as e:
                     print(f"Playwright navigation timeout/error for {url}, attempting partial extraction...")
 
@@ -113,8 +108,6 @@ class CrawlerService:
                 }''')
                 extracted.extend(img_srcs)
                 
-                await browser.close()
-                
             # 유효한 확장자만 필터링 및 중복 제거
             valid_extracted = [u for u in extracted if any(ext in u.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp'])]
             return list(dict.fromkeys(valid_extracted))
@@ -143,64 +136,96 @@ class CrawlerService:
         valid_urls = [u for u in urls if any(ext in u.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif'])]
         return list(dict.fromkeys(valid_urls)) # 중복 제거
 
-    async def search_and_extract_async(self, topic: str, max_results: int = 5):
+    async def search_and_extract_async(self, topic: str, max_results: int = 5, deadline: float = None, on_search=None,
+                                       extra_queries=None):
         """
         (비동기) 주제와 관련된 아티클을 검색하고 Playwright를 사용하여 정밀하게 이미지를 추출합니다.
         각 아티클당 최대 3개의 고품질 이미지만 선별하여 최적화합니다.
+        deadline(time.monotonic 기준)이 주어지면 그때까지 끝난 아티클만 사용하고
+        나머지는 취소한 뒤 그때까지 확보한 이미지로 채워 'truncated'에 표시합니다.
+        (마감 전에 오류로 끝난 아티클은 검색 본문과 확보한 이미지로 채우되 'failed'에 따로 표시)
+        on_search(results)가 주어지면 이미지 수집 전에 검색 결과(본문 포함)를 먼저 넘겨줍니다.
+        extra_queries(확장 검색어 목록을 돌려주는 awaitable)가 주어지면 확장 검색어도 함께 검색하고
+        결과를 URL 기준 RRF로 합친 뒤 고유 아티클만 한 번씩 수집합니다.
         """
         try:
-            # 1. Tavily 검색 (원문 포함)
-            search_result = self.client.search(
-                query=topic,
-                search_depth="advanced",
-                include_images=False,
-                include_raw_content=True,
-                max_results=max_results
-            )
-            
-            articles_data = search_result.get('results', [])
-            all_extracted_images = []
-            final_articles = []
+            # 1. Tavily 검색 (원문 포함) - 캐시/동일 요청 병합, 스레드 오프로드
+            articles_data = await self._search(topic, max_results, extra_queries)
+            if on_search and articles_data:
+                on_search(articles_data)
 
             # 2. 각 URL에 대해 병렬로 이미지 수집 수행 (최적화)
-            async def process_article(res):
+            async def process_article(res, progress):
+                with span("article", url=res.get('url')):
+                    return await self._coalesced_enrichment(res, lambda: enrich_article(res, progress))
+
+            async def enrich_article(res, progress):
                 url = res.get('url')
                 if not url: return None
                 
+                # raw_content가 None인 경우에 대한 방어
+                raw_content = res.get('raw_content') or ''
+                fingerprint = self.article_cache.fingerprint(raw_content)
+
+                # 이미 처리한 아티클(원문 동일)이면 Playwright/HEAD 단계를 건너뜀
+                cached = self.article_cache.get(url, fingerprint)
+                if cached is not None:
+                    return {
+                        'title': res.get('title'),
+                        'url': url,
+                        'content': res.get('content'),
+                        'published_date': cached.get('published_date') or res.get('published_date', '날짜 미상'),
+                        'associated_images': cached.get('associated_images', [])
+                    }
+
+                scrape_failed = False
+                meta_images = []
+                progress['meta'] = meta_images
                 try:
                     print(f"Processing images for: {url}")
-                    # Playwright 정밀 스크래핑 및 Tavily 원문 추출 병합
-                    scraped_images = await self._scrape_images_with_playwright(url)
-                    
-                    # raw_content가 None인 경우에 대한 방어
-                    raw_content = res.get('raw_content') or ''
+                    # 정적 HTML 추출(필요 시 Playwright 폴백) 및 Tavily 원문 추출 병합
+                    with span("image_extraction", url=url):
+                        scraped_images = await self.image_extractor.extract(url, meta=meta_images)
                     content_images = self._extract_images_from_text(raw_content)
                     
-                    # 중복 제거 및 지능형 필터링 (최대 3개 선별)
+                    # 중복 제거 후 품질 순위로 최대 3개 선별
                     combined = list(dict.fromkeys(scraped_images + content_images))
+                    progress['candidates'] = combined
                 except Exception as e:
                     print(f"Error processing article images for {url}: {e}")
                     combined = []
-                valid_extracted = self._filter_valid_urls(combined[:10], check_image=True)[:3]
+                    scrape_failed = True
+                with span("image_ranking", url=url, candidates=len(combined[:10])):
+                    valid_extracted = await self.image_ranker.select(combined[:10], meta=meta_images, limit=3)
+                published_date = res.get('published_date', '날짜 미상')
+
+                if not scrape_failed:
+                    self.article_cache.set(url, fingerprint, valid_extracted, published_date, combined)
                 
                 return {
                     'title': res.get('title'),
                     'url': url,
                     'content': res.get('content'),
-                    'published_date': res.get('published_date', '날짜 미상'),
+                    'published_date': published_date,
                     'associated_images': valid_extracted
                 }
 
             # asyncio.gather를 통한 병렬 처리로 전체 속도 개선
-            tasks = [process_article(res) for res in articles_data]
-            results = await asyncio.gather(*tasks)
+            progress = [{} for _ in articles_data]
+            tasks = [asyncio.ensure_future(process_article(res, p)) for res, p in zip(articles_data, progress)]
+            truncated = []
+            failed = []
+            if deadline is None:
+                results = await asyncio.gather(*tasks)
+            else:
+                results = await self._collect_until_deadline(articles_data, tasks, progress, deadline, truncated, failed)
             
-            for a in results:
-                if a:
-                    final_articles.append(a)
-                    all_extracted_images.extend(a['associated_images'])
+            final_articles = [a for a in results if a]
 
-            unique_images = list(dict.fromkeys(all_extracted_images))
+            # URL이 달라도 같은 사진이면 하나만 남김 (마감이 있으면 남은 시간 안에서만)
+            budget = None if deadline is None else max(0.0, deadline - time.monotonic())
+            with span("image_dedup", query=topic):
+                unique_images = await self.image_dedup.dedupe(final_articles, budget=budget)
             
             # 컨텍스트 생성
             context_text = f"오늘 날짜: {datetime.now().strftime('%Y-%m-%d')}\n\n"
@@ -213,11 +238,106 @@ class CrawlerService:
             return {
                 "articles": final_articles,
                 "context": context_text,
-                "images": unique_images
+                "images": unique_images,
+                "truncated": truncated,
+                "failed": failed
             }
 
         except Exception as e:
             print(f"CrawlerService (Async) 오류: {e}")
             import traceback
             traceback.print_exc()
-            return {"articles": [], "context": "", "images": []}
+            return {"articles": [], "context": "", "images": [], "truncated": [], "failed": []}
+
+    async def _search_one(self, query: str, max_results: int) -> list:
+        with span("tavily_search", query=query):
+            result = await self.search_cache.search(query, max_results=max_results, depth="advanced")
+        return result.get('results', [])
+
+    async def _search(self, topic: str, max_results: int, extra_queries=None) -> list:
+        """원래 주제 검색을 바로 시작하고, 확장 검색어가 준비되면 동시에 검색해 결과를 합칩니다."""
+        primary = asyncio.ensure_future(self._search_one(topic, max_results))
+        if extra_queries is None:
+            return await primary
+        try:
+            queries = await extra_queries
+        except Exception as e:
+            print(f"Query expansion failed, searching topic only: {e}")
+            queries = []
+        if not queries:
+            return await primary
+
+        results = await asyncio.gather(primary, *(self._search_one(q, max_results) for q in queries), return_exceptions=True)
+        if isinstance(results[0], BaseException):
+            raise results[0]
+        lists = [r for r in results if not isinstance(r, BaseException)]
+        fused = reciprocal_rank_fusion(lists, limit=max_results)
+        print(f"Query fusion: {len(lists)} queries, {sum(map(len, lists))} results -> {len(fused)} unique articles")
+        return fused
+
+    async def _coalesced_enrichment(self, res: dict, enrich):
+        """
+        같은 아티클(URL + 원문)을 다른 요청이 수집 중이면 그 결과를 함께 기다립니다.
+        수집을 시작한 요청이 마감으로 취소되면 작업도 취소되고, 기다리던 요청은 직접 다시 수집합니다.
+        """
+        url = res.get('url')
+        if not url:
+            return await enrich()
+        key = (normalize_url(url), self.article_cache.fingerprint(res.get('raw_content') or ''))
+        shared = self._enrichments.get(key)
+        if shared is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if not shared.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            return await enrich()
+
+        task = asyncio.ensure_future(enrich())
+        self._enrichments[key] = task
+        try:
+            return await task
+        finally:
+            if self._enrichments.get(key) is task:
+                del self._enrichments[key]
+
+    async def _collect_until_deadline(self, articles_data: list, tasks: list, progress: list, deadline: float,
+                                      truncated: list, failed: list) -> list:
+        """
+        마감 시각까지 끝난 아티클 결과를 모으고, 남은 작업은 취소합니다.
+        취소는 브라우저 페이지/HTTP 연결의 정리까지 기다린 뒤 반환합니다.
+        마감으로 취소된 아티클 URL은 truncated에, 오류로 끝난 아티클 URL은 failed에 추가합니다.
+        """
+        remaining = max(0.0, deadline - time.monotonic())
+        done, pending = await asyncio.wait(tasks, timeout=remaining)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results = []
+        for res, task, prog in zip(articles_data, tasks, progress):
+            if task in done and not task.cancelled() and task.exception() is None:
+                results.append(task.result())
+                continue
+            url = res.get('url')
+            if not url:
+                continue
+            # 이미 프로브를 마친(캐시된) 이미지만으로 순위를 매겨 부분 결과로 유지
+            candidates = prog.get('candidates') or self._extract_images_from_text(res.get('raw_content') or '')
+            partial_images = self.image_ranker.cached_select(candidates[:10], meta=prog.get('meta'), limit=3)
+            if task in done and not task.cancelled():
+                print(f"Article enrichment failed: {url} ({task.exception()!r}, {len(partial_images)} images kept)")
+                failed.append(url)
+            else:
+                print(f"Crawl budget exceeded, truncated: {url} ({len(partial_images)} images kept)")
+                truncated.append(url)
+            results.append({
+                'title': res.get('title'),
+                'url': url,
+                'content': res.get('content'),
+                'published_date': res.get('published_date', '날짜 미상'),
+                'associated_images': partial_images
+            })
+        return results
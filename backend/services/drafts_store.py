@@ -0,0 +1,250 @@
+import os
+import json
+import uuid
+import base64
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from utils.cache import data_path
+
+DRAFT = "draft"
+PUBLISHED = "published"
+STATUSES = (DRAFT, PUBLISHED)
+
+
+def _now() -> str:
+    # 자리수가 고정된 UTC ISO-8601 문자열이라 문자열 비교로 시간순 정렬/커서 비교가 가능 (Supabase timestamptz와 호환)
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def normalize_timestamp(value: str) -> str:
+    """
+    ISO 날짜/시각을 created_at과 같은 형식의 UTC 문자열로 바꿉니다. (잘못된 값이면 ValueError)
+    오프셋이 없으면 UTC로 보고, +09:00 같은 오프셋은 UTC로 환산해야 문자열 비교가 올바른 행을 고릅니다.
+    """
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00").replace("z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"잘못된 날짜 형식입니다: {value} (ISO 8601 날짜 또는 시각)")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def topic_key(topic: str) -> str:
+    """주제 검색용 정규화 키 (대소문자/공백 차이 무시)"""
+    return " ".join((topic or "").lower().split())
+
+
+def encode_cursor(created_at: str, draft_id: str) -> str:
+    raw = json.dumps([created_at, draft_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """잘못된 커서면 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, draft_id = json.loads(raw)
+        return str(created_at), str(draft_id)
+    except Exception:
+        raise ValueError("잘못된 커서입니다.")
+
+
+class DraftNotFound(KeyError):
+    pass
+
+
+class DraftStore:
+    """
+    생성된 뉴스레터 초안을 저장하는 SQLite 저장소입니다. (Supabase의 newsletters / blocks 테이블과 같은 컬럼 구성)
+    - newsletters: 제목, 주제, 상태, 소스/이미지(JSON)와 생성 요청을 한 행에 저장합니다.
+    - blocks: 블록을 한 행씩 저장해, 편집 시 해당 블록 행만 갱신하고 문서 전체를 다시 쓰지 않습니다.
+    목록은 (created_at, id) 키셋 커서로 페이지를 나누고, 주제/날짜 조건은 인덱스로 처리합니다.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("DRAFTS_DB", data_path("drafts.db"))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS newsletters ("
+            "id TEXT PRIMARY KEY, topic TEXT NOT NULL, topic_key TEXT NOT NULL, title TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'draft', block_count INTEGER NOT NULL DEFAULT 0, "
+            "images TEXT NOT NULL DEFAULT '[]', sources TEXT NOT NULL DEFAULT '[]', "
+            "truncated_sources TEXT NOT NULL DEFAULT '[]', request TEXT, "
+            "created_at TEXT NOT NULL, updated_at TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS blocks ("
+            "newsletter_id TEXT NOT NULL REFERENCES newsletters(id) ON DELETE CASCADE, "
+            "id TEXT NOT NULL, position INTEGER NOT NULL, type TEXT NOT NULL, content TEXT NOT NULL, "
+            "updated_at TEXT NOT NULL, PRIMARY KEY (newsletter_id, id));"
+            "CREATE INDEX IF NOT EXISTS idx_newsletters_created ON newsletters(created_at, id);"
+            "CREATE INDEX IF NOT EXISTS idx_newsletters_topic ON newsletters(topic_key, created_at, id);"
+            "CREATE INDEX IF NOT EXISTS idx_blocks_position ON blocks(newsletter_id, position);"
+        )
+        self._conn.commit()
+        self.block_patches = 0
+
+    def create(self, topic: str, newsletter: dict, request: dict = None, status: str = DRAFT) -> dict:
+        """생성 결과(NewsletterResponse 형태)를 초안으로 저장하고 요약을 반환합니다."""
+        draft_id = uuid.uuid4().hex
+        now = _now()
+        blocks = [b for b in newsletter.get("blocks", []) if isinstance(b, dict)]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO newsletters (id, topic, topic_key, title, status, block_count, images, sources, "
+                "truncated_sources, request, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (draft_id, topic, topic_key(topic), newsletter.get("title") or topic, status, len(blocks),
+                 _dumps(newsletter.get("images", [])), _dumps(newsletter.get("sources", [])),
+                 _dumps(newsletter.get("truncated_sources", [])), _dumps(request) if request else None, now, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO blocks (newsletter_id, id, position, type, content, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(draft_id, block_id, i, b.get("type", ""), _dumps(b.get("content", {})), now)
+                 for i, (block_id, b) in enumerate(zip(_unique_ids(blocks), blocks))],
+            )
+        return self.summary(draft_id)
+
+    def list(self, topic: str = None, since: str = None, until: str = None, status: str = None,
+             limit: int = 20, cursor: str = None) -> dict:
+        """
+        최신순 초안 요약 목록을 반환합니다. {"items": [...], "next_cursor": 다음 페이지 커서 또는 None}
+        since/until은 ISO 날짜(시각)이며 UTC로 환산해 비교하고, until은 그 시각 미만입니다. (잘못된 값이면 ValueError)
+        """
+        since = normalize_timestamp(since) if since else None
+        until = normalize_timestamp(until) if until else None
+        clauses, params = [], []
+        if topic:
+            clauses.append("topic_key = ?")
+            params.append(topic_key(topic))
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if cursor:
+            created_at, draft_id = decode_cursor(cursor)
+            # 행 값 비교라야 인덱스 범위 탐색이 됨 (OR로 풀어 쓰면 앞 페이지들을 다시 훑음)
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend([created_at, draft_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM newsletters {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+        items = [dict(r) for r in rows[:limit]]
+        next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"]) if len(rows) > limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def summary(self, draft_id: str) -> dict:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_SUMMARY_COLUMNS} FROM newsletters WHERE id = ?", (draft_id,)).fetchone()
+        if row is None:
+            raise DraftNotFound(draft_id)
+        return dict(row)
+
+    def get(self, draft_id: str) -> dict:
+        """블록, 소스, 이미지를 포함한 초안 전체를 반환합니다."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM newsletters WHERE id = ?", (draft_id,)).fetchone()
+            if row is None:
+                raise DraftNotFound(draft_id)
+            blocks = self._conn.execute(
+                "SELECT id, type, content FROM blocks WHERE newsletter_id = ? ORDER BY position", (draft_id,)
+            ).fetchall()
+        draft = dict(row)
+        draft.pop("topic_key")
+        for key in ("images", "sources", "truncated_sources", "request"):
+            draft[key] = json.loads(draft[key]) if draft[key] else None
+        draft["blocks"] = [{"id": b["id"], "type": b["type"], "content": json.loads(b["content"])} for b in blocks]
+        return draft
+
+    def update(self, draft_id: str, title: str = None, status: str = None) -> dict:
+        """초안의 제목/상태만 바꿉니다."""
+        fields = {k: v for k, v in (("title", title), ("status", status)) if v is not None}
+        fields["updated_at"] = _now()
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(f"UPDATE newsletters SET {columns} WHERE id = ?", (*fields.values(), draft_id))
+        if cursor.rowcount == 0:
+            raise DraftNotFound(draft_id)
+        return self.summary(draft_id)
+
+    def patch_block(self, draft_id: str, block_id: str, content: dict, block_type: str = None) -> dict:
+        """블록 하나의 내용(과 종류)을 바꿉니다. 해당 블록 행과 초안의 updated_at만 갱신합니다."""
+        now = _now()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE blocks SET content = ?, type = COALESCE(?, type), updated_at = ? WHERE newsletter_id = ? AND id = ?",
+                (_dumps(content), block_type, now, draft_id, block_id),
+            )
+            if cursor.rowcount == 0:
+                raise DraftNotFound(f"{draft_id}/{block_id}")
+            self._conn.execute("UPDATE newsletters SET updated_at = ? WHERE id = ?", (now, draft_id))
+            row = self._conn.execute(
+                "SELECT id, type, content FROM blocks WHERE newsletter_id = ? AND id = ?", (draft_id, block_id)
+            ).fetchone()
+        self.block_patches += 1
+        return {"id": row["id"], "type": row["type"], "content": json.loads(row["content"]), "updated_at": now}
+
+    def add_block(self, draft_id: str, block_id: str, block_type: str, content: dict) -> dict:
+        """블록 하나를 초안 끝에 추가합니다. 새 블록 행과 초안의 block_count/updated_at만 갱신합니다."""
+        now = _now()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE newsletters SET block_count = block_count + 1, updated_at = ? WHERE id = ?", (now, draft_id)
+            )
+            if cursor.rowcount == 0:
+                raise DraftNotFound(draft_id)
+            self._conn.execute(
+                "INSERT INTO blocks (newsletter_id, id, position, type, content, updated_at) "
+                "SELECT ?, ?, COALESCE(MAX(position), -1) + 1, ?, ?, ? FROM blocks WHERE newsletter_id = ?",
+                (draft_id, block_id, block_type, _dumps(content), now, draft_id),
+            )
+        self.block_patches += 1
+        return {"id": block_id, "type": block_type, "content": content, "updated_at": now}
+
+    def delete(self, draft_id: str):
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM newsletters WHERE id = ?", (draft_id,))
+        if cursor.rowcount == 0:
+            raise DraftNotFound(draft_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            drafts = self._conn.execute("SELECT COUNT(*) FROM newsletters").fetchone()[0]
+        return {"drafts": drafts, "block_patches": self.block_patches, "path": self.path}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_SUMMARY_COLUMNS = "id, topic, title, status, block_count, created_at, updated_at"
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _unique_ids(blocks: list) -> list:
+    """블록 ID 목록 (없거나 겹치는 ID는 위치 기반 ID로 바꿈)"""
+    ids, seen = [], set()
+    for i, block in enumerate(blocks):
+        block_id = str(block.get("id") or i + 1)
+        if block_id in seen:
+            block_id = f"{block_id}-{i + 1}"
+        seen.add(block_id)
+        ids.append(block_id)
+    return ids
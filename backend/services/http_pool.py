@@ -0,0 +1,107 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+import httpx
+from services.crawl_scheduler import CrawlScheduler
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+}
+
+
+class HttpPool:
+    """
+    프로세스 전체에서 공유하는 비동기 HTTP 클라이언트입니다.
+    - 하나의 httpx.AsyncClient로 keep-alive 연결을 재사용합니다.
+    - 전체 동시 요청 수는 세마포어로, 호스트별 동시 요청 수/속도/백오프는 CrawlScheduler로 제한합니다.
+    - 429/503 응답은 스케줄러에 알리고, 백오프가 짧으면 기다렸다가 max_retries번까지 다시 요청합니다.
+      (그래도 속도 제한이면 받은 응답을 그대로 돌려줌)
+    """
+
+    def __init__(self, max_connections: int = None, max_per_host: int = None, timeout: float = None,
+                 scheduler: CrawlScheduler = None, max_retries: int = None):
+        self.max_connections = max_connections or int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "50"))
+        self.timeout = timeout or float(os.getenv("HTTP_POOL_TIMEOUT", "3.0"))
+        self.max_retries = int(os.getenv("HTTP_POOL_MAX_RETRIES", "1")) if max_retries is None else max_retries
+        # 브라우저 탐색도 같은 스케줄러를 거치도록 외부에서 공유해 사용
+        self.scheduler = scheduler or CrawlScheduler(max_per_host=max_per_host)
+        self.max_per_host = self.scheduler.max_per_host
+
+        self._client = None
+        self._global_semaphore = asyncio.Semaphore(self.max_connections)
+
+        # 통계
+        self._requests = 0
+        self._errors = 0
+        self._in_flight = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=30.0,
+                ),
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def _slot(self, url: str):
+        # 호스트 백오프/속도 대기 중에는 전체 연결 슬롯을 잡지 않음
+        async with self.scheduler.slot(url):
+            async with self._global_semaphore:
+                self._in_flight += 1
+                self._requests += 1
+                try:
+                    yield
+                except httpx.HTTPError:
+                    # stream()은 호출자의 코드도 이 안에서 실행되므로 전송 오류(본문 읽기 포함)만 집계
+                    self._errors += 1
+                    raise
+                finally:
+                    self._in_flight -= 1
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """본문까지 모두 읽는 일반 요청입니다."""
+        attempt = 0
+        while True:
+            async with self._slot(url):
+                response = await self.client.request(method, url, **kwargs)
+            delay = self.scheduler.observe(url, response.status_code, response.headers)
+            if attempt >= self.max_retries or not self.scheduler.should_retry(delay):
+                return response
+            attempt += 1
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """본문을 읽지 않고 헤더만 먼저 받는 스트리밍 요청입니다."""
+        attempt = 0
+        while True:
+            async with self._slot(url):
+                async with self.client.stream(method, url, **kwargs) as response:
+                    delay = self.scheduler.observe(url, response.status_code, response.headers)
+                    if attempt >= self.max_retries or not self.scheduler.should_retry(delay):
+                        yield response
+                        return
+            attempt += 1
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "max_connections": self.max_connections,
+            "max_per_host": self.max_per_host,
+            "requests": self._requests,
+            "in_flight": self._in_flight,
+            "errors": self._errors,
+            "hosts": self.scheduler.stats()["hosts"],
+        }
@@ -0,0 +1,316 @@
+import io
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from services.http_pool import HttpPool
+from services.image_ranker import _total_size
+from utils.cache import build_cache, data_path
+from utils.single_flight import SingleFlight
+from utils.url_utils import canonical_image_url, normalize_url
+from utils.metrics import IMAGE_DUPLICATES
+
+try:
+    from PIL import Image, ImageFile
+except ImportError:  # Pillow가 없으면 URL 기준 중복 제거만 수행
+    Image = ImageFile = None
+
+HASH_SIZE = 8  # 8x8 차이 해시 = 64비트
+
+
+def compute_dhash(data: bytes, partial: bool = False):
+    """
+    이미지 바이트의 차이 해시(dHash)와 원본 크기를 (hash, width, height)로 반환합니다.
+    JPEG는 draft 모드로 디코딩 단계에서 바로 축소해 큰 사진도 적은 CPU로 처리합니다.
+    partial이면 파일 앞부분만 받은 것으로, 앞쪽 스캔만으로 전체 화면의 저해상도 이미지가 나오는
+    프로그레시브 JPEG만 해시합니다. (일반 JPEG는 아래쪽이 비어 틀린 해시가 되므로 None)
+    (프로세스 풀에서 실행되므로 모듈 최상위 함수로 둠)
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if partial and not (img.format == "JPEG" and img.info.get("progressive")):
+                return None
+            ImageFile.LOAD_TRUNCATED_IMAGES = partial
+            width, height = img.size
+            img.draft("L", (HASH_SIZE * 4, HASH_SIZE * 4))
+            small = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+            pixels = list(small.getdata())
+    except Exception:
+        return None
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value, width, height
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+HASH_MODES = ("background", "inline", "off")
+ASPECT_TOLERANCE = 0.03  # 같은 사진의 렌디션으로 볼 가로세로 비율 차이 (반올림 오차 포함)
+
+
+class ImageDeduplicator:
+    """
+    여러 소스에서 모은 이미지의 중복(신디케이션 기사, 다른 CDN, 다른 리사이즈 파라미터)을 제거합니다.
+    1. canonical_image_url로 같은 원본의 렌디션을 먼저 묶고
+    2. 이미지 랭커가 캐시해 둔 헤더 프로브(형식, 너비, 높이, 파일 크기)가 모두 같은 이미지를 묶은 뒤
+    3. 남은 이미지 중 가로세로 비율이 겹치는(또는 크기를 모르는) 후보만 지각 해시(dHash)로 비교해
+       그룹마다 가장 큰 이미지 하나만 남깁니다.
+    해시가 없는 후보는 앞부분(IMAGE_HASH_MAX_BYTES)만 Range로 받아 요청 안에서 예산(요청의 남은 시간과
+    IMAGE_DEDUP_BUDGET_S 중 작은 값) 동안 해시하고, 예산 안에 끝나지 않은 해시는 계속 진행해 캐시에 채웁니다.
+    IMAGE_DEDUP_HASH=background이면 요청은 캐시된 해시만 쓰고 해시는 다음 요청을 위해 백그라운드에서 계산하며,
+    off이면 1~2단계만 수행합니다.
+    """
+
+    def __init__(self, http_pool: HttpPool, workers: int = None, budget: float = None, probe_lookup=None):
+        self.http_pool = http_pool
+        # url -> 캐시된 이미지 프로브(dict) 또는 None (네트워크 요청 없음)
+        self.probe_lookup = probe_lookup
+        self.enabled = os.getenv("IMAGE_DEDUP", "1") != "0" and Image is not None
+        mode = os.getenv("IMAGE_DEDUP_HASH", "inline")
+        self.hash_mode = mode if mode in HASH_MODES else "inline"
+        self.workers = workers if workers is not None else int(os.getenv("IMAGE_HASH_WORKERS", "2"))
+        self.budget = budget or float(os.getenv("IMAGE_DEDUP_BUDGET_S", "1.0"))
+        self.max_distance = int(os.getenv("IMAGE_DEDUP_DISTANCE", "6"))
+        # 해시용으로 받는 최대 바이트 (이보다 큰 이미지는 앞부분만으로 해시할 수 있는 프로그레시브 JPEG만 해시)
+        self.max_bytes = int(os.getenv("IMAGE_HASH_MAX_BYTES", str(1024 * 1024)))
+        self.max_images = int(os.getenv("IMAGE_DEDUP_MAX_IMAGES", "40"))
+        self.negative_ttl = float(os.getenv("IMAGE_HASH_NEGATIVE_TTL", "1800"))
+        self._hashes = build_cache(
+            "IMAGE_HASH_CACHE", max_entries=5000, default_ttl=7 * 86400,
+            table="image_hash", default_db=data_path("cache.db")
+        )
+        self._executor = None
+        self._flight = SingleFlight()
+        self._background = set()
+        self.hashed = 0
+        self.timeouts = 0
+        self.skipped = 0  # 크기/비율로 해시 없이 판단이 끝나 해시하지 않은 이미지 수
+        self.partial = 0  # 앞부분만으로 해시한 프로그레시브 JPEG 수
+        self.bytes_read = 0
+        self.duplicates = {"url": 0, "size": 0, "hash": 0}
+
+    @property
+    def executor(self):
+        # 해시 계산을 이벤트 루프 밖의 별도 프로세스로 보내고, 워커 수로 CPU 사용량을 제한
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def dedupe(self, articles: list, budget: float = None) -> list:
+        """
+        아티클들의 associated_images에서 중복을 제거하고(대표 이미지는 처음 등장한 아티클에만 남김)
+        전체 고유 이미지 목록을 등장 순서대로 반환합니다.
+        """
+        images = [img for a in articles for img in a.get('associated_images', [])]
+        representative = await self.group(images, budget)
+
+        seen = set()
+        for article in articles:
+            kept = []
+            for img in article.get('associated_images', []):
+                rep = representative.get(img, img)
+                if rep not in seen:
+                    seen.add(rep)
+                    kept.append(rep)
+            article['associated_images'] = kept
+        return list(dict.fromkeys(representative.get(img, img) for img in images))
+
+    async def group(self, images: list, budget: float = None) -> dict:
+        """이미지 URL → 그룹 대표 URL 매핑을 반환합니다."""
+        images = list(dict.fromkeys(img for img in images if img))
+        representative = {}
+
+        # 1. URL 정규화 + 리사이즈 파라미터 제거로 같은 원본 묶기
+        by_canonical = {}
+        for img in images:
+            key = canonical_image_url(img)
+            if key in by_canonical:
+                self._merge(representative, img, by_canonical[key], "url")
+            else:
+                by_canonical[key] = img
+        distinct = list(by_canonical.values())
+        if not self.enabled or len(distinct) < 2:
+            return representative
+
+        # 2. 캐시된 헤더 프로브로 형식/너비/높이/파일 크기가 모두 같은 파일 묶기 (네트워크 없음)
+        probes = {img: self._probe(img) for img in distinct}
+        by_size = {}
+        remaining = []
+        for img in distinct:
+            probe = probes[img]
+            key = (probe["format"], probe["width"], probe["height"], probe["size"]) if probe else None
+            if key is None or None in key:
+                remaining.append(img)
+            elif key in by_size:
+                self._merge(representative, img, by_size[key], "size")
+            else:
+                by_size[key] = img
+                remaining.append(img)
+
+        # 3. 비율이 겹치는 후보만 지각 해시로 비교
+        candidates = self._hash_candidates(remaining, probes)
+        self.skipped += len(remaining) - len(candidates)
+        if len(candidates) < 2:
+            return representative
+        cached = {img: self._hashes.get(normalize_url(img)) for img in candidates}
+        hashes = {img: tuple(c["hash"]) for img, c in cached.items() if c is not None and c["hash"]}
+        # 캐시에 없는 이미지만 해시 (해시할 수 없다고 기록된 이미지는 negative_ttl 동안 건너뜀)
+        missing = [img for img, c in cached.items() if c is None][:self.max_images]
+        if missing and self.hash_mode == "inline":
+            hashes.update(await self._hash_all(missing, self.budget if budget is None else min(budget, self.budget)))
+        elif missing and self.hash_mode == "background":
+            self._hash_in_background(missing)
+        self._group_by_hash(candidates, hashes, probes, representative)
+        # URL/크기 단계에서 묶인 이미지도 해시 그룹의 최종 대표로 연결
+        for img in list(representative):
+            rep = representative[img]
+            while representative.get(rep, rep) != rep:
+                rep = representative[rep]
+            representative[img] = rep
+        return representative
+
+    def _merge(self, representative: dict, img: str, rep: str, method: str):
+        representative[img] = rep
+        self.duplicates[method] += 1
+        IMAGE_DUPLICATES.inc(method=method)
+
+    def _probe(self, url: str):
+        if self.probe_lookup is None:
+            return None
+        probe = self.probe_lookup(url)
+        return probe if probe and probe.get("valid") else None
+
+    @staticmethod
+    def _hash_candidates(images: list, probes: dict) -> list:
+        """
+        가로세로 비율이 ASPECT_TOLERANCE 안에서 다른 이미지와 겹치는 이미지만 반환합니다.
+        크기를 모르는 이미지가 있으면 어떤 이미지와도 같을 수 있으므로 모두 후보로 둡니다.
+        """
+        known = [(probes[img]["width"] / probes[img]["height"], img) for img in images
+                 if probes[img] and probes[img]["width"] and probes[img]["height"]]
+        if len(known) < len(images):
+            return images
+        known.sort()
+        selected = set()
+        for (ratio_a, a), (ratio_b, b) in zip(known, known[1:]):
+            if ratio_b <= ratio_a * (1 + ASPECT_TOLERANCE):
+                selected.update((a, b))
+        return [img for img in images if img in selected]
+
+    def _group_by_hash(self, candidates: list, hashes: dict, probes: dict, representative: dict):
+        groups = []  # [대표 URL, 대표 해시, 대표 면적, 구성원 URL 목록]
+        for img in candidates:
+            info = hashes.get(img)
+            if info is None:
+                continue
+            value, width, height = info
+            match = next((g for g in groups if hamming(g[1], value) <= self.max_distance), None)
+            if match is None:
+                groups.append([img, value, width * height, [img]])
+                continue
+            match[3].append(img)
+            if width * height > match[2]:
+                match[0], match[1], match[2] = img, value, width * height
+        for best, _, _, members in groups:
+            for img in members:
+                if img != best:
+                    self._merge(representative, img, best, "hash")
+            representative[best] = best
+
+    def _hash_in_background(self, images: list):
+        """요청을 기다리게 하지 않고 해시를 계산해 캐시에 채웁니다."""
+        task = asyncio.ensure_future(self._hash_all(images, None))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _hash_all(self, images: list, budget: float) -> dict:
+        tasks = {img: asyncio.ensure_future(self._hash(img)) for img in images}
+        done, pending = await asyncio.wait(tasks.values(), timeout=budget)
+        # 예산을 넘긴 해시는 취소하지 않고 끝까지 계산해 다음 요청에서 캐시로 사용
+        for task in pending:
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        if pending:
+            self.timeouts += len(pending)
+            print(f"Image dedup budget exceeded: {len(pending)} images left to hash in background")
+        return {img: task.result() for img, task in tasks.items() if task in done and not task.exception()}
+
+    async def _hash(self, url: str):
+        key = normalize_url(url)
+        cached = self._hashes.get(key)
+        if cached is not None:
+            return tuple(cached["hash"]) if cached["hash"] else None
+        return await self._flight.do(key, lambda: self._download_and_hash(key, url))
+
+    async def _download_and_hash(self, key: str, url: str):
+        downloaded = await self._download(url)
+        result = None
+        if downloaded:
+            data, partial = downloaded
+            loop = asyncio.get_running_loop()
+            if self.executor is not None:
+                result = await loop.run_in_executor(self.executor, compute_dhash, data, partial)
+            else:
+                result = await asyncio.to_thread(compute_dhash, data, partial)
+            if result:
+                self.hashed += 1
+                self.partial += partial
+        # 내려받지 못한 이미지는 잠시 후 다시 시도할 수 있도록 짧게 저장
+        self._hashes.set(key, {"hash": list(result) if result else None}, ttl=None if result else self.negative_ttl)
+        return result
+
+    async def _download(self, url: str):
+        """
+        이미지 앞부분 max_bytes만 Range로 받아 (바이트, 잘렸는지 여부)를 반환합니다. 실패하면 None.
+        잘린 이미지는 compute_dhash가 프로그레시브 JPEG일 때만 해시합니다.
+        """
+        probe = self._probe(url)
+        if probe and probe.get("size") and probe["size"] > self.max_bytes and probe.get("format") != "jpeg":
+            # 앞부분만으로 해시할 수 있는 형식이 아니면 받지 않음
+            return None
+        try:
+            headers = {'Range': f'bytes=0-{self.max_bytes - 1}'}
+            async with self.http_pool.stream('GET', url, headers=headers) as response:
+                if response.status_code not in (200, 206):
+                    return None
+                total = _total_size(response)
+                body = b""
+                # Range를 무시하고 전체를 보내는 서버도 있으므로 max_bytes에서 끊음
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) >= self.max_bytes:
+                        break
+                self.bytes_read += len(body)
+                body = body[:self.max_bytes]
+                truncated = len(body) < total if total is not None else len(body) >= self.max_bytes
+                return body, truncated
+        except Exception:
+            return None
+
+    def close(self):
+        for task in list(self._background):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "hash_mode": self.hash_mode,
+            "hashed": self.hashed,
+            "hash_skipped": self.skipped,
+            "partial_hashes": self.partial,
+            "bytes_read": self.bytes_read,
+            "background": len(self._background),
+            "budget_timeouts": self.timeouts,
+            "duplicates": dict(self.duplicates),
+            "cache": self._hashes.stats(),
+        }
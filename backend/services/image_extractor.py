@@ -0,0 +1,124 @@
+import os
+from urllib.parse import urljoin, urlsplit
+import lxml.html
+from services.http_pool import HttpPool
+from utils.cache import build_cache, data_path
+from utils.metrics import IMAGE_EXTRACTIONS, span
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
+MAX_HTML_BYTES = 2 * 1024 * 1024
+
+
+class ImageExtractor:
+    """
+    단계형(tiered) 이미지 추출기입니다.
+    1. 공유 HTTP 풀로 HTML을 한 번 받아 lxml로 og:image / twitter:image / <img> 태그를 파싱합니다.
+    2. 정적 파싱 결과가 min_candidates개 미만일 때만 브라우저 렌더링(render)으로 넘어갑니다.
+    도메인별로 JS 렌더링이 필요했는지 기억해두고, 필요한 사이트는 바로 브라우저로 보냅니다.
+    """
+
+    def __init__(self, http_pool: HttpPool, render, min_candidates: int = None):
+        self.http_pool = http_pool
+        self.render = render  # async (url) -> list
+        self.min_candidates = min_candidates or int(os.getenv("STATIC_EXTRACT_MIN_CANDIDATES", "2"))
+        self._domains = build_cache(
+            "RENDER_MEMORY", max_entries=5000, default_ttl=7 * 86400,
+            table="domain_render", default_db=data_path("cache.db")
+        )
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def _needs_js(self, domain: str) -> bool:
+        record = self._domains.get(domain)
+        return bool(record) and record.get("js", 0) > record.get("static", 0)
+
+    def _remember(self, domain: str, needed_js: bool):
+        record = self._domains.get(domain) or {"static": 0, "js": 0}
+        record["js" if needed_js else "static"] += 1
+        self._domains.set(domain, record)
+
+    async def extract(self, url: str, meta: list = None) -> list:
+        """
+        이미지 URL 목록을 반환합니다.
+        meta 리스트가 주어지면 정적 파싱에서 찾은 og:image / twitter:image URL을 여기에 담습니다.
+        """
+        if url.lower().endswith('.pdf') or '/download/' in url.lower():
+            return []
+
+        domain = self._domain(url)
+        if self._needs_js(domain):
+            IMAGE_EXTRACTIONS.inc(tier="browser")
+            return await self.render(url)
+
+        with span("static_extract", url=url):
+            html = await self._fetch_html(url)
+            static_images = self._parse_html(html, url, meta) if html else []
+
+        if len(static_images) >= self.min_candidates:
+            IMAGE_EXTRACTIONS.inc(tier="static")
+            self._remember(domain, needed_js=False)
+            return static_images
+
+        # 정적 HTML에서 후보가 부족하면 브라우저로 렌더링
+        IMAGE_EXTRACTIONS.inc(tier="browser")
+        rendered = await self.render(url)
+        self._remember(domain, needed_js=len(rendered) > len(static_images))
+        return list(dict.fromkeys(static_images + rendered))
+
+    async def _fetch_html(self, url: str) -> str:
+        try:
+            async with self.http_pool.stream('GET', url) as response:
+                if response.status_code != 200:
+                    return ""
+                content_type = response.headers.get('Content-Type', '')
+                if content_type and 'html' not in content_type:
+                    return ""
+                body = b""
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) >= MAX_HTML_BYTES:
+                        break
+                return body.decode(response.encoding or 'utf-8', errors='replace')
+        except Exception as e:
+            print(f"Static HTML fetch error for {url}: {e}")
+            return ""
+
+    @staticmethod
+    def _parse_html(html: str, base_url: str, meta: list = None) -> list:
+        """메타 태그와 img 태그에서 이미지 URL을 추출합니다. (메타 이미지가 먼저 옴)"""
+        try:
+            doc = lxml.html.fromstring(html)
+        except Exception:
+            return []
+
+        candidates = []
+        for xpath in (
+            '//meta[@property="og:image" or @property="og:image:url" or @property="og:image:secure_url"]/@content',
+            '//meta[@name="twitter:image" or @property="twitter:image" or @name="twitter:image:src"]/@content',
+        ):
+            candidates.extend(doc.xpath(xpath))
+        meta_count = len(candidates)
+
+        for img in doc.iter('img'):
+            src = img.get('src') or img.get('data-src') or img.get('data-original')
+            if not src and img.get('srcset'):
+                src = img.get('srcset').split(',')[0].strip().split(' ')[0]
+            if src:
+                candidates.append(src)
+
+        urls = []
+        for i, src in enumerate(candidates):
+            src = (src or '').strip()
+            if not src or src.startswith('data:'):
+                continue
+            absolute = urljoin(base_url, src)
+            if absolute.startswith('http') and any(ext in absolute.lower() for ext in IMAGE_EXTENSIONS):
+                urls.append(absolute)
+                if meta is not None and i < meta_count:
+                    meta.append(absolute)
+        return list(dict.fromkeys(urls))
+
+    def stats(self) -> dict:
+        return {"domains": self._domains.stats()}
@@ -0,0 +1,280 @@
+import os
+import math
+import time
+import struct
+import asyncio
+from services.http_pool import HttpPool
+from services.crawl_scheduler import HostThrottled, THROTTLE_STATUSES
+from services.url_validator import IMAGE_BLACKLIST
+from utils.cache import build_cache
+from utils.single_flight import SingleFlight
+from utils.url_utils import normalize_url
+from utils.metrics import URL_PROBES, URL_PROBE_DURATION, IMAGE_PROBE_BYTES
+
+# JPEG SOF(Start Of Frame) 마커 - 이 세그먼트에 높이/너비가 들어 있음 (C4/C8/CC는 SOF가 아님)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# 길이 필드가 없는 독립 마커 (RST0-7, SOI, EOI, TEM)
+JPEG_STANDALONE_MARKERS = set(range(0xD0, 0xDA)) | {0x01}
+# 뉴스레터 카드에 잘 맞는 가로세로 비율 (약 16:10)
+PREFERRED_ASPECT = 1.6
+# 면적 점수가 최대가 되는 크기
+FULL_SCORE_PIXELS = 1200 * 675
+
+
+def image_format(data: bytes):
+    """파일 시그니처로 이미지 형식을 판별합니다. 알 수 없으면 None."""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith(b"\xff\xd8"):
+        return "jpeg"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def sniff_dimensions(data: bytes):
+    """
+    이미지 앞부분 바이트만으로 (형식, 너비, 높이)를 읽습니다. (디코딩 없이 헤더만 파싱)
+    형식을 모르거나 아직 크기 정보까지 받지 못했으면 None을 반환합니다.
+    """
+    fmt = image_format(data)
+    try:
+        if fmt == "png":
+            if len(data) >= 24 and data[12:16] == b"IHDR":
+                width, height = struct.unpack(">II", data[16:24])
+                return fmt, width, height
+        elif fmt == "gif":
+            if len(data) >= 10:
+                width, height = struct.unpack("<HH", data[6:10])
+                return fmt, width, height
+        elif fmt == "webp":
+            return _webp_dimensions(data)
+        elif fmt == "jpeg":
+            return _jpeg_dimensions(data)
+    except struct.error:
+        pass
+    return None
+
+
+def _webp_dimensions(data: bytes):
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        # 손실 압축: 프레임 태그(3) + 시작 코드(3) 뒤에 14비트 너비/높이
+        width, height = struct.unpack("<HH", data[26:30])
+        return "webp", width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25:
+        # 무손실: 시그니처(0x2f) 뒤 14비트씩 (너비-1), (높이-1)
+        bits = int.from_bytes(data[21:25], "little")
+        return "webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        # 확장 형식: 캔버스 크기 24비트씩 (너비-1), (높이-1)
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return "webp", width, height
+    return None
+
+
+def _jpeg_dimensions(data: bytes):
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # 채움 바이트
+            i += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS:
+            i += 2
+            continue
+        length = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if marker in JPEG_SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return "jpeg", width, height
+        if marker == 0xDA:  # 스캔 시작 - 이후는 압축 데이터
+            return None
+        i += 2 + length
+    return None
+
+
+def _total_size(response):
+    """Content-Range(bytes 0-N/TOTAL) 또는 Content-Length에서 전체 파일 크기를 구합니다."""
+    content_range = response.headers.get('Content-Range', '')
+    if '/' in content_range:
+        total = content_range.rsplit('/', 1)[-1].strip()
+        if total.isdigit():
+            return int(total)
+    if response.status_code == 200:
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit():
+            return int(length)
+    return None
+
+
+class ImageRanker:
+    """
+    아티클 이미지 후보를 품질 순으로 골라냅니다.
+    후보마다 Range 요청으로 앞부분 몇 KB만 받아 JPEG/PNG/WebP/GIF 헤더에서 너비/높이를 읽고,
+    크기, 가로세로 비율, og:image 여부로 점수를 매겨 상위 이미지를 반환합니다.
+    Content-Length를 보내지 않는 추적 픽셀이나 가로로 긴 배너도 실제 크기로 걸러냅니다.
+    프로브 결과는 정규화 URL 기준으로 캐시하며, 동시 프로브 수는 세마포어로 제한합니다.
+    """
+
+    def __init__(self, http_pool: HttpPool, probe_bytes: int = None, concurrency: int = None):
+        self.http_pool = http_pool
+        self.probe_bytes = probe_bytes or int(os.getenv("IMAGE_PROBE_BYTES", "4096"))
+        # JPEG는 EXIF/ICC 세그먼트 뒤에 크기 정보가 있을 수 있어 필요할 때만 이 크기까지 더 읽음
+        self.max_probe_bytes = int(os.getenv("IMAGE_PROBE_MAX_BYTES", "65536"))
+        self.min_side = int(os.getenv("IMAGE_MIN_SIDE", "150"))
+        self.max_aspect = float(os.getenv("IMAGE_MAX_ASPECT", "3.0"))
+        self.negative_ttl = float(os.getenv("IMAGE_PROBE_NEGATIVE_TTL", "1800"))
+        self._semaphore = asyncio.Semaphore(concurrency or int(os.getenv("IMAGE_RANK_CONCURRENCY", "16")))
+        self._cache = build_cache("IMAGE_PROBE_CACHE", max_entries=20000, default_ttl=86400, table="image_probe")
+        self._flight = SingleFlight()
+        self.probes = 0
+        self.bytes_read = 0
+        self.rejected = 0
+
+    # --- 공개 API ---
+
+    async def select(self, candidates: list, meta: list = None, limit: int = 3) -> list:
+        """후보를 동시에 프로브하고 점수가 높은 순으로 최대 limit개를 반환합니다."""
+        candidates = [c for c in candidates if c and c.startswith('http')]
+        if not candidates:
+            return []
+        probes = await asyncio.gather(*(self.probe(c) for c in candidates))
+        return self._best(candidates, probes, meta, limit)
+
+    def cached_select(self, candidates: list, meta: list = None, limit: int = 3) -> list:
+        """네트워크 요청 없이 이미 프로브한 후보만으로 고릅니다. (중단된 수집의 부분 결과 회수용)"""
+        candidates = [c for c in candidates if c and c.startswith('http')]
+        probes = [self._cache.get(normalize_url(c)) for c in candidates]
+        return self._best(candidates, probes, meta, limit)
+
+    def cached_probe(self, url: str):
+        """네트워크 요청 없이 캐시된 프로브 결과를 반환합니다. 없으면 None."""
+        return self._cache.get(normalize_url(url))
+
+    async def probe(self, url: str) -> dict:
+        """이미지 헤더를 읽어 {valid, status, format, width, height, size}를 반환합니다. (블랙리스트는 요청 없이 거절)"""
+        if any(kw in url.lower() for kw in IMAGE_BLACKLIST):
+            return {"valid": False, "status": None, "format": None, "width": None, "height": None, "size": None}
+        key = normalize_url(url)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        return await self._flight.do(key, lambda: self._probe_and_store(key, url))
+
+    def score(self, probe: dict, is_meta: bool = False):
+        """0 이상의 점수를 반환합니다. 쓸 수 없는 이미지면 None."""
+        if not probe or not probe.get("valid"):
+            return None
+        width, height, size = probe.get("width"), probe.get("height"), probe.get("size")
+        if width and height:
+            ratio = width / height
+            if min(width, height) < self.min_side or not (1 / self.max_aspect <= ratio <= self.max_aspect):
+                return None
+            area = min(1.0, width * height / FULL_SCORE_PIXELS)
+            aspect = 1.0 - min(1.0, abs(math.log(ratio / PREFERRED_ASPECT)) / math.log(self.max_aspect * PREFERRED_ASPECT))
+        else:
+            # SVG/AVIF 등 크기를 읽지 못한 형식 - 파일 크기로만 판단하고 낮은 점수
+            if size is not None and size < 5000:
+                return None
+            area = 0.3 if size is None else min(0.5, size / 200000)
+            aspect = 0.5
+        return 0.6 * area + 0.4 * aspect + (0.5 if is_meta else 0.0)
+
+    def stats(self) -> dict:
+        return {
+            "probes": self.probes,
+            "bytes_read": self.bytes_read,
+            "rejected": self.rejected,
+            "coalesced": self._flight.coalesced,
+            "cache": self._cache.stats(),
+        }
+
+    # --- 내부 구현 ---
+
+    def _best(self, candidates: list, probes: list, meta: list, limit: int) -> list:
+        meta_keys = {normalize_url(m) for m in meta or []}
+        scored = []
+        for order, (url, probe) in enumerate(zip(candidates, probes)):
+            score = self.score(probe, normalize_url(url) in meta_keys)
+            if score is None:
+                self.rejected += probe is not None
+                continue
+            scored.append((-score, order, url))
+        scored.sort()
+        return [url for _, _, url in scored[:limit]]
+
+    async def _probe_and_store(self, key: str, url: str) -> dict:
+        async with self._semaphore:
+            self.probes += 1
+            started = time.perf_counter()
+            result = await self._fetch_header(url)
+            URL_PROBE_DURATION.observe(time.perf_counter() - started, kind="image_range")
+            URL_PROBES.inc(kind="image_range", result="valid" if result["valid"] else "invalid")
+        # 속도 제한으로 확인하지 못한 이미지는 캐시하지 않고 다음 요청에서 다시 확인
+        if not result.pop("throttled", False) and result["status"] not in THROTTLE_STATUSES:
+            self._cache.set(key, result, ttl=None if result["valid"] else self.negative_ttl)
+        return result
+
+    async def _fetch_header(self, url: str) -> dict:
+        result = {"valid": False, "status": None, "format": None, "width": None, "height": None, "size": None}
+        try:
+            data, content_type = await self._read_range(url, 0, self.probe_bytes, result)
+            if data is None:
+                return result
+            size = result["size"]
+            # 크기 정보가 첫 조각 뒤에 있는 JPEG만 구간을 두 배씩 늘려 이어서 읽음
+            # (서버가 Range를 무시했으면 이미 충분히 받았으므로 멈춤)
+            window = len(data)
+            while (image_format(data) == "jpeg" and sniff_dimensions(data) is None
+                   and len(data) == window and window < self.max_probe_bytes and (size is None or size > window)):
+                step = min(window, self.max_probe_bytes - window)
+                more, _ = await self._read_range(url, window, step, result, prefix=data)
+                if not more:
+                    break
+                data += more
+                window += step
+        except HostThrottled:
+            result["throttled"] = True
+            return result
+        except Exception:
+            return result
+
+        sniffed = sniff_dimensions(data)
+        if sniffed:
+            result["format"], result["width"], result["height"] = sniffed
+        # 헤더로 형식을 알아냈거나 서버가 이미지라고 밝힌 경우만 유효 (HTML 오류 페이지 등 제외)
+        result["valid"] = bool(data) and (sniffed is not None or image_format(data) is not None or content_type.startswith('image/'))
+        return result
+
+    async def _read_range(self, url: str, start: int, length: int, result: dict, prefix: bytes = b""):
+        """
+        start부터 최대 length바이트를 받아 (데이터, Content-Type)을 반환합니다. 실패 응답이면 (None, '').
+        prefix(앞서 받은 바이트)와 합쳐 크기를 읽을 수 있게 되면 바로 멈춥니다.
+        """
+        headers = {'Range': f'bytes={start}-{start + length - 1}'}
+        async with self.http_pool.stream('GET', url, headers=headers) as response:
+            result["status"] = response.status_code
+            if response.status_code not in (200, 206) or (start and response.status_code != 206):
+                return None, ''
+            content_type = response.headers.get('Content-Type', '').lower()
+            if result["size"] is None:
+                result["size"] = _total_size(response)
+            data = b""
+            # Range를 무시하고 전체를 보내는 서버도 있으므로 length에서 끊고 연결을 닫음
+            async for chunk in response.aiter_bytes():
+                data += chunk
+                if start == 0 and len(data) >= 12 and image_format(data) is None:
+                    break
+                if len(data) >= length or sniff_dimensions(prefix + data):
+                    break
+            data = data[:length]
+            self.bytes_read += len(data)
+            IMAGE_PROBE_BYTES.inc(len(data))
+            return data, content_type
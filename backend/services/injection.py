@@ -0,0 +1,204 @@
+import heapq
+from utils.url_utils import normalize_url
+
+# 블록 타입별로 링크/이미지를 주입할 위치
+# link: content의 링크 필드, image: content의 이미지 필드, items: 링크를 가진 하위 항목 리스트
+BLOCK_SCHEMA = {
+    "main_story": {"link": True, "image": True},
+    "tool_spotlight": {"link": True},
+    "image": {"image": True},
+    "short_news": {"items": "news_items"},
+    "quick_hits": {"items": "items"},
+    "header": {},
+    "quick_summary": {},
+    "chapter_header": {},
+    "deep_dive": {},
+    "insight": {},
+    "text": {},
+}
+LINK_FIELDS = ("link", "url")
+PLACEHOLDER_HOSTS = ("example.com",)
+
+
+class InjectionEngine:
+    """
+    AI가 만든 블록에 실제 수집한 소스의 링크와 이미지를 주입합니다.
+    요청마다 한 번 인덱스(정규화 URL → 소스, 이미지 집합, 사용 횟수 힙, 미사용 이미지 커서)를 만들어
+    블록당 조회를 O(1)로 처리하고, 블록 타입 스키마를 따라 short_news.news_items 같은 하위 항목까지 검사합니다.
+    잘못된 링크에는 아직 쓰지 않은 소스를, 이미지에는 아직 쓰지 않은 이미지를 우선 배정해 반복을 줄입니다.
+    """
+
+    def __init__(self, valid_sources: list, known_urls: list, images: list):
+        self.sources = [s for s in valid_sources if s.get('url')]
+        self._by_url = {normalize_url(s['url']): s for s in self.sources}
+        self._known = {normalize_url(u) for u in known_urls if u} | set(self._by_url)
+        self._images = {normalize_url(img): img for img in images}
+        self._source_uses = {id(s): 0 for s in self.sources}
+        # (사용 횟수, 검색 순위) 최소 힙 - 값이 바뀐 항목은 꺼낼 때 갱신(lazy update)
+        self._source_heap = [(0, rank) for rank in range(len(self.sources))]
+        self._used_images = set()
+        self._image_list = list(self._images.values())
+        self._pool_cursor = 0   # 이 위치 앞의 풀 이미지는 모두 사용됨
+        self._image_cursor = 0  # 풀이 소진된 뒤 순환 배정 위치
+
+    # --- 공개 API ---
+
+    def inject_all(self, blocks: list) -> list:
+        """
+        블록 전체를 한 번에 처리합니다.
+        먼저 모든 블록의 올바른 링크를 훑어 인용된 소스를 '사용됨'으로 표시한 뒤 잘못된 링크를 채우므로,
+        뒤쪽 블록이 인용할 소스를 앞쪽 블록에 중복 배정하지 않습니다.
+        """
+        slots = [self._link_slots(block) for block in blocks]
+        for block_slots in slots:
+            for holder, field in block_slots:
+                source = self._lookup(holder.get(field))
+                if source is not None:
+                    self._source_uses[id(source)] += 1
+        for block, block_slots in zip(blocks, slots):
+            self._inject(block, block_slots, reserved=True)
+        return blocks
+
+    def inject(self, block: dict) -> dict:
+        """(스트리밍용) 블록 하나를 도착 순서대로 처리합니다."""
+        self._inject(block, self._link_slots(block), reserved=False)
+        return block
+
+    def reserve(self, blocks: list):
+        """
+        (단일 블록 재생성용) 이미 확정된 다른 블록들이 인용한 소스와 쓰고 있는 이미지를 '사용됨'으로 표시합니다.
+        블록 내용은 바꾸지 않으며, 이후 inject는 다른 블록과 겹치지 않는 소스/이미지를 우선 배정합니다.
+        """
+        for block in blocks:
+            for holder, field in self._link_slots(block):
+                source = self._lookup(holder.get(field))
+                if source is not None:
+                    self._source_uses[id(source)] += 1
+            content = block.get('content')
+            if isinstance(content, dict) and isinstance(content.get('image_url'), str) and content['image_url']:
+                self._used_images.add(normalize_url(content['image_url']))
+
+    # --- 내부 구현 ---
+
+    def _inject(self, block: dict, slots: list, reserved: bool):
+        content = block.get('content')
+        if not isinstance(content, dict):
+            return
+        try:
+            current_source = None
+            for holder, field in slots:
+                source = self._resolve_link(holder, field, reserved)
+                if holder is content and current_source is None:
+                    current_source = source
+            if self._schema(block).get("image"):
+                self._resolve_image(content, current_source)
+        except Exception as e:
+            print(f"Injection Error at block {block.get('id')}: {e}")
+
+    def _schema(self, block: dict) -> dict:
+        schema = BLOCK_SCHEMA.get(block.get('type'))
+        if schema is not None:
+            return schema
+        # 알 수 없는 타입은 존재하는 필드 기준으로 처리
+        content = block.get('content') or {}
+        return {"link": any(f in content for f in LINK_FIELDS), "image": 'image_url' in content}
+
+    def _link_slots(self, block: dict):
+        """(링크를 가진 dict, 필드 이름) 목록 - 블록 본문과 하위 항목을 모두 포함"""
+        content = block.get('content')
+        if not isinstance(content, dict):
+            return []
+        schema = self._schema(block)
+        slots = []
+        if schema.get("link"):
+            fields = [f for f in LINK_FIELDS if f in content] or ["link"]
+            slots.extend((content, f) for f in fields)
+        items_key = schema.get("items")
+        if items_key and isinstance(content.get(items_key), list):
+            for item in content[items_key]:
+                if isinstance(item, dict):
+                    fields = [f for f in LINK_FIELDS if f in item] or ["link"]
+                    slots.extend((item, f) for f in fields)
+        return slots
+
+    def _is_placeholder(self, link: str) -> bool:
+        for host in PLACEHOLDER_HOSTS:
+            if host in link:
+                return True
+        return False
+
+    def _lookup(self, link):
+        """올바른 링크면 해당 소스(없으면 None)를, 잘못된 링크면 None을 반환"""
+        if not link or not isinstance(link, str) or self._is_placeholder(link):
+            return None
+        return self._by_url.get(normalize_url(link))
+
+    def _resolve_link(self, holder: dict, field: str, reserved: bool):
+        link = holder.get(field)
+        key = normalize_url(link) if isinstance(link, str) and link else None
+        valid = key is not None and not self._is_placeholder(link) and (not self._known or key in self._known)
+        if valid:
+            source = self._by_url.get(key)
+            if source is not None and not reserved:
+                self._source_uses[id(source)] += 1
+            return source
+        source = self._next_source()
+        if source is not None:
+            holder[field] = source['url']
+        return source
+
+    def _next_source(self):
+        """가장 적게 쓰인 소스 (같으면 검색 순위가 높은 소스)"""
+        if not self.sources:
+            return None
+        while True:
+            uses, rank = heapq.heappop(self._source_heap)
+            source = self.sources[rank]
+            actual = self._source_uses[id(source)]
+            if actual == uses:
+                break
+            # 다른 블록이 직접 인용해 사용 횟수가 늘어난 소스 - 갱신해서 다시 넣음
+            heapq.heappush(self._source_heap, (actual, rank))
+        self._source_uses[id(source)] += 1
+        heapq.heappush(self._source_heap, (uses + 1, rank))
+        return source
+
+    def _resolve_image(self, content: dict, source):
+        # 1. 소스에 직접 매핑된 이미지 중 아직 쓰지 않은 것
+        if source and source.get('associated_images'):
+            image = self._take_image(source['associated_images']) or source['associated_images'][0]
+            content['image_url'] = image
+            return
+        # 2. AI가 고른 이미지가 수집한 이미지 풀에 있고 아직 쓰이지 않았으면 유지
+        current = content.get('image_url')
+        if current and (not self._images or normalize_url(current) in self._images):
+            key = normalize_url(current)
+            if key not in self._used_images:
+                self._used_images.add(key)
+                return
+        # 3. 미사용 이미지 풀에서 배정 (모두 썼으면 순환)
+        if self._image_list:
+            content['image_url'] = self._take_from_pool() or self._cycle_image()
+
+    def _take_image(self, candidates: list):
+        for image in candidates:
+            key = normalize_url(image)
+            if key not in self._used_images:
+                self._used_images.add(key)
+                return image
+        return None
+
+    def _take_from_pool(self):
+        while self._pool_cursor < len(self._image_list):
+            image = self._image_list[self._pool_cursor]
+            self._pool_cursor += 1
+            key = normalize_url(image)
+            if key not in self._used_images:
+                self._used_images.add(key)
+                return image
+        return None
+
+    def _cycle_image(self):
+        image = self._image_list[self._image_cursor % len(self._image_list)]
+        self._image_cursor += 1
+        return image
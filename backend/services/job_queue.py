@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+import traceback
+from utils.cache import data_path
+from utils.metrics import trace_id_var, log_event
+
+# 작업 상태
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobStore:
+    """
+    생성 작업을 저장하는 SQLite 저장소입니다. 서버가 재시작되어도 작업 상태와 결과가 유지됩니다.
+    동기 sqlite3 호출이므로 비동기 코드에서는 asyncio.to_thread로 호출합니다.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("JOB_STORE_DB", data_path("jobs.db"))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+            "result TEXT, error TEXT, stages TEXT NOT NULL DEFAULT '{}', "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        # attempts 컬럼이 없던 기존 DB 마이그레이션
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "attempts" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        self._conn.commit()
+
+    def create(self, payload: dict) -> dict:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+        return self.get(job_id)
+
+    def update(self, job_id: str, **fields):
+        for key in ("payload", "result", "stages"):
+            if key in fields and fields[key] is not None:
+                fields[key] = json.dumps(fields[key], ensure_ascii=False)
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def pending_ids(self) -> list:
+        """재시작 시 다시 실행해야 하는(대기/실행 중이던) 작업 ID 목록"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [r["id"] for r in rows]
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        job = dict(row)
+        for key in ("payload", "result", "stages"):
+            if job.get(key):
+                job[key] = json.loads(job[key])
+        return job
+
+
+class JobQueue:
+    """
+    뉴스레터 생성 작업 큐입니다.
+    submit()은 즉시 작업 ID를 돌려주고, 워커 풀이 최대 concurrency개의 작업을 동시에 실행합니다.
+    runner는 (payload, on_stage) -> result 형태의 코루틴 함수이며 단계별 소요 시간을 on_stage로 보고합니다.
+    """
+
+    def __init__(self, runner, store: JobStore = None, concurrency: int = None, max_attempts: int = None):
+        self.runner = runner
+        self.store = store or JobStore()
+        self.concurrency = concurrency or int(os.getenv("JOB_CONCURRENCY", "2"))
+        # 프로세스가 죽어 중단된 작업을 다시 실행하는 최대 횟수 (작업 자체가 워커를 죽이면 무한히 재시도하지 않도록)
+        self.max_attempts = max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self._queue = asyncio.Queue()
+        self._workers = []
+
+    async def start(self):
+        if self._workers:
+            return
+        # 이전 프로세스에서 끝나지 못한 작업을 다시 큐에 넣음 (시도 횟수 초과 여부는 실행 직전에 확인)
+        for job_id in await asyncio.to_thread(self.store.pending_ids):
+            await asyncio.to_thread(self.store.update, job_id, status=QUEUED)
+            self._queue.put_nowait(job_id)
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, payload: dict) -> dict:
+        job = await asyncio.to_thread(self.store.create, payload)
+        await self._queue.put(job["id"])
+        return job
+
+    def get(self, job_id: str):
+        return self.store.get(job_id)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return
+        # 작업 ID를 추적 ID로 사용하여 로그를 작업 단위로 묶음
+        trace_id_var.set(job_id)
+        attempts = job["attempts"] + 1
+        if attempts > self.max_attempts:
+            error = f"작업이 {job['attempts']}번 실행 중 중단되어 더 이상 재시도하지 않습니다."
+            await asyncio.to_thread(self.store.update, job_id, status=FAILED, error=error, finished_at=time.time())
+            log_event("job_finished", job_id=job_id, status=FAILED, error=error)
+            return
+        stages = {}
+        lock = asyncio.Lock()
+        writes = set()
+
+        async def write(**fields):
+            # 단계 기록과 상태 변경이 요청된 순서대로 저장되도록 작업별 잠금으로 직렬화
+            async with lock:
+                await asyncio.to_thread(self.store.update, job_id, **fields)
+
+        def on_stage(name: str, seconds: float):
+            stages[name] = round(seconds, 3)
+            task = asyncio.ensure_future(write(stages=dict(stages)))
+            writes.add(task)
+            task.add_done_callback(writes.discard)
+
+        # 실행 전에 시도 횟수를 올려 두므로, 프로세스가 죽으면 다음 시작 때 이 시도가 반영됨
+        await write(status=RUNNING, attempts=attempts, started_at=time.time(), stages=stages)
+        log_event("job_started", job_id=job_id, attempts=attempts)
+        try:
+            result = await self.runner(job["payload"], on_stage)
+            await asyncio.gather(*writes)
+            await write(status=SUCCEEDED, result=result, finished_at=time.time())
+            log_event("job_finished", job_id=job_id, status=SUCCEEDED, stages=stages)
+        except asyncio.CancelledError:
+            # 서버 종료로 중단된 작업은 재시작 시 다시 실행됨 (정상 종료는 시도 횟수에 넣지 않으며, 종료 중이므로 바로 저장)
+            self.store.update(job_id, status=QUEUED, attempts=job["attempts"])
+            raise
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            traceback.print_exc()
+            await asyncio.gather(*writes)
+            await write(status=FAILED, error=str(e), finished_at=time.time())
+            log_event("job_finished", job_id=job_id, status=FAILED, error=str(e))
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queued": self._queue.qsize(),
+            "workers": len(self._workers),
+        }
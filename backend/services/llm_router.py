@@ -0,0 +1,220 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from utils.metrics import LLM_ROUTER_EVENTS
+
+# 재시도할 만한 일시적 오류 (HTTP 상태 코드 / 예외 이름)
+TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = ("Timeout", "Connection", "RateLimit", "ServiceUnavailable", "InternalServer", "ServerError")
+
+
+def is_transient(error: Exception) -> bool:
+    """OpenAI/Gemini SDK 예외에서 상태 코드나 예외 이름으로 일시적 오류인지 판단합니다."""
+    if isinstance(error, asyncio.TimeoutError):
+        # 전체 타임아웃까지 기다린 호출은 재시도하지 않고 다른 프로바이더로 넘김
+        return False
+    for attr in ("status_code", "code", "status"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status in TRANSIENT_STATUS
+    name = type(error).__name__
+    return isinstance(error, ConnectionError) or any(part in name for part in TRANSIENT_ERRORS)
+
+
+class LatencyTracker:
+    """프로바이더별 최근 응답 시간 창(window)으로 백분위수를 계산합니다."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float):
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 threshold회에 이르면 cooldown 동안 호출을 막고(open),
+    이후 한 번의 시험 호출(half-open)이 성공하면 다시 닫습니다(closed).
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def release(self):
+        """결과 없이 끝난 시험 호출(취소 등)의 슬롯을 반납합니다."""
+        self._trial = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> bool:
+        """실패를 기록하고, 이번 실패로 회로가 열렸으면 True를 반환합니다."""
+        self.failures += 1
+        self._trial = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+
+class LLMRouter:
+    """
+    여러 LLM 프로바이더를 하나의 호출로 묶는 라우터입니다.
+    - 프로바이더별 지연 시간을 기록하고 회로 차단기로 장애 프로바이더를 잠시 제외합니다.
+    - 1순위 프로바이더가 p95 기반 임계 시간 안에 응답하지 않으면 예비 프로바이더를 동시에 호출(hedging)하고
+      먼저 유효한 결과를 돌려준 쪽을 사용합니다.
+    - 일시적 오류는 지수 백오프로 재시도하고, 최종 실패 시 다음 프로바이더로 넘어갑니다(failover).
+    providers는 {이름: async (**kwargs) -> 결과} 형태이며, validate(결과)가 False면 실패로 취급합니다.
+    """
+
+    def __init__(self, providers: dict, validate=None):
+        self.providers = providers
+        self.validate = validate or (lambda result: result is not None)
+        self.hedging = os.getenv("LLM_HEDGING", "1") != "0"
+        self.hedge_default = float(os.getenv("LLM_HEDGE_DELAY", "45"))
+        self.hedge_min = float(os.getenv("LLM_HEDGE_MIN_DELAY", "5"))
+        self.hedge_min_samples = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+        self.retries = int(os.getenv("LLM_RETRIES", "2"))
+        self.backoff = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+        threshold = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+        cooldown = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+        self.latency = {name: LatencyTracker() for name in providers}
+        self.breakers = {name: CircuitBreaker(threshold, cooldown) for name in providers}
+
+    def order(self, primary: str) -> list:
+        """1순위 프로바이더부터 호출 가능한(회로가 닫힌) 프로바이더 순서를 반환합니다."""
+        names = [primary] + [n for n in self.providers if n != primary]
+        available = [n for n in names if n in self.providers and self.breakers[n].state != "open"]
+        # 모두 차단되어 있으면 1순위로라도 시도
+        return available or [primary]
+
+    def hedge_delay(self, provider: str) -> float:
+        tracker = self.latency[provider]
+        if tracker.count() < self.hedge_min_samples:
+            return self.hedge_default
+        return max(self.hedge_min, tracker.percentile(95))
+
+    async def generate(self, primary: str, **kwargs):
+        """
+        라우팅 규칙에 따라 호출하고 첫 번째 유효한 결과를 반환합니다.
+        반환값: (결과, 응답한 프로바이더 이름). 모든 프로바이더가 실패하면 마지막 예외를 다시 던집니다.
+        """
+        candidates = self.order(primary)
+        pending = {}
+        last_error = None
+
+        def launch(name):
+            pending[asyncio.ensure_future(self._attempt(name, **kwargs))] = name
+
+        launch(candidates.pop(0))
+        try:
+            while pending:
+                timeout = None
+                if self.hedging and candidates and len(pending) == 1:
+                    timeout = self.hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # 1순위가 임계 시간 안에 응답하지 않음 → 예비 프로바이더 동시 호출
+                    backup = candidates.pop(0)
+                    LLM_ROUTER_EVENTS.inc(provider=backup, event="hedge")
+                    print(f"LLM hedge: starting {backup} after {timeout:.1f}s")
+                    launch(backup)
+                    continue
+
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        last_error = e
+                        if not pending and candidates:
+                            # 실패 후 남은 호출이 없으면 다음 프로바이더로 넘어감
+                            LLM_ROUTER_EVENTS.inc(provider=candidates[0], event="failover")
+                            print(f"LLM failover: {name} failed ({e}), trying {candidates[0]}")
+                            launch(candidates.pop(0))
+                        continue
+                    if name != primary:
+                        LLM_ROUTER_EVENTS.inc(provider=name, event="backup_won")
+                    return result, name
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, name: str, **kwargs):
+        """한 프로바이더에 대해 일시적 오류를 백오프로 재시도하며 호출합니다."""
+        breaker = self.breakers[name]
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                raise RuntimeError(f"{name} circuit is open")
+            started = time.perf_counter()
+            try:
+                result = await self.providers[name](**kwargs)
+                if not self.validate(result):
+                    raise ValueError(f"{name} returned an invalid response")
+            except asyncio.CancelledError:
+                # hedging에서 진 쪽이 취소된 경우 - 회로 차단기를 열지 않되 시험 호출 슬롯은 반납
+                # (느린 호출을 표본에서 빼면 p95가 낮게 잡히므로 취소 시점까지의 시간을 기록)
+                self.latency[name].observe(time.perf_counter() - started)
+                breaker.release()
+                raise
+            except Exception as e:
+                if breaker.record_failure():
+                    LLM_ROUTER_EVENTS.inc(provider=name, event="breaker_open")
+                if attempt >= self.retries or not is_transient(e):
+                    raise
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                LLM_ROUTER_EVENTS.inc(provider=name, event="retry")
+                print(f"LLM retry: {name} attempt {attempt + 1} failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            self.latency[name].observe(time.perf_counter() - started)
+            breaker.record_success()
+            return result
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "state": self.breakers[name].state,
+                "failures": self.breakers[name].failures,
+                "samples": self.latency[name].count(),
+                "p95_s": round(self.latency[name].percentile(95) or 0, 3),
+                "hedge_delay_s": round(self.hedge_delay(name), 3),
+            }
+            for name in self.providers
+        }
@@ -0,0 +1,353 @@
+import time
+import asyncio
+import traceback
+from utils.json_parser import IncrementalBlockParser
+from utils.metrics import span
+from services.injection import InjectionEngine
+from services.drafts_store import DraftNotFound
+from services.run_store import RunNotFound
+from services.prompt_templates import BLOCK_TYPES
+
+
+class NewsletterPipeline:
+    """
+    검색/스크래핑 → AI 생성 → 링크/이미지 주입으로 이어지는 뉴스레터 생성 파이프라인입니다.
+    일반 응답(run)과 스트리밍 응답(stream)이 같은 단계 함수를 공유합니다.
+    drafts(DraftStore)가 주어지면 save_draft 요청의 결과를 초안으로 저장하고,
+    runs(RunStore)가 주어지면 실행마다 소스/정제 문맥을 보관해 블록 하나만 다시 생성(regenerate_block)할 수 있게 합니다.
+    """
+
+    def __init__(self, crawler, ai_gen, drafts=None, runs=None):
+        self.crawler = crawler
+        self.ai_gen = ai_gen
+        self.drafts = drafts
+        self.runs = runs
+
+    async def collect_sources(self, request) -> dict:
+        """주제로 아티클을 검색/수집하고 최종 유효성 검사를 거친 소스 묶음을 반환합니다."""
+        # 1. 원본 주제로 검색 (확장 검색어는 expand_queries일 때만, 아래에서 크롤러에 넘김)
+        queries = [request.topic]
+
+        # 크롤링 시간 예산 (요청 단위) - 초과 시 끝난 아티클만 사용
+        budget = getattr(request, 'crawl_budget_s', None)
+        deadline = time.monotonic() + budget if budget else None
+
+        # parallel 모드: 검색 결과가 나오는 즉시 문맥 정제를 시작해 이미지 수집과 겹쳐 실행
+        refinement = None
+
+        def start_refinement(results: list):
+            nonlocal refinement
+            if refinement is None:
+                articles = [{'title': r.get('title'), 'url': r.get('url'), 'content': r.get('content')} for r in results]
+                refinement = self.ai_gen.start_refinement(request.topic, "", request.model_type, articles, "parallel")
+
+        on_search = start_refinement if getattr(request, 'context_mode', 'full') == "parallel" else None
+
+        # (선택) 검색어 확장 - 원래 주제 검색과 동시에 진행하고, 결과는 크롤러에서 URL 기준으로 합침
+        expansion = None
+        if getattr(request, 'expand_queries', False):
+            expansion = asyncio.ensure_future(self.ai_gen.query_expander.expand(request.topic))
+
+        # 2. Search & Scrape (Parallel Optimization)
+        # 사용자가 요청한 개수(max_results)를 적용하여 병렬 처리
+        search_tasks = [
+            self.crawler.search_and_extract_async(q, max_results=request.max_results, deadline=deadline,
+                                                  on_search=on_search, extra_queries=expansion)
+            for q in queries
+        ]
+        search_results = await asyncio.gather(*search_tasks)
+
+        all_articles = []
+        all_images = []
+        truncated = []
+        failed = []
+        combined_context = ""
+
+        for res in search_results:
+            all_articles.extend(res.get('articles', []))
+            all_images.extend(res.get('images', []))
+            truncated.extend(res.get('truncated', []))
+            failed.extend(res.get('failed', []))
+            combined_context += f"{res.get('context', '')}\n\n"
+
+        # 검색 결과 간 중복 이미지 제거 (URL 렌디션 + 크기 + 지각 해시, 해시는 캐시되어 재계산하지 않음)
+        budget = None if deadline is None else max(0.0, deadline - time.monotonic())
+        article_images = {img for a in all_articles for img in a.get('associated_images', [])}
+        unique_images = await self.crawler.image_dedup.dedupe(all_articles, budget=budget)
+        # 아티클에 연결되지 않은 검색 이미지는 그대로 뒤에 둠
+        unique_images += [img for img in dict.fromkeys(all_images) if img not in article_images]
+
+        # Filter out broken sources (one last safety check) - 한 번의 비동기 배치로 검사
+        valid_sources = await self._filter_live_sources(all_articles, deadline)
+
+        valid_urls = [s.get('url') for s in all_articles if s.get('url')]
+        return {
+            "articles": all_articles,
+            "valid_sources": valid_sources,
+            "valid_urls": valid_urls,
+            "images": unique_images,
+            "context": combined_context,
+            "truncated_sources": truncated,
+            "failed_sources": failed,
+            "refinement": refinement,
+            # 요청 단위 링크/이미지 주입 인덱스
+            "injector": InjectionEngine(valid_sources, valid_urls, unique_images),
+        }
+
+    async def _filter_live_sources(self, articles: list, deadline: float = None) -> list:
+        """소스 URL을 한 번에 검사합니다. 예산이 남지 않았으면 검사를 생략하고 그대로 사용합니다."""
+        urls = [s.get('url') for s in articles]
+        try:
+            if deadline is None:
+                live_urls = set(await self.crawler._filter_valid_urls(urls))
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return articles
+                live_urls = set(await asyncio.wait_for(self.crawler._filter_valid_urls(urls), timeout=remaining))
+        except asyncio.TimeoutError:
+            return articles
+        return [s for s in articles if s.get('url') in live_urls]
+
+    def inject_block(self, block: dict, index: int, bundle: dict) -> dict:
+        """블록 ID를 보장하고 유효한 링크/이미지를 주입합니다."""
+        # Ensure ID
+        if not block.get('id'):
+            block['id'] = str(index + 1)
+
+        # Link/URL & Image Validation & Injection (스트리밍: 도착 순서대로 한 블록씩)
+        return bundle["injector"].inject(block)
+
+    def build_response(self, request, data: dict, bundle: dict) -> dict:
+        # 4. Post-processing: Force Valid URLs and IDs (전체 블록을 한 번에 검사/주입)
+        blocks = [b for b in data.get('blocks', []) if isinstance(b, dict)]
+        for i, block in enumerate(blocks):
+            if not block.get('id'):
+                block['id'] = str(i + 1)
+        bundle["injector"].inject_all(blocks)
+
+        return {
+            "title": data.get('title') or f"{request.topic} 뉴스레터",
+            "blocks": blocks,
+            "images": bundle["images"],
+            "sources": bundle["articles"],
+            "truncated_sources": bundle["truncated_sources"],
+            "failed_sources": bundle["failed_sources"]
+        }
+
+    async def run(self, request, on_stage=None) -> dict:
+        """
+        파이프라인 전체를 실행합니다.
+        on_stage(name, seconds)가 주어지면 단계(search/generate/inject)별 소요 시간을 보고합니다.
+        """
+        with span("search", on_stage=on_stage, topic=request.topic):
+            bundle = await self.collect_sources(request)
+
+        # 3. Generate content using AI
+        prepared = {}
+        with span("generate", on_stage=on_stage, model_type=request.model_type):
+            data = await self.ai_gen.generate_newsletter(
+                topic=request.topic,
+                raw_context=bundle["context"],
+                tone=request.tone,
+                model_type=request.model_type,
+                articles=bundle["valid_sources"],
+                context_mode=getattr(request, 'context_mode', 'full'),
+                refinement=bundle["refinement"],
+                prepared=prepared
+            )
+
+        with span("inject", on_stage=on_stage):
+            result = self.build_response(request, data, bundle)
+
+        run_id = await self.save_run(request, bundle, prepared, result["blocks"])
+        if run_id:
+            result["run_id"] = run_id
+        draft_id = await self.save_draft(request, result)
+        if draft_id:
+            result["draft_id"] = draft_id
+        return result
+
+    async def save_run(self, request, bundle: dict, prepared: dict, blocks: list):
+        """블록 재생성에 쓸 실행 정보를 보관하고 run_id를 반환합니다. 실패해도 생성 결과는 그대로 돌려줍니다."""
+        if self.runs is None:
+            return None
+        try:
+            # 소스/블록 전체를 직렬화해 캐시 DB에 쓰므로 이벤트 루프를 막지 않도록 스레드에서 실행
+            return await asyncio.to_thread(self.runs.save, request, bundle, prepared, blocks)
+        except Exception as e:
+            print(f"Failed to save run for '{request.topic}': {e}")
+            return None
+
+    async def save_draft(self, request, result: dict):
+        """요청이 save_draft이면 결과를 초안으로 저장하고 ID를 반환합니다. 저장에 실패해도 생성 결과는 그대로 돌려줍니다."""
+        if self.drafts is None or not getattr(request, 'save_draft', False):
+            return None
+        try:
+            with span("save_draft"):
+                # 초안에서 블록을 재생성할 때 원래 실행의 정제 문맥을 찾을 수 있도록 run_id를 요청과 함께 저장
+                saved_request = dict(request.model_dump(), run_id=result.get("run_id"))
+                # SQLite 쓰기가 이벤트 루프를 막지 않도록 스레드에서 실행
+                draft = await asyncio.to_thread(self.drafts.create, request.topic, result, request=saved_request)
+                return draft["id"]
+        except Exception as e:
+            print(f"Failed to save draft for '{request.topic}': {e}")
+            return None
+
+    async def stream(self, request):
+        """
+        (비동기 제너레이터) 파이프라인 진행 상황과 결과를 이벤트 단위로 내보냅니다.
+        이벤트 순서: progress → sources → block (여러 개) → done
+        오류 발생 시 error 이벤트를 보내고 종료합니다.
+        """
+        try:
+            yield "progress", {"stage": "search", "message": "관련 아티클을 검색하고 이미지를 수집하는 중입니다."}
+            with span("search", topic=request.topic):
+                bundle = await self.collect_sources(request)
+            yield "sources", {
+                "sources": bundle["articles"],
+                "images": bundle["images"],
+                "truncated_sources": bundle["truncated_sources"],
+                "failed_sources": bundle["failed_sources"]
+            }
+
+            yield "progress", {"stage": "generate", "message": "AI가 뉴스레터를 작성하는 중입니다."}
+            parser = IncrementalBlockParser()
+            index = 0
+            blocks = []
+            prepared = {}
+            async for chunk in self.ai_gen.stream_newsletter(
+                topic=request.topic,
+                raw_context=bundle["context"],
+                tone=request.tone,
+                model_type=request.model_type,
+                articles=bundle["valid_sources"],
+                context_mode=getattr(request, 'context_mode', 'full'),
+                refinement=bundle["refinement"],
+                prepared=prepared
+            ):
+                for block in parser.feed(chunk):
+                    blocks.append(self.inject_block(block, index, bundle))
+                    yield "block", {"index": index, "block": blocks[-1]}
+                    index += 1
+
+            # 스트림 중 꺼내지 못한 블록이 있으면 마저 전송
+            data = parser.finish()
+            for block in data.get('blocks', [])[index:]:
+                blocks.append(self.inject_block(block, index, bundle))
+                yield "block", {"index": index, "block": blocks[-1]}
+                index += 1
+
+            title = data.get('title') or f"{request.topic} 뉴스레터"
+            done = {"title": title, "block_count": index}
+            run_id = await self.save_run(request, bundle, prepared, blocks)
+            if run_id:
+                done["run_id"] = run_id
+            draft_id = await self.save_draft(request, {
+                "title": title,
+                "blocks": blocks,
+                "images": bundle["images"],
+                "sources": bundle["articles"],
+                "truncated_sources": bundle["truncated_sources"],
+                "run_id": run_id
+            })
+            if draft_id:
+                done["draft_id"] = draft_id
+            yield "done", done
+        except Exception as e:
+            print(f"Error during streaming newsletter generation: {e}")
+            traceback.print_exc()
+            yield "error", {"detail": str(e)}
+
+    async def regenerate_block(self, request) -> dict:
+        """
+        블록 하나만 다시 생성합니다. (검색/스크래핑/문맥 정제/전체 프롬프트를 다시 실행하지 않음)
+        - run_id: 원래 실행에 보관된 소스와 정제 문맥을 사용
+        - draft_id: 초안의 최신 블록을 기준으로 하고, 초안에 연결된 실행이 없으면 초안의 소스만 사용
+        block_id가 있으면 그 블록을 대체하고(block_type 생략 시 같은 타입), 없으면 block_type의 새 블록을 만듭니다.
+        새 블록에는 다른 블록이 쓰지 않은 링크/이미지를 우선 주입하며, save이면 초안/실행 기록에도 저장합니다.
+        (block_id가 없으면 새 블록을 초안/실행 기록의 끝에 추가)
+        반환값: {"block", "run_id", "draft_id", "saved"} - saved는 실제로 저장한 곳이 있을 때만 True
+        """
+        draft = await asyncio.to_thread(self.drafts.get, request.draft_id) if request.draft_id else None
+        run_id = request.run_id or ((draft.get("request") or {}).get("run_id") if draft else None)
+        run = await asyncio.to_thread(self.runs.get, run_id) if run_id and self.runs is not None else None
+        if run is None:
+            if draft is None:
+                if request.run_id:
+                    raise RunNotFound(request.run_id)
+                raise ValueError("run_id 또는 draft_id가 필요합니다.")
+            # 실행 기록이 만료된 초안: 저장된 소스로만 재생성 (정제 문맥 없음)
+            run_id = None
+            run = self._run_from_draft(draft)
+
+        # 초안이 있으면 에디터에서 고친 최신 블록 기준
+        blocks = draft["blocks"] if draft else run["blocks"]
+        current = None
+        if request.block_id:
+            current = next((b for b in blocks if b.get('id') == request.block_id), None)
+            if current is None:
+                raise DraftNotFound(f"{request.draft_id}/{request.block_id}") if draft else RunNotFound(f"{run_id}/{request.block_id}")
+        block_type = request.block_type or (current or {}).get('type')
+        if not block_type:
+            raise ValueError("block_type 또는 block_id가 필요합니다.")
+        if block_type not in BLOCK_TYPES:
+            raise ValueError(f"재생성할 수 없는 블록 타입입니다: {block_type}")
+        others = [b for b in blocks if b is not current]
+
+        block = await self.ai_gen.generate_block(
+            topic=run["topic"],
+            block_type=block_type,
+            tone=request.tone or run["tone"],
+            model_type=request.model_type or run["model_type"],
+            articles=run["articles"],
+            refined_context=run["refined_context"],
+            others=others,
+            current=current.get('content') if current and current.get('type') == block_type else None,
+            instructions=request.instructions
+        )
+        block["id"] = current["id"] if current else _new_block_id(blocks)
+
+        with span("inject"):
+            injector = InjectionEngine(run["valid_sources"], run["valid_urls"], run["images"])
+            injector.reserve(others)
+            injector.inject(block)
+
+        saved = False
+        if request.save:
+            if run_id:
+                saved = await asyncio.to_thread(self.runs.update_block, run_id, block)
+            if draft is not None:
+                if current is not None:
+                    await asyncio.to_thread(self.drafts.patch_block, request.draft_id, block["id"], block["content"],
+                                            block_type=block_type)
+                else:
+                    await asyncio.to_thread(self.drafts.add_block, request.draft_id, block["id"], block_type,
+                                            block["content"])
+                saved = True
+        return {"block": block, "run_id": run_id, "draft_id": request.draft_id, "saved": saved}
+
+    @staticmethod
+    def _run_from_draft(draft: dict) -> dict:
+        """초안에 저장된 소스/이미지/요청으로 실행 정보를 구성합니다."""
+        saved_request = draft.get("request") or {}
+        sources = draft.get("sources") or []
+        return {
+            "topic": draft["topic"],
+            "tone": saved_request.get("tone", "professional"),
+            "model_type": saved_request.get("model_type", "gemini"),
+            "articles": sources,
+            "refined_context": "",
+            "valid_sources": sources,
+            "valid_urls": [s.get('url') for s in sources if s.get('url')],
+            "images": draft.get("images") or [],
+            "blocks": draft["blocks"],
+        }
+
+
+def _new_block_id(blocks: list) -> str:
+    ids = {b.get('id') for b in blocks}
+    candidate = len(blocks) + 1
+    while str(candidate) in ids:
+        candidate += 1
+    return str(candidate)
@@ -0,0 +1,64 @@
+import os
+import time
+from google.genai import types
+from utils.single_flight import SingleFlight
+
+
+class GeminiPrefixCache:
+    """
+    Gemini 명시적 컨텍스트 캐시(cached content)로 정적 프롬프트 접두부를 등록해 재사용합니다.
+    (모델, 접두부 키)마다 캐시를 한 번 만들고 TTL이 끝나기 전에 새로 만듭니다.
+    생성에 실패하면(최소 토큰 수 미달, 권한 없음 등) 잠시 비활성화하고 호출 측은 system_instruction으로 보냅니다.
+    """
+
+    def __init__(self, client, ttl: int = None, cooldown: float = None):
+        self.client = client
+        self.enabled = os.getenv("GEMINI_PROMPT_CACHE", "1") != "0"
+        self.ttl = ttl or int(os.getenv("GEMINI_PROMPT_CACHE_TTL", "3600"))
+        self.cooldown = cooldown or float(os.getenv("GEMINI_PROMPT_CACHE_COOLDOWN", "600"))
+        self._entries = {}  # (model, key) -> (cache name, 만료 시각)
+        self._flight = SingleFlight()
+        self._disabled_until = 0.0
+        self.created = 0
+        self.failures = 0
+
+    async def get(self, model: str, key: str, system_instruction: str):
+        """캐시 이름을 반환합니다. 사용할 수 없으면 None."""
+        if not self.enabled or not self.client or time.monotonic() < self._disabled_until:
+            return None
+        entry = self._entries.get((model, key))
+        # 만료 직전의 캐시는 요청 도중 사라질 수 있으므로 여유를 두고 갱신
+        if entry and entry[1] - 60 > time.monotonic():
+            return entry[0]
+        try:
+            return await self._flight.do((model, key), lambda: self._create(model, key, system_instruction))
+        except Exception as e:
+            print(f"Gemini prompt cache unavailable ({model}): {e}")
+            self.failures += 1
+            self._disabled_until = time.monotonic() + self.cooldown
+            return None
+
+    async def _create(self, model: str, key: str, system_instruction: str) -> str:
+        cached = await self.client.aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=system_instruction,
+                ttl=f"{self.ttl}s",
+                display_name=key[:128],
+            )
+        )
+        self._entries[(model, key)] = (cached.name, time.monotonic() + self.ttl)
+        self.created += 1
+        return cached.name
+
+    def invalidate(self, model: str, key: str):
+        """서버에서 캐시가 사라진 경우(만료/삭제) 다음 호출에서 새로 만들도록 지웁니다."""
+        self._entries.pop((model, key), None)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled and time.monotonic() >= self._disabled_until,
+            "entries": len(self._entries),
+            "created": self.created,
+            "failures": self.failures,
+        }
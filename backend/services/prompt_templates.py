@@ -0,0 +1,265 @@
+import json
+import hashlib
+from datetime import datetime
+from utils.url_utils import normalize_url
+
+# 정적 프롬프트를 바꾸면 버전을 올려 프로바이더 캐시(cached content / prompt_cache_key)를 새로 만들게 합니다.
+PROMPT_VERSION = "newsletter-v2"
+
+TONE_INSTRUCTIONS = {
+    "professional": "Tone: Professional, authoritative, and concise. Use formal polite Korean (문맥에 따라 하십시오체 또는 정중한 해요체 사용).",
+    "friendly": "Tone: Friendly, approachable, and warm. Use polite informal Korean (친근한 해요체 사용).",
+    "witty": "Tone: Witty, humorous, and energetic. Use engaging and fun Korean (재치있고 활기찬 한국어 사용).",
+}
+
+# 블록 타입별 출력 스키마 (전체 생성 프롬프트의 블록 가이드와 단일 블록 재생성 프롬프트가 함께 사용)
+# (타입, 프롬프트에 표시할 이름, 예시 JSON)
+BLOCK_SCHEMAS = [
+    ("header", "header", """
+{
+    "type": "header",
+    "content": {
+        "title": "메인 타이틀",
+        "intro": "안녕하세요, 오픈해 주셔서 감사합니다. (독자 공감 Hook 포함)"
+    }
+}"""),
+    ("quick_summary", "quick_summary", """
+{
+    "type": "quick_summary",
+    "content": {
+        "items": ["요약문 1", "요약문 2", "요약문 3"]
+    }
+}"""),
+    ("chapter_header", "chapter_header", """
+{
+    "type": "chapter_header",
+    "content": { "title": "챕터 주제" }
+}"""),
+    ("main_story", "main_story", """
+{
+    "type": "main_story",
+    "content": {
+        "title": "헤드라인",
+        "image_url": "URL",
+        "body": "300자 내외 [배경-해결-이득] 구조",
+        "link": "URL",
+        "image_caption": "이미지를 클릭하면 전문으로 연결됩니다"
+    }
+}"""),
+    ("deep_dive", "deep_dive", """
+{
+    "type": "deep_dive",
+    "content": {
+        "title": "분석 제목",
+        "body": "400자 내외 리스트 중심 분석"
+    }
+}"""),
+    ("tool_spotlight", "tool_spotlight", """
+{
+    "type": "tool_spotlight",
+    "content": {
+        "name": "도구명",
+        "description": "기능 및 유용성 설명",
+        "link": "URL"
+    }
+}"""),
+    ("short_news", "short_news", """
+{
+    "type": "short_news",
+    "content": {
+        "title": "News Briefs",
+        "news_items": [
+            { "emoji": "🚀", "text": "제목", "link": "URL" }
+        ]
+    }
+}"""),
+    ("insight", "insight (Closing)", """
+{
+    "type": "insight",
+    "content": {
+        "text": "오늘의 레터 어떠셨나요? (피드백 및 구독 안내 포함)"
+    }
+}"""),
+]
+BLOCK_TYPES = [block_type for block_type, _, _ in BLOCK_SCHEMAS]
+
+# 단일 블록 재생성 시 블록 타입별로 붙이는 작성 가이드 (전체 프롬프트의 [뉴스레터 구성 순서]/[필수 작성 규칙]에서 발췌)
+BLOCK_GUIDES = {
+    "header": "\"안녕하세요, 오픈해 주셔서 감사합니다\"로 시작. 독자의 고민이나 질문(Hook)으로 시작해 주제의 가치를 2~3문장으로 설명하세요.",
+    "quick_summary": "이번 호의 핵심 요약 3문장을 배치하세요.",
+    "chapter_header": "뒤따르는 main_story를 아우르는 명확한 챕터 주제를 한 줄로 쓰세요.",
+    "main_story": "배경 -> 해결 -> 이득 구조로 300자 내외 압축 서술. 이미지 캡션 필드에 \"이미지를 클릭하면 전문으로 연결됩니다\"를 포함하세요.",
+    "deep_dive": "400자 내외로, 리스트 중심의 깊이 있는 분석을 쓰세요.",
+    "tool_spotlight": "[Sources]에 나온 도구/서비스 하나의 기능과 독자에게 주는 유용성을 설명하세요.",
+    "short_news": "관련 뉴스 3~5개를 이모지와 함께 구성하세요. 각 뉴스 제목은 기사 내용을 분석한 날카로운 **한 줄 요약**이어야 합니다.",
+    "insight": "단순히 마무리가 아닌, 전체 뉴스레터 내용을 종합하여 독자가 얻을 수 있는 **전략적 통찰과 핵심 시사점**을 깊이 있게 담으세요.",
+}
+
+# 단일 블록 재생성 프롬프트에 넣을 소스 본문 길이 (소스당 글자 수)
+BLOCK_SOURCE_CHARS = 800
+
+
+def _request_section(topic: str) -> str:
+    """요청마다 바뀌는 [Request] 부분 (날짜는 접두부 캐시를 깨지 않도록 여기에만 넣음)"""
+    today_date = datetime.now().strftime("%Y년 %m월 %d일")
+    return (
+        f"[Request]\n주제: {topic}\n오늘의 날짜: {today_date}\n"
+        f"header 블록의 content에는 \"date\": \"{today_date}\"를 그대로 넣으세요."
+    )
+
+
+def _block_schema_section() -> str:
+    return "\n\n".join(f"{i}. {label}\n{schema.strip()}" for i, (_, label, schema) in enumerate(BLOCK_SCHEMAS, 1))
+
+
+# 요청마다 바뀌지 않는 부분 (스타일 가이드, 구성, 블록 스키마). 주제/날짜/소스는 뒤쪽 요청 프롬프트에 들어갑니다.
+_STATIC_TEMPLATE = """
+당신은 감성적이고 통찰력 있는 뉴스레터 전문 수석 에디터입니다.
+당신의 목표는 [Request]에 주어진 주제에 관해 독자에게 깊은 정보와 울림을 주는 마키나락스형 매거진 스타일의 뉴스레터를 발행하는 것입니다.
+
+{tone_instruction}
+
+[스타일 가이드]
+1. **톤앤매너**: 격식 있는 대화체(~해요, ~입니다). 전문 용어는 반드시 문맥으로 풀어서 설명하세요.
+2. **오프닝 필수 문구**: 상단 인사는 반드시 "안녕하세요, 오픈해 주셔서 감사합니다"로 시작하세요.
+3. **시각적 구조**: 문단 사이 충분한 여백, 핵심 키워드는 `<strong>` 태그로 **굵게** 강조하세요. (마크다운 `**` 금지)
+4. **가독성 규칙**:
+   - 한 문단은 **최대 3줄**을 넘지 않아야 합니다.
+   - 불렛 포인트(•)와 내용에 어울리는 이모지(🚀, 💡, 📊 등)를 적극 활용하세요.
+
+[뉴스레터 구성 순서]
+1. **오프닝 (header)**: "안녕하세요, 오픈해 주셔서 감사합니다"로 시작. 독자의 고민이나 질문(Hook)으로 시작해 주제의 가치를 2~3문장으로 설명하세요.
+2. **오늘의 퀵 서머리 (quick_summary)**: 이번 호의 핵심 요약 3문장을 배치하세요.
+3. **챕터 구성 (chapter_header -> main_story -> deep_dive -> tool_spotlight)**:
+   - 뉴스레터를 **최소 2개에서 최대 4개**의 명확한 챕터로 나누세요.
+   - **중요**: 각 챕터에는 반드시 **딱 1개의 main_story** 블록만 배치해야 합니다.
+   - `main_story`: 배경 -> 해결 -> 이득 구조로 300자 내외 압축 서술.
+4. **단신 리스트 (short_news)**: 관련 뉴스 3~5개를 이모지와 함께 구성하세요. 각 뉴스 제목은 기사 내용을 분석한 날카로운 **한 줄 요약**이어야 합니다.
+5. **클로징 (insight)**: 단순히 마무리가 아닌, 전체 뉴스레터 내용을 종합하여 독자가 얻을 수 있는 **전략적 통찰과 핵심 시사점**을 깊이 있게 담으세요.
+
+[필수 작성 규칙]
+1. **Benefit-Driven**: '그래서 독자에게 무엇이 좋은가?'에 집중하세요.
+2. **이미지 안내**: `main_story`의 이미지 캡션 필드에 "이미지를 클릭하면 전문으로 연결됩니다"를 포함하세요.
+3. **소스 활용**: 링크와 이미지는 [Sources]에 있는 URL과 Associated Images만 사용하세요.
+
+주요 언어: 한국어 (Korean/Hangul).
+
+[Output Format]
+반드시 추가 텍스트 없이 유효한 JSON 객체만 출력하십시오.
+뉴스레터는 '블록(Block)' 단위로 구성됩니다.
+**최소 10개 이상의 블록**을 포함하여 깊이 있는 뉴스레터를 만드십시오.
+
+사용 가능한 블록 타입 및 상세 가이드:
+
+{block_schemas}
+
+전체 JSON 구조:
+{{
+    "title": "뉴스레터 관리용 제목",
+    "blocks": [ ... 위 블록들을 조합하여 구성 (순서 자유롭게) ... ]
+}}
+""".strip()
+
+
+class PromptTemplate:
+    """
+    버전이 붙은 뉴스레터 생성 프롬프트입니다.
+    톤별 정적 접두부(prefix)는 생성 시 한 번만 만들어 두고, 요청마다 바뀌는 날짜/주제/소스만 따로 조립합니다.
+    접두부를 항상 프롬프트 맨 앞에 같은 순서로 두어 프로바이더의 접두부 캐시가 적중하도록 합니다.
+    """
+
+    def __init__(self, version: str = PROMPT_VERSION):
+        self.version = version
+        self._prefixes = {
+            tone: _STATIC_TEMPLATE.format(tone_instruction=instruction, block_schemas=_block_schema_section())
+            for tone, instruction in TONE_INSTRUCTIONS.items()
+        }
+        self._keys = {
+            tone: f"{version}-{tone}-{hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:12]}"
+            for tone, prefix in self._prefixes.items()
+        }
+
+    @staticmethod
+    def _tone(tone: str) -> str:
+        return tone if tone in TONE_INSTRUCTIONS else "professional"
+
+    def prefix(self, tone: str) -> str:
+        return self._prefixes[self._tone(tone)]
+
+    def prefix_key(self, tone: str) -> str:
+        """접두부 내용 해시가 포함된 캐시 키 (프롬프트가 바뀌면 키도 바뀜)"""
+        return self._keys[self._tone(tone)]
+
+    def render_request(self, topic: str, refined_context: str, articles: list = None) -> str:
+        """요청마다 바뀌는 부분을 조립합니다."""
+        # 아티클 리스트를 문자열로 변환 (URL 및 이미지 보존 강조)
+        articles_context = ""
+        if articles:
+            for i, a in enumerate(articles):
+                articles_context += f"--- Source {i+1} ---\nTitle: {a.get('title')}\nURL: {a.get('url')}\nAssociated Images: {a.get('associated_images', [])}\nContent: {a.get('content')}\n\n"
+
+        return (
+            f"{_request_section(topic)}\n\n"
+            f"[Sources]\n{articles_context}\n"
+            f"[Refined Knowledge Base]\n{refined_context or '(별도 분석 없음 - 위 Sources의 내용과 Associated Images를 활용)'}\n"
+        )
+
+    def render(self, topic: str, refined_context: str, tone: str, articles: list = None) -> str:
+        """접두부와 요청 부분을 합친 전체 프롬프트"""
+        return f"{self.prefix(tone)}\n\n{self.render_request(topic, refined_context, articles)}"
+
+    def render_block(self, topic: str, block_type: str, tone: str, refined_context: str = "", articles: list = None,
+                     others: list = None, current: dict = None, instructions: str = None) -> str:
+        """
+        블록 하나만 다시 쓰는 짧은 프롬프트입니다.
+        전체 접두부 대신 해당 블록의 스키마/가이드만 넣고, 나머지 블록은 제목만 요약해 내용이 겹치지 않게 합니다.
+        소스 본문은 BLOCK_SOURCE_CHARS자로 줄이고, 다른 블록이 이미 인용한 소스는 표시해 둡니다.
+        """
+        schema = dict((t, s) for t, _, s in BLOCK_SCHEMAS)[block_type].strip()
+        used = set()
+        outline = ""
+        for block in others or []:
+            content = block.get('content') if isinstance(block.get('content'), dict) else {}
+            used.update(normalize_url(link) for link in _block_links(content))
+            summary = content.get('title') or content.get('name') or content.get('text') or ""
+            outline += f"- {block.get('type')}: {str(summary)[:60]}\n"
+
+        articles_context = ""
+        for i, a in enumerate(articles or []):
+            mark = " (다른 블록에서 인용됨)" if a.get('url') and normalize_url(a['url']) in used else ""
+            body = (a.get('content') or "")[:BLOCK_SOURCE_CHARS]
+            articles_context += f"--- Source {i+1}{mark} ---\nTitle: {a.get('title')}\nURL: {a.get('url')}\nAssociated Images: {a.get('associated_images', [])}\nContent: {body}\n\n"
+
+        parts = [
+            "당신은 뉴스레터 전문 수석 에디터입니다. 이미 발행 준비 중인 뉴스레터의 블록 하나를 새로 작성합니다.",
+            TONE_INSTRUCTIONS[self._tone(tone)],
+            f"[작성할 블록: {block_type}]\n{BLOCK_GUIDES.get(block_type, '')}\n"
+            "핵심 키워드는 `<strong>` 태그로 강조하고(마크다운 `**` 금지), 한 문단은 최대 3줄로 쓰세요.\n"
+            "링크와 이미지는 [Sources]에 있는 URL과 Associated Images만 사용하고, 가능하면 다른 블록에서 인용되지 않은 소스를 쓰세요.\n"
+            "주요 언어: 한국어 (Korean/Hangul).",
+            f"[Output Format]\n반드시 추가 텍스트 없이 아래 형식의 블록 JSON 객체 하나만 출력하십시오.\n{schema}",
+            _request_section(topic),
+        ]
+        if outline:
+            parts.append(f"[뉴스레터의 다른 블록] (내용이 겹치지 않게 작성)\n{outline.rstrip()}")
+        if current:
+            parts.append(f"[기존 블록] (이보다 나은 내용으로 다시 작성)\n{json.dumps(current, ensure_ascii=False)}")
+        if instructions:
+            parts.append(f"[에디터 요청]\n{instructions}")
+        parts.append(f"[Sources]\n{articles_context.rstrip()}")
+        if refined_context:
+            parts.append(f"[Refined Knowledge Base]\n{refined_context}")
+        return "\n\n".join(parts) + "\n"
+
+
+def _block_links(content: dict) -> list:
+    """블록 본문과 하위 항목(news_items 등)에 들어 있는 링크"""
+    links = [content.get(f) for f in ("link", "url")]
+    for value in content.values():
+        if isinstance(value, list):
+            links.extend(item.get(f) for item in value if isinstance(item, dict) for f in ("link", "url"))
+    return [link for link in links if isinstance(link, str) and link]
+
+
+# 프로세스 시작 시 한 번만 만들어 두고 재사용
+NEWSLETTER_PROMPT = PromptTemplate()
@@ -0,0 +1,106 @@
+import os
+import json
+import asyncio
+from utils.cache import build_cache, data_path
+from utils.single_flight import SingleFlight
+from utils.url_utils import normalize_url
+
+
+def reciprocal_rank_fusion(result_lists: list, limit: int, k: int = 60) -> list:
+    """
+    여러 검색 결과 목록을 URL 기준으로 합칩니다. (Reciprocal Rank Fusion)
+    각 결과는 목록마다 1 / (k + 순위) 점수를 받고, 점수 합이 높은 순으로 limit개를 반환합니다.
+    같은 URL이 여러 목록에 있으면 본문(raw_content)이 가장 긴 결과를 대표로 사용합니다.
+    """
+    scores, best, first_seen = {}, {}, {}
+    for results in result_lists:
+        for rank, result in enumerate(results or []):
+            url = result.get('url')
+            if not url:
+                continue
+            key = normalize_url(url)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            first_seen.setdefault(key, len(first_seen))
+            current = best.get(key)
+            if current is None or len(result.get('raw_content') or '') > len(current.get('raw_content') or ''):
+                best[key] = result
+    ordered = sorted(scores, key=lambda key: (-scores[key], first_seen[key]))
+    return [best[key] for key in ordered[:limit]]
+
+
+class QueryExpander:
+    """
+    주제를 서로 다른 관점의 검색어 몇 개로 확장합니다. (기술 동향, 시장 영향, 실제 사례 등)
+    complete(prompt)는 LLM 텍스트 응답을 돌려주는 비동기 함수이며,
+    결과는 정규화된 주제 기준으로 캐시하고 동시에 들어온 같은 주제는 한 번만 확장합니다.
+    시간 안에 확장하지 못하거나 실패하면 빈 목록을 반환해 원래 주제만으로 검색하게 합니다.
+    """
+
+    def __init__(self, complete, count: int = None, timeout: float = None):
+        self.complete = complete
+        self.count = count or int(os.getenv("QUERY_EXPANSION_COUNT", "3"))
+        self.timeout = timeout or float(os.getenv("QUERY_EXPANSION_TIMEOUT", "4.0"))
+        self._cache = build_cache(
+            "QUERY_EXPANSION_CACHE", max_entries=1000, default_ttl=float(os.getenv("QUERY_EXPANSION_TTL", "86400")),
+            table="query_expansion", default_db=data_path("cache.db")
+        )
+        self._flight = SingleFlight()
+        self.expansions = 0
+        self.failures = 0
+
+    @staticmethod
+    def _normalize(topic: str) -> str:
+        return " ".join((topic or "").lower().split())
+
+    async def expand(self, topic: str) -> list:
+        """원래 주제를 제외한 확장 검색어 목록을 반환합니다."""
+        key = f"{self._normalize(topic)}|{self.count}"
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            return await asyncio.wait_for(self._flight.do(key, lambda: self._expand(key, topic)), timeout=self.timeout)
+        except Exception as e:
+            self.failures += 1
+            print(f"Query expansion skipped for '{topic}': {e!r}")
+            return []
+
+    async def _expand(self, key: str, topic: str) -> list:
+        prompt = (
+            f"주제: '{topic}'\n"
+            f"이 주제로 뉴스레터를 쓰기 위한 웹 검색어를 서로 다른 관점(기술 동향, 시장/산업 영향, 실제 사례 등)으로 "
+            f"{self.count}개 만드세요. 각 검색어는 짧은 키워드 구문이어야 합니다.\n"
+            f"JSON 문자열 배열만 출력하세요. 예: [\"...\", \"...\"]"
+        )
+        self.expansions += 1
+        text = await self.complete(prompt)
+        queries = self._parse(text, topic)
+        if queries:
+            self._cache.set(key, queries)
+        return queries
+
+    def _parse(self, text: str, topic: str) -> list:
+        text = (text or "").strip()
+        try:
+            start, end = text.index("["), text.rindex("]") + 1
+            items = json.loads(text[start:end])
+        except ValueError:
+            # JSON 배열이 아니면 줄 단위 목록으로 해석
+            items = [line.strip(" -*0123456789.\"'") for line in text.splitlines()]
+        seen = {self._normalize(topic)}
+        queries = []
+        for item in items:
+            if not isinstance(item, str):
+                continue
+            query = " ".join(item.split())
+            if query and self._normalize(query) not in seen:
+                seen.add(self._normalize(query))
+                queries.append(query)
+        return queries[:self.count]
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats["expansions"] = self.expansions
+        stats["failures"] = self.failures
+        stats["coalesced"] = self._flight.coalesced
+        return stats
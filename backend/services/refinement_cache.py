@@ -0,0 +1,44 @@
+import os
+import hashlib
+from utils.cache import build_cache, data_path
+from utils.single_flight import SingleFlight
+
+
+class RefinementCache:
+    """
+    문맥 정제(_analyze_context) 결과의 내용 주소 기반(content-addressed) 캐시입니다.
+    정제 결과는 (주제, 원문 컨텍스트)에만 의존하므로 두 값의 해시를 키로 사용합니다.
+    분석에 걸린 시간도 함께 저장해 캐시 적중 시 절약된 시간을 계산할 수 있게 합니다.
+    동시에 들어온 같은 입력은 하나의 분석 호출로 합칩니다(single-flight).
+    """
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl or float(os.getenv("REFINEMENT_CACHE_TTL", "86400"))
+        self._cache = build_cache(
+            "REFINEMENT_CACHE", max_entries=1000, default_ttl=self.ttl,
+            table="refined_context", default_db=data_path("cache.db")
+        )
+        self._flight = SingleFlight()
+
+    @staticmethod
+    def key(topic: str, raw_context: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(" ".join((topic or "").lower().split()).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update((raw_context or "").encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """저장된 {text, seconds}를 반환합니다. 없으면 None."""
+        return self._cache.get(key)
+
+    def set(self, key: str, text: str, seconds: float):
+        self._cache.set(key, {"text": text, "seconds": round(seconds, 3)})
+
+    async def coalesce(self, key: str, factory):
+        return await self._flight.do(key, factory)
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats["coalesced"] = self._flight.coalesced
+        return stats
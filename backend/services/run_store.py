@@ -0,0 +1,72 @@
+import os
+import uuid
+from utils.cache import build_cache, data_path
+
+
+class RunNotFound(KeyError):
+    pass
+
+
+class RunStore:
+    """
+    생성 실행(run)마다 블록 재생성에 필요한 입력을 보관합니다.
+    - 예산에 맞춘 소스(아티클), 정제된 문맥(refined context), 유효 소스/URL, 이미지 풀
+    - 요청 설정(주제, 톤, 모델)과 최종 블록 목록
+    블록 하나를 다시 만들 때 검색/스크래핑/문맥 정제를 다시 실행하지 않고 이 값을 그대로 사용합니다.
+    메모리 + 캐시 DB(runs 테이블)에 RUN_STORE_TTL초 동안 유지됩니다.
+    """
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl or float(os.getenv("RUN_STORE_TTL", "86400"))
+        self._cache = build_cache(
+            "RUN_STORE", max_entries=500, default_ttl=self.ttl,
+            table="runs", default_db=data_path("cache.db")
+        )
+        self.saved = 0
+        self.block_updates = 0
+
+    def save(self, request, bundle: dict, prepared: dict, blocks: list) -> str:
+        """실행 결과를 저장하고 run_id를 반환합니다."""
+        run_id = uuid.uuid4().hex
+        self._cache.set(run_id, {
+            "topic": request.topic,
+            "tone": request.tone,
+            "model_type": request.model_type,
+            # 생성 프롬프트에 실제로 들어간 소스 (토큰 예산에 맞춘 결과, 없으면 유효 소스)
+            "articles": prepared.get("articles") or bundle["valid_sources"],
+            "refined_context": prepared.get("refined_context", ""),
+            "valid_sources": bundle["valid_sources"],
+            "valid_urls": bundle["valid_urls"],
+            "images": bundle["images"],
+            "blocks": blocks,
+        })
+        self.saved += 1
+        return run_id
+
+    def get(self, run_id: str):
+        """저장된 실행 정보를 반환합니다. 없거나 만료되었으면 None."""
+        return self._cache.get(run_id)
+
+    def update_block(self, run_id: str, block: dict) -> bool:
+        """
+        재생성한 블록으로 실행의 블록 목록을 갱신합니다. (다음 재생성에서 다른 블록 요약/중복 회피에 반영)
+        같은 ID의 블록이 없으면 끝에 추가하며, 실행 기록이 만료되었으면 False를 반환합니다.
+        """
+        run = self._cache.get(run_id)
+        if run is None:
+            return False
+        blocks = run["blocks"]
+        for i, existing in enumerate(blocks):
+            if existing.get("id") == block.get("id"):
+                blocks[i] = block
+                break
+        else:
+            blocks.append(block)
+        self._cache.set(run_id, run)
+        self.block_updates += 1
+        return True
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats.update({"saved": self.saved, "block_updates": self.block_updates, "ttl": self.ttl})
+        return stats
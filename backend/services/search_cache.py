@@ -0,0 +1,57 @@
+import os
+import asyncio
+from utils.cache import build_cache
+from utils.single_flight import SingleFlight
+
+
+class SearchCache:
+    """
+    Tavily 검색 결과 캐시입니다.
+    (정규화된 쿼리, max_results, depth)를 키로 신선도 구간(freshness window) 동안 재사용하고,
+    동시에 들어온 동일 검색은 하나의 요청으로 합칩니다(single-flight).
+    블로킹 SDK 호출은 스레드로 넘겨 이벤트 루프를 막지 않습니다.
+    """
+
+    def __init__(self, client, freshness: float = None):
+        self.client = client
+        self.freshness = freshness or float(os.getenv("SEARCH_CACHE_TTL", "900"))
+        self._cache = build_cache("SEARCH_CACHE", max_entries=256, default_ttl=self.freshness, table="search_results")
+        self._flight = SingleFlight()
+        self.searches = 0
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        return " ".join((query or "").lower().split())
+
+    def _key(self, query: str, max_results: int, depth: str) -> str:
+        return f"{self._normalize_query(query)}|{max_results}|{depth}"
+
+    async def search(self, query: str, max_results: int = 5, depth: str = "advanced") -> dict:
+        key = self._key(query, max_results, depth)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        async def run():
+            self.searches += 1
+            result = await asyncio.to_thread(
+                self.client.search,
+                query=query,
+                search_depth=depth,
+                include_images=False,
+                include_raw_content=True,
+                max_results=max_results
+            )
+            # 결과가 있을 때만 캐싱 (빈 결과/오류는 다음 요청에서 재시도)
+            if result and result.get('results'):
+                self._cache.set(key, result)
+            return result
+
+        return await self._flight.do(key, run)
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats["searches"] = self.searches
+        stats["coalesced"] = self._flight.coalesced
+        stats["in_flight"] = self._flight.in_flight()
+        return stats
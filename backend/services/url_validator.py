@@ -0,0 +1,113 @@
+import time
+import asyncio
+from services.http_pool import HttpPool
+from services.crawl_scheduler import HostThrottled, THROTTLE_STATUSES
+from services.validity_cache import ValidityCache
+from utils.single_flight import SingleFlight
+from utils.metrics import URL_PROBES, URL_PROBE_DURATION
+
+# 의미 없는 이미지로 판단하는 URL 키워드
+IMAGE_BLACKLIST = [
+    'avatar', 'profile', 'author', 'user', 'icon', 'emoji', 'logo',
+    'placeholder', 'pixel', 'banner-ad', 'loading', 'gravatar'
+]
+
+
+class UrlValidator:
+    """
+    공유 HttpPool 위에서 동작하는 비동기 URL 유효성 검사기입니다.
+    이벤트 루프를 막지 않고 여러 URL을 한 번의 호출로 동시에 검사합니다.
+    """
+
+    def __init__(self, http_pool: HttpPool, cache: ValidityCache = None):
+        self.http_pool = http_pool
+        self.cache = cache or ValidityCache()
+        # 여러 요청(배치 생성의 여러 주제 등)이 같은 URL을 동시에 검사하면 프로브 한 번으로 합침
+        self._flight = SingleFlight()
+        self.probes = 0
+
+    async def is_valid(self, url: str, check_image: bool = False) -> bool:
+        """
+        URL이 유효하고 접근 가능한지 확인합니다.
+        check_image가 True이면 이미지의 퀄리티(크기, 키워드)도 함께 체크합니다.
+        """
+        if not url or not url.startswith('http'):
+            return False
+
+        # 1. 의미 없는 이미지 필터링 (키워드 기반)
+        if check_image and any(kw in url.lower() for kw in IMAGE_BLACKLIST):
+            return False
+
+        cached = self.cache.get(url, check_image)
+        if cached is not None:
+            return cached['valid']
+
+        verdict = await self._flight.do((url, check_image), lambda: self._probe_and_store(url, check_image))
+        return verdict['valid']
+
+    async def _probe_and_store(self, url: str, check_image: bool) -> dict:
+        verdict = await self._probe(url, check_image)
+        # 속도 제한으로 확인하지 못한 URL은 일시적인 실패이므로 캐시하지 않음
+        if not verdict.get("throttled") and verdict["status"] not in THROTTLE_STATUSES:
+            self.cache.set(url, check_image, verdict)
+        return verdict
+
+    async def _probe(self, url: str, check_image: bool) -> dict:
+        """네트워크로 URL을 확인하고 판정, 상태 코드, Content-Length를 반환합니다."""
+        self.probes += 1
+        kind = "image" if check_image else "page"
+        started = time.perf_counter()
+        verdict = await self._request_verdict(url, check_image)
+        URL_PROBE_DURATION.observe(time.perf_counter() - started, kind=kind)
+        URL_PROBES.inc(kind=kind, result="valid" if verdict["valid"] else "invalid")
+        return verdict
+
+    async def _request_verdict(self, url: str, check_image: bool) -> dict:
+        status = None
+        try:
+            # 2. 유효성 및 크기 확인 (HEAD 요청)
+            response = await self.http_pool.request('HEAD', url)
+            status = response.status_code
+            if status == 200:
+                content_length = int(response.headers.get('Content-Length', 0) or 0)
+                # Content-Length가 너무 작으면 (예: 5KB 미만) 아이콘일 확률이 높음
+                valid = not (check_image and 0 < content_length < 5000)
+                return {"valid": valid, "status": status, "content_length": content_length}
+            if status in THROTTLE_STATUSES:
+                # 같은 호스트에 GET으로 다시 요청하지 않음
+                return {"valid": False, "status": status, "content_length": 0}
+        except HostThrottled:
+            return {"valid": False, "status": None, "content_length": 0, "throttled": True}
+        except Exception:
+            pass
+
+        try:
+            # 3. GET 요청 (HEAD 차단된 경우) - 본문은 읽지 않음
+            async with self.http_pool.stream('GET', url) as response:
+                content_length = int(response.headers.get('Content-Length', 0) or 0)
+                return {"valid": response.status_code == 200, "status": response.status_code, "content_length": content_length}
+        except HostThrottled:
+            return {"valid": False, "status": status, "content_length": 0, "throttled": True}
+        except Exception:
+            return {"valid": False, "status": status, "content_length": 0}
+
+    async def filter_valid(self, urls: list, check_image: bool = False) -> list:
+        """
+        여러 URL을 동시에 검사하여 유효한 것만 (입력 순서대로) 반환합니다.
+        """
+        if not urls:
+            return []
+        results = await asyncio.gather(*(self.is_valid(u, check_image) for u in urls))
+        return [url for url, is_valid in zip(urls, results) if is_valid]
+
+    def cached_valid(self, urls: list, check_image: bool = False) -> list:
+        """네트워크 요청 없이, 캐시에 '유효'로 기록된 URL만 반환합니다. (중단된 검사의 부분 결과 회수용)"""
+        valid = []
+        for url in urls:
+            verdict = self.cache.get(url, check_image) if url and url.startswith('http') else None
+            if verdict and verdict.get('valid'):
+                valid.append(url)
+        return valid
+
+    def stats(self) -> dict:
+        return {"probes": self.probes, "coalesced": self._flight.coalesced, "cache": self.cache.stats()}
@@ -0,0 +1,35 @@
+import os
+from utils.cache import build_cache
+from utils.url_utils import normalize_url
+
+
+class ValidityCache:
+    """
+    URL/이미지 유효성 판정 결과 캐시입니다.
+    정규화된 URL 기준으로 판정(valid), 상태 코드, Content-Length를 저장하며
+    유효/무효 판정에 서로 다른 TTL을 적용합니다.
+    VALIDITY_CACHE_DB를 지정하면 SQLite에 저장되어 재시작/멀티 워커 간에 공유됩니다.
+    """
+
+    def __init__(self, positive_ttl: float = None, negative_ttl: float = None):
+        self.positive_ttl = positive_ttl or float(os.getenv("VALIDITY_CACHE_POSITIVE_TTL", "86400"))
+        self.negative_ttl = negative_ttl or float(os.getenv("VALIDITY_CACHE_NEGATIVE_TTL", "1800"))
+        self._cache = build_cache("VALIDITY_CACHE", max_entries=20000, default_ttl=self.positive_ttl, table="url_validity")
+
+    @staticmethod
+    def _key(url: str, check_image: bool) -> str:
+        return f"{'img' if check_image else 'url'}:{normalize_url(url)}"
+
+    def get(self, url: str, check_image: bool = False):
+        """캐시된 판정 dict({valid, status, content_length})를 반환합니다. 없으면 None."""
+        return self._cache.get(self._key(url, check_image))
+
+    def set(self, url: str, check_image: bool, verdict: dict):
+        ttl = self.positive_ttl if verdict.get('valid') else self.negative_ttl
+        self._cache.set(self._key(url, check_image), verdict, ttl=ttl)
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        # 캐시 적중 = 절약된 네트워크 프로브 수
+        stats["probes_saved"] = stats["hits"]
+        return stats
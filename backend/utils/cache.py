@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import atexit
+import sqlite3
+import weakref
+import threading
+from collections import OrderedDict
+from utils.metrics import CACHE_REQUESTS
+
+_DISK_CACHES = weakref.WeakSet()  # 종료 시 남은 쓰기를 저장할 SQLiteCache 목록
+
+
+class TTLCache:
+    """
+    항목별 만료 시간(TTL)을 가지는 인메모리 LRU 캐시입니다.
+    max_entries를 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다.
+    """
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_entry(self, key):
+        """(value, expires_at) 튜플을 반환합니다. 없거나 만료되면 None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value, expires_at
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return entry[0] if entry else default
+
+    def set(self, key, value, ttl: float = None, expires_at: float = None):
+        if expires_at is None:
+            expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteCache:
+    """
+    SQLite 파일에 저장되는 키-값 캐시입니다.
+    서버 재시작 후에도 유지되며, WAL 모드로 여러 uvicorn 워커가 같은 파일을 공유할 수 있습니다.
+    값은 JSON으로 직렬화됩니다.
+    쓰기/삭제는 대기열에 모았다가 백그라운드 스레드가 flush_interval초마다 한 트랜잭션으로 커밋하므로
+    코루틴에서 set을 호출해도 이벤트 루프가 커밋(디스크 동기화)을 기다리지 않습니다.
+    (CACHE_FLUSH_INTERVAL_S=0이면 호출할 때마다 바로 커밋)
+    """
+
+    def __init__(self, path: str, table: str = "cache", flush_interval: float = None):
+        self.path = path
+        self.table = table
+        self.flush_interval = (float(os.getenv("CACHE_FLUSH_INTERVAL_S", "0.5"))
+                               if flush_interval is None else flush_interval)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_expires ON {table}(expires_at)")
+        self._conn.commit()
+        # 아직 커밋하지 않은 쓰기: key -> (직렬화된 값, expires_at), 삭제는 None
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._writer = None
+        self.flushes = 0
+        _DISK_CACHES.add(self)
+
+    def get_entry(self, key):
+        """(value, expires_at) 튜플을 반환합니다. 없거나 만료되면 None."""
+        with self._pending_lock:
+            pending = self._pending.get(key, False)
+        if pending is None:
+            return None
+        if pending:
+            row = pending
+        else:
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        try:
+            return json.loads(row[0]), row[1]
+        except ValueError:
+            return None
+
+    def set(self, key, value, ttl: float = None, expires_at: float = None):
+        if expires_at is None:
+            expires_at = time.time() + (ttl or 0)
+        self._enqueue(key, (json.dumps(value, ensure_ascii=False), expires_at))
+
+    def delete(self, key):
+        self._enqueue(key, None)
+
+    def _enqueue(self, key, entry):
+        with self._pending_lock:
+            self._pending[key] = entry
+            if self.flush_interval > 0 and self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name=f"cache-writer-{self.table}", daemon=True)
+                self._writer.start()
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def _write_loop(self):
+        # 대기열이 비면 종료하고, 다음 쓰기가 들어오면 _enqueue가 다시 시작
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"SQLiteCache write error ({self.table}): {e}")
+            with self._pending_lock:
+                if not self._pending:
+                    self._writer = None
+                    return
+
+    def flush(self):
+        """대기 중인 쓰기/삭제를 한 트랜잭션으로 커밋합니다."""
+        # 대기열을 비우고 커밋할 때까지 _lock을 잡아, 그 사이 get_entry가 커밋 전 DB를 읽지 않게 함
+        with self._lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            writes = [(key, entry[0], entry[1]) for key, entry in pending.items() if entry is not None]
+            deletes = [(key,) for key, entry in pending.items() if entry is None]
+            try:
+                if writes:
+                    self._conn.executemany(
+                        f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)", writes
+                    )
+                if deletes:
+                    self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", deletes)
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+            self.flushes += 1
+
+    def purge_expired(self) -> int:
+        self.flush()
+        with self._lock:
+            cur = self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+            return cur.rowcount
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+@atexit.register
+def _flush_disk_caches():
+    for cache in list(_DISK_CACHES):
+        try:
+            cache.flush()
+        except sqlite3.Error as e:
+            print(f"SQLiteCache flush on exit failed ({cache.table}): {e}")
+
+
+class TieredCache:
+    """
+    인메모리 TTLCache 앞단 + (선택) SQLiteCache 뒷단으로 구성된 2단 캐시입니다.
+    디스크에서 찾은 항목은 남은 TTL 그대로 메모리로 승격됩니다.
+    """
+
+    def __init__(self, memory: TTLCache, disk: SQLiteCache = None, name: str = "cache"):
+        self.memory = memory
+        self.disk = disk
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def get(self, key, default=None):
+        entry = self.memory.get_entry(key)
+        if entry is None and self.disk is not None:
+            try:
+                entry = self.disk.get_entry(key)
+            except sqlite3.Error as e:
+                print(f"TieredCache disk read error: {e}")
+                entry = None
+            if entry is not None:
+                self.disk_hits += 1
+                self.memory.set(key, entry[0], expires_at=entry[1])
+        if entry is None:
+            self.misses += 1
+            CACHE_REQUESTS.inc(cache=self.name, result="miss")
+            return default
+        self.hits += 1
+        CACHE_REQUESTS.inc(cache=self.name, result="hit")
+        return entry[0]
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.time() + (self.memory.default_ttl if ttl is None else ttl)
+        self.memory.set(key, value, expires_at=expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, expires_at=expires_at)
+            except sqlite3.Error as e:
+                print(f"TieredCache disk write error: {e}")
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            try:
+                self.disk.delete(key)
+            except sqlite3.Error as e:
+                print(f"TieredCache disk delete error: {e}")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory": self.memory.stats(),
+            "persistent": self.disk is not None,
+        }
+
+
+def data_path(filename: str) -> str:
+    """로컬 데이터 파일 경로 (DATA_DIR, 기본값: ./data)"""
+    return os.path.join(os.getenv("DATA_DIR", "data"), filename)
+
+
+def build_cache(prefix: str, max_entries: int, default_ttl: float, table: str, default_db: str = None) -> TieredCache:
+    """
+    환경 변수로 설정 가능한 TieredCache를 만듭니다.
+    - {prefix}_MAX_ENTRIES: 메모리 항목 수 상한
+    - {prefix}_DB: 지정 시 해당 경로의 SQLite 파일을 디스크 캐시로 사용 (빈 문자열이면 비활성화)
+    """
+    memory = TTLCache(
+        max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", str(max_entries))),
+        default_ttl=default_ttl,
+    )
+    db_path = os.getenv(f"{prefix}_DB", default_db)
+    disk = SQLiteCache(db_path, table=table) if db_path else None
+    return TieredCache(memory, disk, name=table)
@@ -1,48 +1,396 @@
 import json
 import re
+from json.decoder import scanstring
 
-def clean_json_text(text: str) -> str:
-    """
-    AI가 생성한 텍스트에서 JSON 부분만 추출하고 제어 문자를 제거하여 
-    파싱 가능한 상태로 정제합니다.
-    """
-    text = text.strip()
-    
-    # 마크다운 코드 블록 제거 (```json ... ``` 또는 ``` ... ```)
-    if "```" in text:
-        # json 언어 식별자가 있는 경우 우선 처리
-        json_match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
-        if json_match:
-            text = json_match.group(1)
-        else:
-            # 일반 코드 블록 처리
-            block_match = re.search(r'```\s*(.*?)\s*```', text, re.DOTALL)
-            if block_match:
-                text = block_match.group(1)
-
-    # 유효하지 않은 제어 문자 제거 (\x00-\x1F, \x7F)
-    # 단, 줄바꿈(\n), 탭(\t), 캐리지 리턴(\r)은 JSON에서 유효하므로 유지하거나 이스케이프 처리 확인 필요
-    # 여기서는 안전을 위해 아예 제거하거나 공백으로 대체
-    text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
-    
-    return text.strip()
+_DECODER = json.JSONDecoder(strict=False)
+_WHITESPACE = " \t\n\r\ufeff"
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_NEXT_OBJECT = re.compile(r'\}\s*(,)\s*\{')
+# 설명 문장 속 괄호('[draft]', '{important}')는 건너뛰도록, 바로 뒤에 JSON 값이 이어지는 괄호만 시작 후보로 봄
+_VALUE_START = re.compile(r'\{(?=\s*["}])|\[(?=\s*[\[{"\]\-0-9tfn])')
+_FENCE = re.compile(r'```(?:json|JSON)?[ \t]*\n(.*?)```', re.S)
+_MAX_FAILED_STARTS = 8  # 값으로 파싱되지 않는 시작 후보를 이만큼 만나면 더 찾지 않음
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
 
-def parse_ai_json(text: str):
+
+class _ParseError(Exception):
+    pass
+
+
+class TolerantJSONParser:
+    """
+    LLM 출력용 관대한(tolerant) JSON 파서입니다. 입력을 앞에서부터 한 번만 훑으며 다음을 허용합니다.
+    - 코드 펜스(```json): 펜스 안의 내용을 먼저 파싱
+    - 앞뒤의 설명 문장: 뒤에 JSON 값이 이어지는 괄호만 시작 후보로 보고('[draft]', '{important}'는 건너뜀),
+      값이 여러 개면 비어 있지 않은 값 중 가장 길게 파싱된 값을 사용
+    - 최상위 값이 문자열/숫자/리터럴 하나인 응답
+    - 후행 쉼표, 연속 쉼표, 문자열 안의 이스케이프되지 않은 줄바꿈/제어 문자, 잘못된 이스케이프(역슬래시를 글자로 취급)
+    - 문자열 안의 이스케이프되지 않은 따옴표: 뒤에 구분자(, : } ])가 오지 않는 따옴표는 글자로 취급
+    - 잘린 출력: 열린 객체/배열을 닫고 완성된 멤버/원소만 남김 (self.truncated = True)
+    - 배열 원소 하나가 깨진 경우: 그 원소만 건너뛰고 나머지 원소를 계속 파싱 (self.skipped 증가)
+    """
+
+    def __init__(self, text: str):
+        self.text = text or ""
+        self.truncated = False
+        self.skipped = 0
+
+    def parse(self):
+        fence = _FENCE.search(self.text)
+        if fence:
+            inner = TolerantJSONParser(fence.group(1))
+            try:
+                value = inner.parse()
+                self.truncated, self.skipped = inner.truncated, inner.skipped
+                return value
+            except _ParseError:
+                pass
+        # 최상위 값이 문자열/숫자/리터럴 하나뿐인 응답 (전체가 그 값일 때만)
+        stripped = self.text.strip(_WHITESPACE)
+        if stripped and stripped[0] not in '{[':
+            try:
+                value, end = _DECODER.raw_decode(stripped)
+                if end == len(stripped):
+                    return value
+            except json.JSONDecodeError:
+                pass
+        return self._parse_best()
+
+    def _parse_best(self):
+        """
+        시작 후보('{"', '[{' 등)를 앞에서부터 한 번 훑으며 값을 파싱하고 (비어 있지 않음, 파싱된 길이)가 가장 큰 값을 반환합니다.
+        비어 있지 않은 값을 파싱하면 그 값 다음 위치부터 후보를 찾으므로 파싱된 구간을 다시 읽지 않습니다.
+        """
+        text = self.text
+        best = None  # ((비어 있지 않음, 길이), 값, truncated, skipped)
+        failed = 0
+        position = 0
+        while failed < _MAX_FAILED_STARTS:
+            match = _VALUE_START.search(text, position)
+            if not match:
+                break
+            start = match.start()
+            self.truncated, self.skipped = False, 0
+            try:
+                # 대부분의 응답은 유효하므로 C 구현 디코더로 먼저 시도 (뒤쪽 텍스트는 무시)
+                value, end = _DECODER.raw_decode(text, start)
+            except json.JSONDecodeError:
+                try:
+                    value, end = self._value(start)
+                except _ParseError:
+                    failed += 1
+                    position = start + 1
+                    continue
+            filled = len(value) > 0
+            score = (filled, end - start)
+            if best is None or score > best[0]:
+                best = (score, value, self.truncated, self.skipped)
+            # 빈 값('[]'처럼 원소가 모두 깨진 경우 포함)은 설명 속 괄호일 수 있으므로 안쪽 위치도 계속 시도
+            position = end if filled else start + 1
+        if best is None:
+            raise _ParseError("no JSON value found")
+        _, value, self.truncated, self.skipped = best
+        return value
+
+    # --- 내부 구현: 각 함수는 (값, 다음 위치)를 반환 ---
+
+    def _skip_ws(self, i: int) -> int:
+        text, n = self.text, len(self.text)
+        while i < n and text[i] in _WHITESPACE:
+            i += 1
+        return i
+
+    def _value(self, i: int):
+        i = self._skip_ws(i)
+        if i >= len(self.text):
+            self.truncated = True
+            raise _ParseError("unexpected end of input")
+        ch = self.text[i]
+        if ch == '{':
+            return self._object(i + 1)
+        if ch == '[':
+            return self._array(i + 1)
+        if ch == '"':
+            return self._string(i + 1)
+        match = _NUMBER.match(self.text, i)
+        if match:
+            number = match.group()
+            is_float = '.' in number or 'e' in number or 'E' in number
+            return (float(number) if is_float else int(number)), match.end()
+        for literal, value in _LITERALS.items():
+            if self.text.startswith(literal, i):
+                return value, i + len(literal)
+        raise _ParseError(f"unexpected character {ch!r} at {i}")
+
+    def _string(self, i: int):
+        value, end = self._segment(i)
+        if self._closes_string(end):
+            return value, end
+        parts = [value]
+        i = end
+        while True:
+            value, end = self._segment(i)
+            parts.append(value)
+            if self._closes_string(end):
+                return '"'.join(parts), end
+            # 이스케이프되지 않은 따옴표 - 글자로 취급하고 다음 따옴표까지 이어서 읽음
+            i = end
+
+    def _closes_string(self, end: int) -> bool:
+        """end 바로 앞의 따옴표가 문자열을 닫는지 (뒤에 JSON 구분자나 다음 값이 오는지)"""
+        text, n = self.text, len(self.text)
+        if end < n and text[end] in ':}]':
+            return True
+        k = self._skip_ws(end)
+        if k >= n or text[k] in ':}]"':
+            return True
+        if text[k] == ',':
+            k = self._skip_ws(k + 1)
+            return k >= n or text[k] in '"{[]}-0123456789tfnTFN'
+        return False
+
+    def _segment(self, i: int):
+        """다음 따옴표까지의 문자열 조각 (이스케이프 해석)"""
+        text = self.text
+        parts = []
+        while True:
+            try:
+                value, end = scanstring(text, i, False)
+            except json.JSONDecodeError as e:
+                if "Unterminated" in e.msg:
+                    self.truncated = True
+                    raise _ParseError("unterminated string")
+                # 잘못된 이스케이프(\q, 짧은 \u)는 역슬래시만 글자로 취급하고 그 뒤부터 다시 읽음
+                backslash = e.pos if text[e.pos] == '\\' else text.rfind('\\', i, e.pos)
+                parts.append(scanstring(text[i:backslash] + '"', 0, False)[0] + '\\')
+                i = backslash + 1
+                continue
+            if not parts:
+                return value, end
+            parts.append(value)
+            return "".join(parts), end
+
+    def _object(self, i: int):
+        result = {}
+        text, n = self.text, len(self.text)
+        while True:
+            i = self._skip_ws(i)
+            if i >= n:
+                self.truncated = True
+                return result, i
+            ch = text[i]
+            if ch == '}':
+                return result, i + 1
+            if ch == ',':
+                i += 1
+                continue
+            if ch == ']':
+                # 닫는 괄호 불일치 - 객체를 여기서 끝냄
+                return result, i
+            if ch != '"':
+                raise _ParseError(f"expected key at {i}")
+            try:
+                key, i = self._string(i + 1)
+                i = self._skip_ws(i)
+                if i >= n:
+                    self.truncated = True
+                    return result, i
+                if text[i] != ':':
+                    raise _ParseError(f"expected ':' at {i}")
+                value, i = self._value(i + 1)
+            except _ParseError:
+                if self.truncated:
+                    # 잘린 멤버는 버리고 지금까지 완성된 멤버만 반환
+                    return result, n
+                raise
+            result[key] = value
+
+    def _array(self, i: int):
+        result = []
+        text, n = self.text, len(self.text)
+        while True:
+            i = self._skip_ws(i)
+            if i >= n:
+                self.truncated = True
+                return result, i
+            ch = text[i]
+            if ch == ']':
+                return result, i + 1
+            if ch == ',':
+                i += 1
+                continue
+            if ch == '}':
+                return result, i
+            start = i
+            try:
+                value, i = self._value(i)
+            except _ParseError:
+                if self.truncated:
+                    return result, n
+                # 깨진 원소만 건너뛰고 다음 원소부터 계속
+                self.skipped += 1
+                i = self._skip_element(start)
+                if i >= n:
+                    # 따옴표가 깨져 짝 맞추기가 끝까지 밀린 경우 - 다음 객체 원소 경계('}, {')에서 다시 시작
+                    match = _NEXT_OBJECT.search(text, start + 1)
+                    if not match:
+                        return result, n
+                    i = match.start(1)
+                continue
+            if self.truncated:
+                # 도중에 잘린 원소(예: 쓰다 만 블록)는 버리고 완성된 원소만 반환
+                return result, n
+            result.append(value)
+
+    def _skip_element(self, i: int) -> int:
+        """문자열을 고려해 괄호 짝을 맞추며 현재 배열 원소의 끝(같은 깊이의 ',' 또는 ']')까지 건너뜁니다."""
+        text, n = self.text, len(self.text)
+        depth = 0
+        while i < n:
+            ch = text[i]
+            if ch == '"':
+                end = i + 1
+                while True:
+                    end = text.find('"', end)
+                    if end < 0:
+                        return n
+                    backslashes = 0
+                    while text[end - 1 - backslashes] == '\\':
+                        backslashes += 1
+                    if backslashes % 2 == 0:
+                        break
+                    end += 1
+                i = end
+            elif ch in '{[':
+                depth += 1
+            elif ch in '}]':
+                if depth == 0:
+                    return i
+                depth -= 1
+            elif ch == ',' and depth == 0:
+                return i
+            i += 1
+        return n
+
+
+def parse_partial_json(text: str):
     """
-    정제된 텍스트를 JSON으로 파싱합니다. 실패 시 다양한 복구 시나리오를 적용합니다.
+    관대한 파싱 결과와 상태를 함께 반환합니다.
+    반환값: (값, truncated 여부, 건너뛴 원소 수). 값을 전혀 찾지 못하면 json.JSONDecodeError를 던집니다.
     """
-    cleaned = clean_json_text(text)
-    
+    parser = TolerantJSONParser(text)
     try:
-        return json.loads(cleaned)
-    except json.JSONDecodeError as e:
-        # 따옴표 이스케이프 문제 등 흔한 에러에 대한 추가 정제 시도
+        value = parser.parse()
+    except _ParseError as e:
+        raise json.JSONDecodeError(str(e), text or "", 0)
+    return value, parser.truncated, parser.skipped
+
+
+def parse_ai_json(text: str):
+    """
+    AI 응답 텍스트를 JSON으로 파싱합니다.
+    코드 펜스/앞뒤 설명/후행 쉼표/이스케이프되지 않은 줄바꿈/잘린 출력을 한 번의 스캔으로 복구하며,
+    값을 전혀 찾을 수 없을 때만 json.JSONDecodeError를 던집니다.
+    """
+    return parse_partial_json(text)[0]
+
+
+class IncrementalBlockParser:
+    """
+    스트리밍으로 들어오는 AI 응답에서 "blocks" 배열의 원소를 완성되는 즉시 꺼내는 파서입니다.
+    feed()로 텍스트 조각을 넣으면 새로 완성된 블록 dict 목록을 반환하며,
+    문자열/이스케이프 상태를 유지한 채 버퍼를 한 번만 훑습니다.
+    """
+
+    _BLOCKS_KEY = re.compile(r'"blocks"\s*:\s*\[')
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._obj_start = None
+        self.blocks = []
+
+    def feed(self, chunk: str) -> list:
+        if not chunk:
+            return []
+        self.buffer += chunk
+        if self._done:
+            return []
+
+        if not self._in_array:
+            match = self._BLOCKS_KEY.search(self.buffer, self._pos)
+            if not match:
+                # 키가 조각 경계에 걸칠 수 있으므로 약간 앞에서 다시 찾음
+                self._pos = max(0, len(self.buffer) - 16)
+                return []
+            self._in_array = True
+            self._pos = match.end()
+
+        new_blocks = []
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                if self._depth == 0 and ch == '{':
+                    self._obj_start = i
+                self._depth += 1
+            elif ch in '}]':
+                if self._depth == 0:
+                    # blocks 배열 종료
+                    self._done = True
+                    i += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and ch == '}' and self._obj_start is not None:
+                    block = self._parse_block(buf[self._obj_start:i + 1])
+                    if block is not None:
+                        new_blocks.append(block)
+                    self._obj_start = None
+            i += 1
+        self._pos = i
+        self.blocks.extend(new_blocks)
+        return new_blocks
+
+    @staticmethod
+    def _parse_block(fragment: str):
+        try:
+            block = parse_ai_json(fragment)
+        except json.JSONDecodeError:
+            return None
+        return block if isinstance(block, dict) else None
+
+    def snapshot(self):
+        """지금까지 받은 (잘린) 응답을 관대한 파서로 파싱한 중간 결과를 반환합니다."""
         try:
-            # 본문 내의 줄바꿈이 이스케이프 되지 않은 경우 처리
-            # (매우 단순한 형태의 복구이므로 주의 필요)
-            fixed = cleaned.replace('\n', '\\n').replace('\r', '')
-            # 하지만 JSON 구조 자체의 줄바꿈은 유지해야 하므로 re.sub 등을 써야 할 수도 있음
-            # 일단은 표준 에러 로깅 후 다시 시도
-            return json.loads(cleaned) 
-        except:
-            raise e
\ No newline at end of file
+            data = parse_ai_json(self.buffer)
+        except json.JSONDecodeError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def finish(self) -> dict:
+        """
+        스트림 종료 후 전체 응답을 파싱합니다.
+        관대한 파서가 잘리거나 깨진 부분을 건너뛰므로, 파싱된 블록이 스트림 중 꺼낸 블록보다 적을 때만
+        꺼내 둔 블록으로 대체합니다.
+        """
+        data = self.snapshot() or {}
+        blocks = data.get('blocks')
+        if not isinstance(blocks, list) or len(blocks) < len(self.blocks):
+            data['blocks'] = list(self.blocks)
+        data.setdefault('title', None)
+        return data
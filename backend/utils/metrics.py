@@ -0,0 +1,260 @@
+import json
+import time
+import uuid
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# 요청 단위 추적 ID (미들웨어/작업 워커에서 설정)
+trace_id_var = contextvars.ContextVar("trace_id", default=None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple, values: tuple, extra: dict = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.extend(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """현재 값을 나타내는 지표입니다. set_function으로 수집 시점에 값을 읽어올 수 있습니다."""
+    type_name = "gauge"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+        self._function = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, fn):
+        """fn()은 {라벨 값 튜플: 값} dict 또는 단일 숫자를 반환해야 합니다."""
+        self._function = fn
+
+    def _samples(self):
+        values = dict(self._values)
+        if self._function is not None:
+            try:
+                result = self._function()
+                if isinstance(result, dict):
+                    values.update(result)
+                else:
+                    values[()] = result
+            except Exception as e:
+                print(f"Gauge {self.name} collection error: {e}")
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in values.items()]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0] * len(self.buckets) + [0.0, 0]
+                self._values[key] = state
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def _samples(self):
+        lines = []
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, {'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, {'le': '+Inf'})} {state[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# 파이프라인 지표
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "newsletter_stage_duration_seconds", "Duration of generation pipeline stages", ("stage",)))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "newsletter_stage_errors_total", "Pipeline stages that raised an exception", ("stage",)))
+REQUESTS = REGISTRY.register(Counter(
+    "newsletter_http_requests_total", "HTTP requests served", ("method", "path", "status")))
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "newsletter_http_request_duration_seconds", "HTTP request latency", ("method", "path")))
+
+# 크롤러 지표
+BROWSER_LAUNCHES = REGISTRY.register(Counter(
+    "crawler_browser_launches_total", "Chromium processes launched by the browser pool"))
+BROWSER_PAGES_IN_FLIGHT = REGISTRY.register(Gauge(
+    "crawler_browser_pages_in_flight", "Browser pages currently open"))
+URL_PROBES = REGISTRY.register(Counter(
+    "crawler_url_probes_total", "Network probes issued by the URL validator", ("kind", "result")))
+URL_PROBE_DURATION = REGISTRY.register(Histogram(
+    "crawler_url_probe_duration_seconds", "Latency of URL validity probes", ("kind",)))
+IMAGE_EXTRACTIONS = REGISTRY.register(Counter(
+    "crawler_image_extractions_total", "Article image extractions by tier", ("tier",)))
+IMAGE_PROBE_BYTES = REGISTRY.register(Counter(
+    "crawler_image_probe_bytes_total", "Image header bytes downloaded by ranged probes"))
+IMAGE_DUPLICATES = REGISTRY.register(Counter(
+    "crawler_image_duplicates_total", "Duplicate images removed across sources", ("method",)))
+HOST_THROTTLES = REGISTRY.register(Counter(
+    "crawler_host_throttles_total", "Rate-limit responses (429/503) that put a host into backoff", ("status",)))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result", ("cache", "result")))
+
+# LLM 지표
+LLM_DURATION = REGISTRY.register(Histogram(
+    "llm_request_duration_seconds", "LLM call latency", ("provider", "model", "operation")))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "llm_tokens_total", "LLM token usage", ("provider", "model", "kind")))
+LLM_ROUTER_EVENTS = REGISTRY.register(Counter(
+    "llm_router_events_total", "LLM router hedges, failovers, retries and circuit breaker trips", ("provider", "event")))
+CONTEXT_TOKENS = REGISTRY.register(Counter(
+    "llm_context_tokens_total", "Estimated source context tokens before and after budgeting", ("provider", "kind")))
+CONTEXT_REFINEMENTS = REGISTRY.register(Counter(
+    "llm_context_refinements_total", "Context refinement pre-pass outcomes", ("mode", "result")))
+REFINEMENT_SAVED = REGISTRY.register(Counter(
+    "llm_context_refinement_saved_seconds_total",
+    "Estimated latency saved by skipping, caching or overlapping the refinement pre-pass", ("reason",)))
+
+# 작업 큐 지표
+JOB_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "job_queue_depth", "Jobs waiting for a worker"))
+
+
+def log_event(event: str, **fields):
+    """trace_id가 포함된 한 줄짜리 JSON 구조화 로그를 출력합니다."""
+    record = {"ts": round(time.time(), 3), "event": event, "trace_id": trace_id_var.get()}
+    record.update(fields)
+    print(json.dumps(record, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(stage: str, on_stage=None, **fields):
+    """
+    단계 소요 시간을 측정하여 히스토그램에 기록하고 구조화 로그를 남깁니다.
+    on_stage(name, seconds)가 주어지면 측정값을 함께 전달합니다.
+    """
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException as e:
+        status = "cancelled" if e.__class__.__name__ == "CancelledError" else "error"
+        if status == "error":
+            STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        log_event("span", stage=stage, duration_ms=round(elapsed * 1000, 2), status=status, **fields)
+        if on_stage:
+            on_stage(stage, elapsed)
+
+
+def record_llm_usage(provider: str, model: str, response):
+    """OpenAI/Gemini 응답 객체에서 토큰 사용량을 읽어 카운터에 더합니다."""
+    try:
+        usage = getattr(response, "usage", None)
+        if usage is not None:  # OpenAI
+            LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, provider=provider, model=model, kind="prompt")
+            LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, provider=provider, model=model, kind="completion")
+            details = getattr(usage, "prompt_tokens_details", None)
+            LLM_TOKENS.inc(getattr(details, "cached_tokens", 0) or 0, provider=provider, model=model, kind="cached")
+            return
+        meta = getattr(response, "usage_metadata", None)
+        if meta is not None:  # Gemini
+            LLM_TOKENS.inc(getattr(meta, "prompt_token_count", 0) or 0, provider=provider, model=model, kind="prompt")
+            LLM_TOKENS.inc(getattr(meta, "candidates_token_count", 0) or 0, provider=provider, model=model, kind="completion")
+            LLM_TOKENS.inc(getattr(meta, "cached_content_token_count", 0) or 0, provider=provider, model=model, kind="cached")
+    except Exception as e:
+        print(f"LLM usage recording error: {e}")
@@ -0,0 +1,111 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class TokenBucket:
+    """
+    비동기 토큰 버킷입니다. 초당 rate개씩 최대 capacity개까지 토큰이 차오르며,
+    acquire는 필요한 토큰이 찰 때까지 기다립니다. (rate가 0 이하이면 제한 없음)
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """기다리지 않고 토큰을 가져옵니다. 부족하면 False."""
+        if self.unlimited:
+            return True
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """토큰을 가져오고 기다린 시간(초)을 반환합니다. 대기 순서는 도착 순서를 따릅니다."""
+        if self.unlimited:
+            return 0.0
+        # 버킷 용량보다 큰 요청은 용량만큼만 요구 (영원히 기다리지 않도록)
+        tokens = min(tokens, self.capacity)
+        started = time.monotonic()
+        async with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+        return time.monotonic() - started
+
+    def delay(self, seconds: float):
+        """지정한 시간 동안 토큰이 차오르지 않도록 합니다. (서버가 속도 제한을 알려온 경우)"""
+        if self.unlimited:
+            return
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class RateLimiter:
+    """
+    동시 실행 수(세마포어)와 분당 요청 수/토큰 수(토큰 버킷)를 함께 지키는 슬롯입니다.
+    LLM 프로바이더처럼 동시 연결 수와 RPM/TPM 한도가 모두 있는 대상에 사용합니다.
+    """
+
+    def __init__(self, concurrency: int, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.concurrency = concurrency
+        self.requests = TokenBucket(requests_per_minute / 60, capacity=max(1.0, requests_per_minute / 60))
+        self.tokens = TokenBucket(tokens_per_minute / 60, capacity=max(1.0, tokens_per_minute / 6))
+        self.in_flight = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.waited_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0):
+        """요청 한 건을 보낼 수 있을 때까지 기다린 뒤 슬롯을 빌려줍니다. tokens는 예상 토큰 수입니다."""
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+            try:
+                await self.requests.acquire(1)
+                if tokens:
+                    await self.tokens.acquire(tokens)
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self.waiting -= 1
+        self.waited_seconds += time.monotonic() - started
+        self.acquired += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "rpm": round(self.requests.rate * 60, 1),
+            "tpm": round(self.tokens.rate * 60, 1),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "waited_s": round(self.waited_seconds, 3),
+        }
@@ -0,0 +1,33 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 비동기 작업을 하나로 합칩니다.
+    첫 호출자만 실제 작업을 실행하고, 나머지는 같은 결과(또는 예외)를 함께 받습니다.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.coalesced = 0
+
+    async def do(self, key, factory):
+        """factory()가 돌려주는 코루틴을 키당 한 번만 실행합니다."""
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(factory())
+        self._in_flight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._in_flight.pop(key, None)
+            else:
+                # 첫 호출자가 취소되더라도 다른 대기자를 위해 작업은 계속 진행
+                future.add_done_callback(lambda _f: self._in_flight.pop(key, None))
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
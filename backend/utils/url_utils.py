@@ -0,0 +1,58 @@
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 결과에 영향을 주지 않는 추적용 쿼리 파라미터
+TRACKING_PARAMS = {'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'igshid', 'ref', 'ref_src'}
+# 이미지 CDN이 크기/화질 변환에 쓰는 쿼리 파라미터 (같은 원본 이미지의 다른 렌디션)
+RESIZE_PARAMS = {
+    'w', 'h', 'width', 'height', 'resize', 'fit', 'crop', 'quality', 'q', 'auto', 'format', 'fm',
+    'dpr', 'sz', 'imwidth', 'impolicy', 'ixlib', 'cs', 'rect', 'output-quality', 'output-format', 'strip',
+}
+# WordPress 등의 썸네일 파일명 접미사 (photo-1024x768.jpg → photo.jpg)
+_SIZE_SUFFIX = re.compile(r'-\d{2,5}x\d{2,5}(?=\.(?:jpe?g|png|webp|gif|avif)$)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=16384)
+def normalize_url(url: str) -> str:
+    """
+    캐시 키/비교용으로 URL을 정규화합니다.
+    - scheme/host 소문자화, 기본 포트 및 fragment 제거
+    - utm_* 등 추적 파라미터 제거 후 쿼리 파라미터 정렬
+    같은 URL을 여러 단계(검증 캐시, 주입 인덱스 등)에서 반복 정규화하므로 결과를 메모이즈합니다.
+    """
+    if not url:
+        return ''
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS
+    ]
+    query.sort()
+    path = parts.path or '/'
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+@lru_cache(maxsize=16384)
+def canonical_image_url(url: str) -> str:
+    """
+    같은 원본 이미지의 렌디션(크기/화질 변환)을 하나로 묶기 위한 키를 만듭니다.
+    normalize_url 결과에서 리사이즈 파라미터와 파일명의 크기 접미사를 제거합니다.
+    """
+    parts = urlsplit(normalize_url(url))
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in RESIZE_PARAMS]
+    path = _SIZE_SUFFIX.sub('', parts.path)
+    return urlunsplit((parts.scheme, parts.netloc, path, urlencode(query), ''))